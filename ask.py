@@ -0,0 +1,54 @@
+"""
+Thin client for daemon.py. Takes the same arguments as main.py, runs the
+session in the daemon and prints its output as it arrives. It imports nothing
+but the standard library, so it starts in milliseconds.
+"""
+
+import json
+import os
+import socket
+import sys
+from typing import TextIO
+
+from config import DAEMON_SOCKET
+
+
+def ask(
+    argv: list[str],
+    socket_path: str = DAEMON_SOCKET,
+    stdout: TextIO = sys.stdout,
+    stderr: TextIO = sys.stderr,
+) -> int:
+    """Run one session in the daemon; returns its exit code."""
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        connection.close()
+        print(
+            f"No agent daemon is listening on {socket_path}. "
+            "Start one with: uv run daemon.py",
+            file=stderr,
+        )
+        return 2
+
+    streams = {"stdout": stdout, "stderr": stderr}
+    with connection, connection.makefile("rw", encoding="utf-8") as f:
+        f.write(json.dumps({"argv": argv, "cwd": os.getcwd()}) + "\n")
+        f.flush()
+        for line in f:
+            message = json.loads(line)
+            if "exit" in message:
+                return message["exit"]
+            stream = streams[message["stream"]]
+            stream.write(message["text"])
+            stream.flush()
+    print("The agent daemon closed the connection", file=stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(ask(sys.argv[1:]))
+    except KeyboardInterrupt:
+        sys.exit(130)
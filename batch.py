@@ -0,0 +1,416 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, TypedDict
+
+from google import genai
+
+from config import BATCH_REQUESTS_PER_MINUTE, MAX_ITERS, WORKING_DIR
+from functions.workspace import Workspace
+from loop_guard import LoopGuard, NoProgressError
+from main import create_client, process_model_turn, request_model_response
+from prompts import build_system_prompt
+from snapshot import build_workspace_snapshot
+
+
+class Task(TypedDict):
+    id: str
+    prompt: str
+    working_dir: str
+
+
+class QuotaExhausted(Exception):
+    """Raised when the batch-wide request or token budget is used up."""
+
+
+class SharedQuota:
+    """
+    Request and token budget shared by every worker of a batch. Requests are
+    also spaced out batch-wide to stay under a requests-per-minute limit,
+    instead of each task sleeping on its own.
+    """
+
+    def __init__(
+        self,
+        max_requests: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        requests_per_minute: float = BATCH_REQUESTS_PER_MINUTE,
+    ):
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.interval = 60 / requests_per_minute if requests_per_minute else 0
+        self.requests = 0
+        self.tokens = 0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Wait for the next request slot; raises QuotaExhausted if none is left."""
+        with self._lock:
+            if self.max_requests is not None and self.requests >= self.max_requests:
+                raise QuotaExhausted(f"request budget of {self.max_requests} used up")
+            if self.max_tokens is not None and self.tokens >= self.max_tokens:
+                raise QuotaExhausted(f"token budget of {self.max_tokens} used up")
+            self.requests += 1
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        time.sleep(slot - now)
+
+    def try_acquire(self) -> bool:
+        """Take a request only if the budget and the rate limit allow one now."""
+        with self._lock:
+            if self.max_requests is not None and self.requests >= self.max_requests:
+                return False
+            if self.max_tokens is not None and self.tokens >= self.max_tokens:
+                return False
+            now = time.monotonic()
+            if self._next_slot > now:
+                return False
+            self.requests += 1
+            self._next_slot = now + self.interval
+            return True
+
+    def add_tokens(self, tokens: int) -> None:
+        with self._lock:
+            self.tokens += tokens
+
+
+# Statuses a rerun of the batch tries again; with --retry-failed, so are
+# tasks that ran out of iterations or stopped making progress
+RETRIED_STATUSES = frozenset({"error", "conflict"})
+FAILED_STATUSES = RETRIED_STATUSES | {"max_iters", "no_progress"}
+
+
+class ResultLog:
+    """
+    Append-only JSON Lines file of finished tasks. It doubles as the batch's
+    completion state: a rerun skips every task whose latest record has a
+    status outside `retry`. A retried task gets a new record; the latest wins.
+    """
+
+    def __init__(self, path: str, retry: frozenset[str] = RETRIED_STATUSES):
+        self.path = path
+        self.retry = retry
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._record(json.loads(line))
+                    except (ValueError, KeyError):
+                        pass  # torn last line of an interrupted batch
+            # Make sure new records start on a fresh line
+            with open(path, "rb+") as f:
+                data = f.read()
+                f.truncate(data.rfind(b"\n") + 1)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, result: dict[str, Any]) -> None:
+        with self._lock:
+            self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._record(result)
+
+    def _record(self, result: dict[str, Any]) -> None:
+        if result.get("status") in self.retry:
+            self.done.discard(result["id"])
+        else:
+            self.done.add(result["id"])
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def load_tasks(path: str) -> list[Task]:
+    tasks: list[Task] = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "prompt" not in record:
+                raise ValueError(f"{path}:{line_number}: task has no prompt")
+            tasks.append(
+                {
+                    "id": str(record.get("id", line_number)),
+                    "prompt": record["prompt"],
+                    "working_dir": record.get("working_dir", WORKING_DIR),
+                }
+            )
+    return tasks
+
+
+class WrittenFiles:
+    """
+    Files written by the tasks of one batch run. Tasks write their edits one
+    at a time. A task whose edits touch a file another task wrote after it
+    started would overwrite edits it never saw, so its edits are not written
+    and its result reports the conflict instead.
+    """
+
+    def __init__(self):
+        self._writers: dict[str, tuple[int, str]] = {}  # path -> (commit, task id)
+        self._commits = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> int:
+        """Mark to pass to commit() for a task that starts now."""
+        with self._lock:
+            return self._commits
+
+    def commit(
+        self, task_id: str, workspace: Workspace, started: int
+    ) -> tuple[list[str], dict[str, str]]:
+        """
+        Write the task's overlay to disk unless another task wrote one of
+        its files since `started`. Returns the files written, and the files
+        in conflict with the id of the task that wrote each.
+        """
+        with self._lock:
+            conflicts = {}
+            for path in sorted(workspace.files):
+                writer = self._writers.get(os.path.join(workspace.root, path))
+                if writer is not None and writer[0] > started:
+                    conflicts[path] = writer[1]
+            if conflicts:
+                return [], conflicts
+            self._commits += 1
+            written = workspace.commit()
+            for path in written:
+                self._writers[os.path.join(workspace.root, path)] = (
+                    self._commits,
+                    task_id,
+                )
+            return written, {}
+
+
+def run_task(
+    client: genai.Client,
+    task: Task,
+    quota: SharedQuota,
+    snapshot: str = "outline",
+    written_files: Optional[WrittenFiles] = None,
+) -> dict[str, Any]:
+    """
+    Run one task to completion and return its result record. Edits go to an
+    overlay and are written to disk only if the task finishes with a final
+    answer, and no other task of `written_files` has written the same files
+    meanwhile. Raises QuotaExhausted if the batch budget runs out first, so
+    the task is left for the next run.
+    """
+    start_time = time.monotonic()
+    if written_files is None:
+        written_files = WrittenFiles()
+    started = written_files.start()
+    workspace_snapshot = None
+    if snapshot != "off":
+        workspace_snapshot = build_workspace_snapshot(
+            task["working_dir"], outline=snapshot == "outline"
+        )
+    messages = [
+        genai.types.Content(
+            role="user",
+            parts=[
+                genai.types.Part(
+                    text=build_system_prompt(workspace_snapshot, task=task["prompt"])
+                )
+            ],
+        ),
+        genai.types.Content(role="user", parts=[genai.types.Part(text=task["prompt"])]),
+    ]
+    state: dict[str, Any] = {}
+    guard = LoopGuard(state)
+    workspace = Workspace(task["working_dir"], overlay=True)
+
+    status = "max_iters"
+    final_response = None
+    error = None
+    conflicts: dict[str, str] = {}
+    iterations = 0
+    try:
+        for iterations in range(1, MAX_ITERS + 1):
+            quota.acquire()
+            before = _tokens(state)
+            try:
+                # Hedged duplicates of the request are charged to the quota too
+                response_text = request_model_response(
+                    client, messages, False, state, quota=quota
+                )
+            finally:
+                quota.add_tokens(_tokens(state) - before)
+            final_response = process_model_turn(
+                response_text, messages, False, state, guard, workspace
+            )
+            if final_response is not None:
+                status = "done"
+                files_written, conflicts = written_files.commit(
+                    task["id"], workspace, started
+                )
+                if conflicts:
+                    status = "conflict"
+                    error = "edited files other tasks wrote meanwhile: " + ", ".join(
+                        f"{path} ({task_id})" for path, task_id in conflicts.items()
+                    )
+                break
+        else:
+            files_written = []
+    except NoProgressError as e:
+        status, error, files_written = "no_progress", str(e), []
+    except QuotaExhausted:
+        raise
+    except Exception as e:
+        status, error, files_written = "error", str(e), []
+    finally:
+        workspace.close()
+
+    usage = state.get("usage", {})
+    return {
+        "id": task["id"],
+        "status": status,
+        "final_response": final_response,
+        "error": error,
+        "files_written": files_written,
+        "conflicts": conflicts,
+        "iterations": iterations,
+        "requests": usage.get("requests", 0),
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "response_tokens": usage.get("response_tokens", 0),
+        "seconds": round(time.monotonic() - start_time, 3),
+    }
+
+
+def run_batch(
+    client: genai.Client,
+    tasks: list[Task],
+    output: str,
+    workers: int,
+    quota: SharedQuota,
+    snapshot: str = "outline",
+    retry: frozenset[str] = RETRIED_STATUSES,
+) -> dict[str, int]:
+    """
+    Run every task not yet finished in `output`, including those whose
+    latest status is in `retry`; returns a count per status.
+    """
+    log = ResultLog(output, retry)
+    written_files = WrittenFiles()
+    pending = [task for task in tasks if task["id"] not in log.done]
+    finished = set()
+    counts: dict[str, int] = {"skipped": len(tasks) - len(pending)}
+    counts_lock = threading.Lock()
+    stop = threading.Event()
+
+    def work(task: Task) -> None:
+        if stop.is_set():
+            return
+        try:
+            result = run_task(client, task, quota, snapshot, written_files)
+        except QuotaExhausted as e:
+            if not stop.is_set():
+                print(f"Stopping batch: {e}", file=sys.stderr)
+            stop.set()
+            status = "not_run"
+        else:
+            log.write(result)
+            status = result["status"]
+            finished.add(task["id"])
+            print(
+                f"[{len(log.done)}/{len(tasks)}] {task['id']}: {status} after "
+                f"{result['iterations']} iterations ({result['seconds']}s)",
+                file=sys.stderr,
+            )
+        with counts_lock:
+            counts[status] = counts.get(status, 0) + 1
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(work, pending))
+    finally:
+        log.close()
+    # Tasks cut off by the quota, or never started once it ran out
+    not_run = sum(1 for task in pending if task["id"] not in finished)
+    counts.pop("not_run", None)
+    if not_run:
+        counts["not_run"] = not_run
+    return counts
+
+
+def _tokens(state: dict[str, Any]) -> int:
+    usage = state.get("usage", {})
+    return usage.get("prompt_tokens", 0) + usage.get("response_tokens", 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run many agent tasks from a JSONL file"
+    )
+    parser.add_argument(
+        "tasks", help='JSONL file, one {"id": ..., "prompt": ...} object per line'
+    )
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="JSONL file for results; tasks already in it are skipped",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Tasks run at once")
+    parser.add_argument(
+        "--max-requests", type=int, help="Model requests allowed for the whole batch"
+    )
+    parser.add_argument(
+        "--max-tokens", type=int, help="Prompt plus response tokens for the whole batch"
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=BATCH_REQUESTS_PER_MINUTE,
+        help=f"Requests per minute across all workers (default: {BATCH_REQUESTS_PER_MINUTE})",
+    )
+    parser.add_argument(
+        "--snapshot", choices=["outline", "tree", "off"], default="outline"
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Also rerun tasks that hit the iteration limit or stopped making "
+        "progress (tasks that failed with an error or a conflict are always rerun)",
+    )
+    args = parser.parse_args()
+
+    client = create_client()
+    quota = SharedQuota(args.max_requests, args.max_tokens, args.rpm)
+    try:
+        counts = run_batch(
+            client,
+            load_tasks(args.tasks),
+            args.output,
+            args.workers,
+            quota,
+            args.snapshot,
+            FAILED_STATUSES if args.retry_failed else RETRIED_STATUSES,
+        )
+    except KeyboardInterrupt:
+        print("\nInterrupted. Run the same command again to resume.", file=sys.stderr)
+        sys.exit(130)
+
+    print(
+        ", ".join(f"{status}: {count}" for status, count in sorted(counts.items()))
+        + f" (requests: {quota.requests}, tokens: {quota.tokens})"
+    )
+    if counts.get("not_run") or any(counts.get(s) for s in RETRIED_STATUSES):
+        print(
+            "Run the same command again to resume; tasks that failed with an "
+            "error or a conflict are retried.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
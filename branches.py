@@ -0,0 +1,178 @@
+import copy
+import threading
+from typing import Any, Callable, Optional, TypedDict
+
+from google import genai
+
+from config import BRANCH_MAX_CALLS, MAX_ITERS, WORKING_DIR
+from functions.run_tests import run_tests
+from functions.workspace import Workspace
+from loop_guard import LoopGuard, NoProgressError
+from parse_response import process_model_response
+from prompts import available_functions
+
+EDITING_FUNCTIONS = {"write_file"}
+
+
+class BranchResult(TypedDict):
+    branch: int
+    final_response: str
+    messages: list[genai.types.Content]
+    state: dict[str, Any]
+    workspace: Workspace
+    verification: str
+
+
+class CallBudget:
+    """
+    Model calls shared by all branches, so racing N of them cannot cost more
+    than a fixed number of requests in total.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+
+def iteration_delay(iteration: int) -> float:
+    return 5 + iteration * 2
+
+
+def starts_editing(response_text: str) -> bool:
+    """True once the model moves from investigating to changing files."""
+    parsed = process_model_response(response_text, available_functions)
+    return (
+        parsed["type"] == "function_call"
+        and parsed["valid"]
+        and any(call["function"] in EDITING_FUNCTIONS for call in parsed["content"])
+    )
+
+
+def explore_branches(
+    client: genai.Client,
+    messages: list[genai.types.Content],
+    state: dict[str, Any],
+    first_response: str,
+    count: int,
+    start: int,
+    request: Callable[..., str],
+    process: Callable[..., Optional[str]],
+    max_calls: int = BRANCH_MAX_CALLS,
+    working_directory: str = WORKING_DIR,
+) -> tuple[Optional[BranchResult], list[str]]:
+    """
+    Continue the conversation in `count` branches at once, each editing its
+    own overlay of the working directory. Branch 0 carries on with `first_response`;
+    the others ask the model again, so each starts from its own attempt.
+
+    A branch finishes when it gives a final answer and its overlay passes
+    the tests. The first one to finish wins and the others are cancelled.
+    Returns the winner, if any, and one line per branch saying how it ended.
+    """
+    budget = CallBudget(max_calls)
+    cancelled = threading.Event()
+    lock = threading.Lock()
+    winner: list[BranchResult] = []
+    outcomes = [""] * count
+
+    def claim(result: BranchResult) -> bool:
+        with lock:
+            if winner:
+                return False
+            winner.append(result)
+            cancelled.set()
+            return True
+
+    def run_branch(branch: int) -> None:
+        branch_messages = list(messages)
+        branch_state = copy.deepcopy(state)
+        workspace = Workspace(
+            working_directory,
+            overlay=True,
+            files=branch_state.setdefault("overlay_files", {}),
+        )
+        guard = LoopGuard(branch_state)
+        pending = first_response if branch == 0 else None
+        won = False
+        try:
+            for i in range(start, MAX_ITERS):
+                if cancelled.is_set():
+                    outcomes[branch] = f"cancelled after {i - start} turns"
+                    return
+                if pending is not None:
+                    response_text, pending = pending, None
+                elif budget.take():
+                    response_text = request(
+                        client, branch_messages, False, branch_state
+                    )
+                else:
+                    outcomes[branch] = "stopped: shared call budget used up"
+                    return
+
+                final_response = process(
+                    response_text,
+                    branch_messages,
+                    False,
+                    branch_state,
+                    guard,
+                    workspace,
+                )
+                if final_response is not None:
+                    verification = run_tests(workspace, scope="all")
+                    if verification.startswith(("OK", "No test files")):
+                        won = claim(
+                            {
+                                "branch": branch,
+                                "final_response": final_response,
+                                "messages": branch_messages,
+                                "state": branch_state,
+                                "workspace": workspace,
+                                "verification": verification,
+                            }
+                        )
+                        outcomes[branch] = (
+                            f"won after {i - start + 1} turns"
+                            if won
+                            else "passed, but another branch won first"
+                        )
+                        return
+                    feedback = (
+                        f"Your changes do not pass the tests yet:\n{verification}"
+                        "\n\nKeep working on the fix."
+                    )
+                    branch_messages.append(
+                        genai.types.Content(
+                            role="user", parts=[genai.types.Part(text=feedback)]
+                        )
+                    )
+                # Same pacing as the main loop, but cancellation ends the wait
+                cancelled.wait(iteration_delay(i))
+            outcomes[branch] = f"gave up: maximum iterations ({MAX_ITERS}) reached"
+        except NoProgressError as e:
+            outcomes[branch] = f"gave up: {e}"
+        except Exception as e:
+            outcomes[branch] = f"failed: {e}"
+        finally:
+            if not won:
+                workspace.close()
+
+    threads = [
+        threading.Thread(target=run_branch, args=(branch,), name=f"branch-{branch}")
+        for branch in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = [f"Branch {branch}: {outcome}" for branch, outcome in enumerate(outcomes)]
+    report.append(f"Model calls used by all branches: {budget.used}/{max_calls}")
+    return (winner[0] if winner else None), report
@@ -0,0 +1,223 @@
+"""
+Calculator benchmark suite and regression gate.
+
+Runs every case (short, long chain, precedence-heavy, error paths) in every
+mode (single-call, cached tokens, batch plan, streaming JSON Lines) and
+reports the best-of-N time per expression. Results can be written as JSON and
+compared against a stored baseline; any case slower than the baseline by more
+than the threshold makes the script exit with status 1.
+
+    python bench_calculator.py                      # compare with baseline
+    python bench_calculator.py --update-baseline    # record a new baseline
+    python bench_calculator.py --output results.json --threshold 0.5
+
+Baselines are machine-specific: record one on the machine you compare on.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+from pkg.calculator import Calculator
+from pkg.optimizer import compile_batch
+from pkg.render import JsonLinesWriter
+from pkg.tokenizer import tokenize
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json"
+)
+ERRORS = (ValueError, ArithmeticError)
+
+
+def build_cases(scale):
+    chain = " + ".join(str(i % 9 + 1) for i in range(2000 * scale))
+    precedence = (
+        " ".join(f"{i % 9 + 1} {'*/+-'[i % 4]}" for i in range(1000 * scale)) + " 1"
+    )
+    return {
+        "short": ["3 + 5", "10 - 4", "3 * 4 + 5", "2 * 3 - 8 / 2 + 5"] * 25 * scale,
+        "long_chain": [chain] * 5,
+        "precedence": [precedence] * 5,
+        "errors": ["+ 3", "$ 3 5", "1 / 0", "3 5", "2 * * 4"] * 20 * scale,
+    }
+
+
+def run_single(calculator, expressions):
+    def run():
+        for expression in expressions:
+            try:
+                calculator.evaluate(expression)
+            except ERRORS:
+                pass
+
+    return run
+
+
+def run_cached(calculator, expressions):
+    # Tokenize once up front; only evaluation is timed
+    prepared = []
+    for expression in expressions:
+        try:
+            prepared.append(tokenize(expression))
+        except ERRORS as e:
+            prepared.append(e)
+
+    def run():
+        for tokens in prepared:
+            try:
+                if isinstance(tokens, Exception):
+                    raise tokens
+                calculator._evaluate_infix(tokens)
+            except ERRORS:
+                pass
+
+    return run
+
+
+def run_batch(calculator, expressions):
+    def run():
+        try:
+            compile_batch(expressions, calculator).evaluate()
+        except ERRORS:
+            # One bad expression fails the whole plan; fall back per expression
+            for expression in expressions:
+                try:
+                    compile_batch([expression], calculator).evaluate()
+                except ERRORS:
+                    pass
+
+    return run
+
+
+def run_streaming(calculator, expressions):
+    def run():
+        with JsonLinesWriter(io.BytesIO()) as writer:
+            for expression in expressions:
+                try:
+                    writer.write(expression, calculator.evaluate(expression))
+                except ERRORS:
+                    pass
+
+    return run
+
+
+MODES = {
+    "single": run_single,
+    "cached": run_cached,
+    "batch": run_batch,
+    "streaming": run_streaming,
+}
+
+
+def best_time(run, repeat, min_sample=0.02):
+    # Like timeit's autorange: loop enough times that each sample takes at
+    # least min_sample seconds, then keep the best sample
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        if time.perf_counter() - start >= min_sample:
+            break
+        number *= 2
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run_suite(scale=1, repeat=5):
+    calculator = Calculator()
+    results = {}
+    for case, expressions in build_cases(scale).items():
+        for mode, factory in MODES.items():
+            seconds = best_time(factory(calculator, expressions), repeat)
+            results[f"{case}/{mode}"] = round(seconds / len(expressions) * 1e6, 3)
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        ratio = current / previous
+        status = "SLOWER" if ratio > 1 + threshold else "ok"
+        print(
+            f"{name:>24}: {current:10.2f} us  (baseline {previous:10.2f} us, {ratio:5.2f}x) {status}"
+        )
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calculator benchmark suite")
+    parser.add_argument("--scale", type=int, default=1, help="multiply input sizes")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs per case; best is kept"
+    )
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed slowdown versus baseline before failing (0.25 = 25%%)",
+    )
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run_suite(args.scale, args.repeat)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scale": args.scale,
+        "unit": "microseconds per expression",
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        for name, current in results.items():
+            print(f"{name:>24}: {current:10.2f} us")
+        print("No baseline found; run with --update-baseline to record one.")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("scale") != args.scale:
+        print(f"Warning: baseline was recorded with --scale {baseline.get('scale')}")
+
+    regressions = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(
+            f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}:"
+        )
+        for name in regressions:
+            print(f"- {name}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark for the constant-folding / CSE optimizer on generated formulas.
+
+Generates expressions the way formula generators tend to: a handful of
+recurring products and quotients over a few inputs, plus constant scale
+factors. Compares evaluating each expression with Calculator.evaluate against
+evaluating one shared plan compiled by compile_batch.
+
+    python bench_optimizer.py --expressions 5000 --rounds 20
+"""
+
+import argparse
+import random
+import time
+
+from pkg.calculator import Calculator
+from pkg.optimizer import compile_batch
+
+INPUTS = ["a", "b", "c", "d", "e", "f"]
+
+
+def generate(count, terms, seed):
+    rng = random.Random(seed)
+    pool = [f"{x} {op} {y}" for x in INPUTS for y in INPUTS for op in "*/"]
+    pool = rng.sample(pool, 12)
+    constants = ["2 * 3", "100 / 8", "0.5 * 4 * 2", "7 - 2"]
+
+    expressions = []
+    for _ in range(count):
+        parts = []
+        for _ in range(terms):
+            term = rng.choice(pool)
+            if rng.random() < 0.3:
+                term = f"{rng.choice(constants)} * {term}"
+            parts.append(term)
+        expressions.append(" + ".join(parts))
+    return expressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimizer benchmark")
+    parser.add_argument("--expressions", type=int, default=5000)
+    parser.add_argument("--terms", type=int, default=6)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    calculator = Calculator()
+    expressions = generate(args.expressions, args.terms, args.seed)
+    rng = random.Random(args.seed)
+    scenarios = [
+        {name: rng.uniform(1, 10) for name in INPUTS} for _ in range(args.rounds)
+    ]
+
+    start = time.perf_counter()
+    plan = compile_batch(expressions, calculator)
+    compile_seconds = time.perf_counter() - start
+    stats = plan.stats
+    print(
+        f"{stats.expressions} expressions, {stats.operations} operations: "
+        f"{stats.folded} folded, {stats.deduplicated} deduplicated, "
+        f"{stats.planned} left ({stats.eliminated / stats.operations:.1%} eliminated)"
+    )
+    print(f"compile: {compile_seconds:.3f}s")
+
+    start = time.perf_counter()
+    direct = [[calculator.evaluate(e, v) for e in expressions] for v in scenarios]
+    direct_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    planned = [plan.evaluate(v) for v in scenarios]
+    plan_seconds = time.perf_counter() - start
+
+    if direct != planned:
+        raise SystemExit("plan results differ from Calculator.evaluate")
+    print(f"Calculator.evaluate x{args.rounds}: {direct_seconds:.3f}s")
+    print(f"Plan.evaluate x{args.rounds}: {plan_seconds:.3f}s")
+    print(f"speedup: {direct_seconds / plan_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Throughput benchmark for the JSON renderers.
+
+Compares the original dict + json.dumps(indent=2) path against the current
+format_json_output, the compact and batch renderers, and the streaming
+JSON Lines writer.
+
+    python bench_render.py --count 1000000
+"""
+
+import argparse
+import json
+import os
+import time
+
+from pkg.render import (
+    JsonLinesWriter,
+    format_compact_output,
+    format_json_lines,
+    format_json_output,
+)
+
+
+def dumps_output(expression, result, indent=2):
+    # The original format_json_output, kept here as the reference
+    if isinstance(result, float) and result.is_integer():
+        result = int(result)
+    return json.dumps({"expression": expression, "result": result}, indent=indent)
+
+
+def build_results(count):
+    return [(f"{i} / 8 + {i % 7}", i / 8 + i % 7) for i in range(count)]
+
+
+def timed(label, func, count):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>28}: {elapsed:7.3f}s  {count / elapsed / 1e6:6.2f}M results/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renderer throughput benchmark")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    results = build_results(args.count)
+    count = args.count
+
+    reference = timed(
+        "json.dumps indent=2 (before)",
+        lambda: [dumps_output(e, r) for e, r in results],
+        count,
+    )
+    timings = {
+        "format_json_output": timed(
+            "format_json_output",
+            lambda: [format_json_output(e, r) for e, r in results],
+            count,
+        ),
+        "format_compact_output": timed(
+            "format_compact_output",
+            lambda: [format_compact_output(e, r) for e, r in results],
+            count,
+        ),
+        "format_json_lines": timed(
+            "format_json_lines", lambda: format_json_lines(results), count
+        ),
+    }
+
+    with open(os.devnull, "wb") as devnull:
+
+        def stream():
+            with JsonLinesWriter(devnull) as writer:
+                writer.write_many(results)
+
+        timings["JsonLinesWriter"] = timed("JsonLinesWriter -> devnull", stream, count)
+
+    print()
+    for label, elapsed in timings.items():
+        print(f"{label:>28}: {reference / elapsed:5.1f}x faster than before")
+
+
+if __name__ == "__main__":
+    main()
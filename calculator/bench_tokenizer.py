@@ -0,0 +1,119 @@
+"""
+Peak-RSS benchmark for the expression tokenizer.
+
+Each measurement runs in a fresh interpreter so the numbers are not polluted by
+earlier runs. "split" reproduces the original whitespace-split tokenizer with
+list-based stacks; "scanner" goes through Calculator.evaluate.
+
+    python bench_tokenizer.py --terms 500000
+"""
+
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from pkg.calculator import Calculator
+
+
+def build_expression(terms):
+    # Written through StringIO so building the input does not itself leave a
+    # list of a million small strings behind in the peak RSS.
+    operators = "+-*/"
+    buffer = io.StringIO()
+    buffer.write("1.5")
+    for i in range(1, terms):
+        buffer.write(f" {operators[i % 4]} {i % 97 + 1}")
+    return buffer.getvalue()
+
+
+def split_evaluate(calculator, expression):
+    # The original implementation, kept here as the "before" reference
+    tokens = expression.strip().split()
+    values = []
+    operators = []
+
+    def apply_operator():
+        operator = operators.pop()
+        b = values.pop()
+        a = values.pop()
+        values.append(calculator.operators[operator](a, b))
+
+    for token in tokens:
+        if token in calculator.operators:
+            while (
+                operators
+                and calculator.precedence[operators[-1]] >= calculator.precedence[token]
+            ):
+                apply_operator()
+            operators.append(token)
+        else:
+            values.append(float(token))
+
+    while operators:
+        apply_operator()
+    return values[0]
+
+
+def measure(mode, terms):
+    expression = build_expression(terms)
+    calculator = Calculator()
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    if mode == "split":
+        result = split_evaluate(calculator, expression)
+    else:
+        result = calculator.evaluate(expression)
+    elapsed = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "mode": mode,
+        "terms": terms,
+        "result": result,
+        "seconds": round(elapsed, 4),
+        "peak_rss_kb": peak_kb,
+        "evaluate_rss_kb": peak_kb - baseline_kb,
+    }
+
+
+def run_child(mode, terms):
+    completed = subprocess.run(
+        [sys.executable, __file__, "--child", mode, "--terms", str(terms)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokenizer memory benchmark")
+    parser.add_argument("--terms", type=int, default=500_000)
+    parser.add_argument("--child", choices=["split", "scanner"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.terms)))
+        return
+
+    before = run_child("split", args.terms)
+    after = run_child("scanner", args.terms)
+    for run in (before, after):
+        print(
+            f"{run['mode']:>8}: {run['evaluate_rss_kb'] / 1024:8.1f} MiB above baseline, "
+            f"peak {run['peak_rss_kb'] / 1024:8.1f} MiB, {run['seconds']:.3f}s"
+        )
+    if before["result"] != after["result"]:
+        print("WARNING: results differ", before["result"], after["result"])
+    if after["evaluate_rss_kb"]:
+        ratio = before["evaluate_rss_kb"] / after["evaluate_rss_kb"]
+        print(f"peak RSS growth reduced {ratio:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
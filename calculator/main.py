@@ -1,7 +1,7 @@
 import sys
 
 from pkg.calculator import Calculator
-from pkg.render import format_json_output
+from pkg.render import JsonLinesWriter, format_json_output
 
 
 def main():
@@ -10,6 +10,11 @@ def main():
         print("Calculator App")
         print('Usage: python main.py "<expression>"')
         print('Example: python main.py "3 + 5"')
+        print("Batch:   python main.py - < expressions.txt")
+        return
+
+    if sys.argv[1:] == ["-"]:
+        evaluate_stream(calculator, sys.stdin, sys.stdout.buffer)
         return
 
     expression = " ".join(sys.argv[1:])
@@ -24,5 +29,19 @@ def main():
         print(f"Error: {e}")
 
 
+def evaluate_stream(calculator, lines, output):
+    # One expression per input line, one compact JSON object per output line
+    with JsonLinesWriter(output) as writer:
+        for line in lines:
+            expression = line.strip()
+            if not expression:
+                continue
+            try:
+                writer.write(expression, calculator.evaluate(expression))
+            except Exception as e:
+                writer.flush()
+                print(f"Error: {expression}: {e}", file=sys.stderr)
+
+
 if __name__ == "__main__":
     main()
@@ -1,3 +1,8 @@
+from array import array
+
+from pkg.tokenizer import NAME, NUMBER, SYMBOLS, tokenize
+
+
 class Calculator:
     def __init__(self):
         self.operators = {
@@ -13,30 +18,31 @@ class Calculator:
             "/": 2,
         }
 
-    def evaluate(self, expression):
+    def evaluate(self, expression, variables=None):
         if not expression or expression.isspace():
             return None
-        tokens = expression.strip().split()
-        return self._evaluate_infix(tokens)
-
-    def _evaluate_infix(self, tokens):
-        values = []
-        operators = []
-
-        for token in tokens:
-            if token in self.operators:
-                while (
-                    operators
-                    and operators[-1] in self.operators
-                    and self.precedence[operators[-1]] >= self.precedence[token]
-                ):
-                    self._apply_operator(operators, values)
-                operators.append(token)
-            else:
-                try:
-                    values.append(float(token))
-                except ValueError:
-                    raise ValueError(f"invalid token: {token}")
+        tokens = tokenize(expression)
+        return self._evaluate_infix(tokens, variables)
+
+    def _evaluate_infix(self, tokens, variables=None):
+        values = array("d")
+        operators = array("b")
+        # Indexed by opcode, so the loop never has to look up a symbol
+        precedence = [0] + [self.precedence[symbol] for symbol in SYMBOLS[1:]]
+        operands = iter(tokens.operands)
+        names = iter(tokens.names)
+
+        for opcode in tokens.opcodes:
+            if opcode == NUMBER:
+                values.append(next(operands))
+                continue
+            if opcode == NAME:
+                values.append(self._lookup(next(names), variables))
+                continue
+
+            while operators and precedence[operators[-1]] >= precedence[opcode]:
+                self._apply_operator(operators, values)
+            operators.append(opcode)
 
         while operators:
             self._apply_operator(operators, values)
@@ -46,11 +52,19 @@ class Calculator:
 
         return values[0]
 
+    def _lookup(self, name, variables):
+        if variables is None:
+            raise ValueError(f"invalid token: {name}")
+        try:
+            return variables[name]
+        except KeyError:
+            raise ValueError(f"undefined name: {name}")
+
     def _apply_operator(self, operators, values):
         if not operators:
             return
 
-        operator = operators.pop()
+        operator = SYMBOLS[operators.pop()]
         if len(values) < 2:
             raise ValueError(f"not enough operands for operator {operator}")
 
@@ -0,0 +1,181 @@
+from array import array
+
+from pkg.calculator import Calculator
+from pkg.tokenizer import NAME, NUMBER, SYMBOLS, tokenize
+
+# IEEE addition and multiplication are commutative, so their operands can be
+# put in a canonical order without changing any result. Reassociation is not
+# exact, so nothing else is reordered.
+_COMMUTATIVE = {SYMBOLS.index("+"), SYMBOLS.index("*")}
+
+
+class PlanStats:
+    def __init__(self):
+        self.expressions = 0
+        self.operations = 0  # operators in the source expressions
+        self.folded = 0  # operations computed at compile time
+        self.deduplicated = 0  # operations shared with an earlier identical one
+
+    @property
+    def planned(self):
+        return self.operations - self.eliminated
+
+    @property
+    def eliminated(self):
+        return self.folded + self.deduplicated
+
+    def __repr__(self):
+        return (
+            f"PlanStats(expressions={self.expressions}, operations={self.operations}, "
+            f"planned={self.planned}, folded={self.folded}, "
+            f"deduplicated={self.deduplicated})"
+        )
+
+
+class Plan:
+    """
+    Shared evaluation plan for a batch of expressions.
+
+    Every distinct value the batch needs lives in one slot: constants are
+    filled in at compile time, names are loaded from the variables passed to
+    evaluate, and each remaining operation runs exactly once, in an order
+    where its operands are always ready.
+
+    Values are doubles throughout, as on the calculator's value stack:
+    literals are parsed as floats, folding operates on those, and variables
+    are converted as they are loaded. A plan thus gives exactly the values,
+    and types, Calculator.evaluate gives.
+    """
+
+    def __init__(self, calculator):
+        self.calculator = calculator
+        self.stats = PlanStats()
+        self.outputs = []
+        self.instructions = []  # (opcode, left slot, right slot, target slot)
+        self._slots = []
+        self._names = []  # (slot, name)
+        self._interned = {}
+        self._precedence = [0] + [calculator.precedence[s] for s in SYMBOLS[1:]]
+
+    def evaluate(self, variables=None):
+        """Return one result per compiled expression (None for empty ones)."""
+        slots = self._slots.copy()
+        lookup = self.calculator._lookup
+        # Converted the way the calculator's array("d") stack converts them
+        values = array("d", [lookup(name, variables) for _, name in self._names])
+        for (slot, _), value in zip(self._names, values):
+            slots[slot] = value
+
+        functions = [None] + [self.calculator.operators[s] for s in SYMBOLS[1:]]
+        for opcode, left, right, target in self.instructions:
+            slots[target] = functions[opcode](slots[left], slots[right])
+
+        return [None if slot is None else slots[slot] for slot in self.outputs]
+
+    def _add(self, expression):
+        self.stats.expressions += 1
+        if not expression or expression.isspace():
+            self.outputs.append(None)
+            return
+
+        precedence = self._precedence
+        tokens = tokenize(expression)
+        values = []
+        operators = []
+        operands = iter(tokens.operands)
+        names = iter(tokens.names)
+
+        for opcode in tokens.opcodes:
+            if opcode == NUMBER:
+                values.append(self._constant(next(operands)))
+                continue
+            if opcode == NAME:
+                values.append(self._name(next(names)))
+                continue
+
+            self.stats.operations += 1
+            while operators and precedence[operators[-1]] >= precedence[opcode]:
+                self._reduce(operators, values)
+            operators.append(opcode)
+
+        while operators:
+            self._reduce(operators, values)
+
+        if len(values) != 1:
+            raise ValueError("invalid expression")
+        self.outputs.append(values[0])
+
+    def _reduce(self, operators, values):
+        opcode = operators.pop()
+        if len(values) < 2:
+            raise ValueError(f"not enough operands for operator {SYMBOLS[opcode]}")
+
+        right = values.pop()
+        left = values.pop()
+        values.append(self._operation(opcode, left, right))
+
+    def _constant(self, value):
+        # Keyed by the exact bit pattern so 0.0 and -0.0 stay distinct
+        key = ("const", value.hex())
+        slot = self._interned.get(key)
+        if slot is None:
+            slot = self._interned[key] = len(self._slots)
+            self._slots.append(value)
+        return slot
+
+    def _name(self, name):
+        key = ("name", name)
+        slot = self._interned.get(key)
+        if slot is None:
+            slot = self._interned[key] = len(self._slots)
+            self._slots.append(None)
+            self._names.append((slot, name))
+        return slot
+
+    def _operation(self, opcode, left, right):
+        if opcode in _COMMUTATIVE and right < left:
+            left, right = right, left
+
+        key = (opcode, left, right)
+        slot = self._interned.get(key)
+        if slot is not None:
+            if self._slots[slot] is None:
+                self.stats.deduplicated += 1
+            else:
+                self.stats.folded += 1
+            return slot
+
+        constants = self._interned_constants(left, right)
+        if constants is not None:
+            try:
+                value = self.calculator.operators[SYMBOLS[opcode]](*constants)
+            except ArithmeticError:
+                # Leave it for evaluate, so the error surfaces at run time
+                pass
+            else:
+                self.stats.folded += 1
+                slot = self._interned[key] = self._constant(value)
+                return slot
+
+        slot = self._interned[key] = len(self._slots)
+        self._slots.append(None)
+        self.instructions.append((opcode, left, right, slot))
+        return slot
+
+    def _interned_constants(self, left, right):
+        a = self._slots[left]
+        b = self._slots[right]
+        if a is None or b is None:
+            return None
+        return a, b
+
+
+def compile_batch(expressions, calculator=None):
+    """
+    Compile expressions into one Plan, folding constant subexpressions and
+    sharing identical ones across the whole batch.
+    """
+    plan = Plan(calculator or Calculator())
+    for expression in expressions:
+        plan._add(expression)
+    return plan
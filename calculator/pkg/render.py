@@ -1,7 +1,18 @@
 import json
+from json.encoder import encode_basestring_ascii
+
+_INFINITY = float("inf")
 
 
 def format_json_output(expression: str, result: float, indent: int = 2) -> str:
+    if indent == 2:
+        # Same text json.dumps(..., indent=2) produces, without the dict and
+        # encoder setup per call
+        return (
+            f'{{\n  "expression": {encode_basestring_ascii(expression)},\n'
+            f'  "result": {_format_number(result)}\n}}'
+        )
+
     if isinstance(result, float) and result.is_integer():
         result_to_dump = int(result)
     else:
@@ -12,3 +23,83 @@ def format_json_output(expression: str, result: float, indent: int = 2) -> str:
         "result": result_to_dump,
     }
     return json.dumps(output_data, indent=indent)
+
+
+def format_compact_output(expression: str, result: float) -> str:
+    """Single-line JSON with no insignificant whitespace."""
+    return _json_line(expression, result)[:-1]
+
+
+def format_json_lines(results) -> str:
+    """Render many (expression, result) pairs as JSON Lines in one call."""
+    return "".join([_json_line(expression, result) for expression, result in results])
+
+
+class JsonLinesWriter:
+    """
+    Streams compact JSON Lines to a binary stream.
+
+    Lines are accumulated in one reusable bytearray and handed to the stream
+    whenever it grows past buffer_size, so the caller never holds more than
+    one chunk of output in memory.
+    """
+
+    def __init__(self, stream, buffer_size: int = 64 * 1024):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+
+    def write(self, expression: str, result: float) -> None:
+        self._buffer += _json_line(expression, result).encode("ascii")
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_many(self, results) -> None:
+        buffer = self._buffer
+        buffer_size = self.buffer_size
+        for expression, result in results:
+            buffer += _json_line(expression, result).encode("ascii")
+            if len(buffer) >= buffer_size:
+                self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self.stream.write(self._buffer)
+            # Truncating in place keeps the bytearray object for the next chunk
+            del self._buffer[:]
+        if hasattr(self.stream, "flush"):
+            self.stream.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _json_line(expression: str, result: float) -> str:
+    return (
+        f'{{"expression":{encode_basestring_ascii(expression)},'
+        f'"result":{_format_number(result)}}}\n'
+    )
+
+
+def _format_number(result: float) -> str:
+    # Whole floats are written as integers, as format_json_output always has.
+    # Non-finite values use the same spelling as json.dumps.
+    if isinstance(result, float):
+        if result != result:
+            return "NaN"
+        if result == _INFINITY:
+            return "Infinity"
+        if result == -_INFINITY:
+            return "-Infinity"
+        if result.is_integer():
+            return int(result).__repr__()
+        return result.__repr__()
+    if type(result) is int:
+        return result.__repr__()
+    return json.dumps(result)
@@ -0,0 +1,173 @@
+from collections import defaultdict, deque
+
+from pkg.calculator import Calculator
+from pkg.tokenizer import tokenize
+
+
+class Sheet:
+    """
+    Named expressions that can reference each other, like cells in a sheet.
+
+    The sheet keeps a dependency DAG between names. Changing a formula only
+    re-evaluates that name and the names downstream of it, in topological
+    order, so an update costs O(affected names) rather than O(all names).
+    """
+
+    def __init__(self, calculator=None):
+        self.calculator = calculator or Calculator()
+        self._formulas = {}
+        self._tokens = {}
+        self._depends_on = {}
+        self._dependents = defaultdict(set)
+        self._values = {}
+        self._errors = {}
+        # Number of names evaluated by the most recent update
+        self.last_recalculated = 0
+
+    def __contains__(self, name):
+        return name in self._formulas
+
+    def __len__(self):
+        return len(self._formulas)
+
+    def __getitem__(self, name):
+        if name not in self._formulas:
+            raise KeyError(name)
+        if name in self._errors:
+            raise ValueError(f"{name}: {self._errors[name]}")
+        return self._values[name]
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except (KeyError, ValueError):
+            return default
+
+    def formula(self, name):
+        return self._formulas[name]
+
+    def set(self, name, formula):
+        self.update({name: formula})
+
+    def update(self, formulas):
+        """
+        Define or replace several names at once.
+
+        All downstream names are recomputed once, however many of their inputs
+        changed. Raises ValueError, leaving the sheet untouched, if a name is
+        invalid, a formula does not tokenize, or the change creates a cycle.
+        """
+        compiled = {}
+        for name, formula in formulas.items():
+            if not isinstance(name, str) or not name.isidentifier():
+                raise ValueError(f"invalid name: {name!r}")
+            formula = str(formula)
+            if not formula or formula.isspace():
+                raise ValueError(f"empty formula for {name}")
+            compiled[name] = (formula, tokenize(formula))
+
+        new_depends_on = {
+            name: set(tokens.names) for name, (_, tokens) in compiled.items()
+        }
+        cycle = self._find_cycle(new_depends_on)
+        if cycle:
+            raise ValueError(f"circular reference: {' -> '.join(cycle)}")
+
+        for name, (formula, tokens) in compiled.items():
+            for dependency in self._depends_on.get(name, ()):
+                self._dependents[dependency].discard(name)
+            for dependency in new_depends_on[name]:
+                self._dependents[dependency].add(name)
+            self._formulas[name] = formula
+            self._tokens[name] = tokens
+            self._depends_on[name] = new_depends_on[name]
+
+        self._recalculate(compiled)
+
+    def _find_cycle(self, new_depends_on):
+        """
+        A cycle the new formulas would create, as names each depending on the
+        next, or None. The sheet is acyclic before the change, so a cycle has
+        to run through a changed name and lies entirely downstream of it; the
+        search only visits the names an update would recalculate.
+        """
+        added = defaultdict(list)
+        for name, dependencies in new_depends_on.items():
+            for dependency in dependencies:
+                added[dependency].append(name)
+
+        def dependents(node):
+            for dependent in self._dependents.get(node, ()):
+                if dependent not in new_depends_on:
+                    yield dependent
+            yield from added.get(node, ())
+
+        # Iterative depth-first search downstream, with parent pointers to
+        # rebuild the cycle only once one is found
+        parent = {}
+        on_path = set()
+        finished = set()
+        for start in new_depends_on:
+            if start in finished:
+                continue
+            parent[start] = None
+            on_path.add(start)
+            stack = [(start, dependents(start))]
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    on_path.discard(node)
+                    finished.add(node)
+                elif child in on_path:
+                    cycle = [child]
+                    while node != child:
+                        cycle.append(node)
+                        node = parent[node]
+                    cycle.append(child)
+                    return cycle
+                elif child not in finished:
+                    parent[child] = node
+                    on_path.add(child)
+                    stack.append((child, dependents(child)))
+        return None
+
+    def _recalculate(self, changed):
+        affected = set(changed)
+        queue = deque(changed)
+        while queue:
+            for dependent in self._dependents.get(queue.popleft(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    queue.append(dependent)
+
+        # Kahn's algorithm restricted to the affected subgraph
+        pending = {
+            name: sum(1 for d in self._depends_on[name] if d in affected)
+            for name in affected
+        }
+        ready = deque(name for name, count in pending.items() if count == 0)
+        while ready:
+            name = ready.popleft()
+            self._evaluate(name)
+            for dependent in self._dependents.get(name, ()):
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+
+        self.last_recalculated = len(affected)
+
+    def _evaluate(self, name):
+        self._values.pop(name, None)
+        self._errors.pop(name, None)
+        for dependency in self._depends_on[name]:
+            if dependency in self._errors:
+                self._errors[name] = f"depends on {dependency}, which failed"
+                return
+        try:
+            self._values[name] = self.calculator._evaluate_infix(
+                self._tokens[name], self._values
+            )
+        except (ValueError, ArithmeticError) as e:
+            self._errors[name] = str(e)
@@ -0,0 +1,206 @@
+from array import array
+
+# Opcodes stored in Tokens.opcodes. Every NUMBER opcode consumes the next
+# entry of Tokens.operands and every NAME the next entry of Tokens.names;
+# operator opcodes index into SYMBOLS.
+NUMBER = 0
+NAME = -1
+SYMBOLS = ("", "+", "-", "*", "/")
+OPCODES = {symbol: opcode for opcode, symbol in enumerate(SYMBOLS) if symbol}
+
+_DIGITS = {digit: value for value, digit in enumerate("0123456789")}
+
+# Decimal mantissas below 2**53 scaled by an exact power of ten (10**22 is the
+# largest one a double holds exactly) round the same way float() does.
+_MAX_EXACT_MANTISSA = 2**53
+_MAX_EXACT_SCALE = 22
+
+
+class Tokens:
+    """Compact token stream: one byte per token plus one double per number."""
+
+    __slots__ = ("opcodes", "operands", "names")
+
+    def __init__(self):
+        self.opcodes = array("b")
+        self.operands = array("d")
+        self.names = []
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def __iter__(self):
+        operands = iter(self.operands)
+        names = iter(self.names)
+        for opcode in self.opcodes:
+            if opcode == NUMBER:
+                yield next(operands)
+            elif opcode == NAME:
+                yield next(names)
+            else:
+                yield SYMBOLS[opcode]
+
+
+def tokenize(expression):
+    """
+    Scan an infix expression in a single pass.
+
+    Tokens do not need to be separated by whitespace, so "3+7*2" and
+    "3 + 7 * 2" produce the same stream. A "+" or "-" directly followed by a
+    digit where an operand is expected is read as the sign of that number.
+    Identifiers such as "total_2" become NAME tokens.
+    """
+    tokens = Tokens()
+    append_opcode = tokens.opcodes.append
+    append_operand = tokens.operands.append
+    length = len(expression)
+    expect_operand = True
+    i = 0
+
+    while i < length:
+        char = expression[i]
+        if char == " " or char.isspace():
+            i += 1
+            continue
+
+        opcode = OPCODES.get(char)
+        if opcode is not None:
+            if not (
+                expect_operand and char in "+-" and _starts_number(expression, i + 1)
+            ):
+                append_opcode(opcode)
+                expect_operand = True
+                i += 1
+                continue
+        elif char in _DIGITS:
+            # Fast path for plain integers, by far the most common operand
+            value = 0
+            end = i
+            while end < length:
+                digit = _DIGITS.get(expression[end])
+                if digit is None:
+                    break
+                value = value * 10 + digit
+                end += 1
+            if value < _MAX_EXACT_MANTISSA and (
+                end == length or _is_delimiter(expression[end])
+            ):
+                append_opcode(NUMBER)
+                append_operand(value)
+                expect_operand = False
+                i = end
+                continue
+        elif char == "_" or char.isalpha():
+            name, i = _scan_name(expression, i)
+            if isinstance(name, str):
+                tokens.names.append(name)
+                append_opcode(NAME)
+            else:
+                append_opcode(NUMBER)
+                append_operand(name)
+            expect_operand = False
+            continue
+
+        value, i = _scan_number(expression, i)
+        append_opcode(NUMBER)
+        append_operand(value)
+        expect_operand = False
+
+    return tokens
+
+
+def _starts_number(expression, i):
+    if i >= len(expression):
+        return False
+    char = expression[i]
+    return char in _DIGITS or (
+        char == "." and i + 1 < len(expression) and expression[i + 1] in _DIGITS
+    )
+
+
+def _scan_number(expression, start):
+    length = len(expression)
+    i = start
+    negative = False
+    if expression[i] in "+-":
+        negative = expression[i] == "-"
+        i += 1
+
+    mantissa = 0
+    digits = 0
+    scale = 0
+    while i < length and expression[i] in _DIGITS:
+        mantissa = mantissa * 10 + _DIGITS[expression[i]]
+        digits += 1
+        i += 1
+    if i < length and expression[i] == ".":
+        i += 1
+        while i < length and expression[i] in _DIGITS:
+            mantissa = mantissa * 10 + _DIGITS[expression[i]]
+            digits += 1
+            scale -= 1
+            i += 1
+
+    if digits and i < length and expression[i] in "eE":
+        j = i + 1
+        exponent_negative = False
+        if j < length and expression[j] in "+-":
+            exponent_negative = expression[j] == "-"
+            j += 1
+        exponent = 0
+        exponent_digits = 0
+        while j < length and expression[j] in _DIGITS:
+            exponent = exponent * 10 + _DIGITS[expression[j]]
+            exponent_digits += 1
+            j += 1
+        if exponent_digits:
+            scale += -exponent if exponent_negative else exponent
+            i = j
+
+    if not digits or (i < length and not _is_delimiter(expression[i])):
+        return _scan_word(expression, start)
+
+    if mantissa >= _MAX_EXACT_MANTISSA or abs(scale) > _MAX_EXACT_SCALE:
+        # Outside the exact fast path; let float() do the correctly rounded
+        # conversion.
+        return float(expression[start:i]), i
+
+    if scale >= 0:
+        value = float(mantissa) * 10.0**scale
+    else:
+        value = float(mantissa) / 10.0**-scale
+    return (-value if negative else value), i
+
+
+def _scan_name(expression, start):
+    length = len(expression)
+    end = start + 1
+    while end < length and (expression[end] == "_" or expression[end].isalnum()):
+        end += 1
+    if end < length and not _is_delimiter(expression[end]):
+        return _scan_word(expression, start)
+
+    name = expression[start:end]
+    try:
+        # "inf" and "nan" have always been accepted as numbers
+        return float(name), end
+    except ValueError:
+        return name, end
+
+
+def _scan_word(expression, start):
+    # Anything that is not a plain decimal literal, e.g. "inf", "1_000" or an
+    # outright invalid token. Only this slow path slices the input.
+    length = len(expression)
+    end = start + 1
+    while end < length and not _is_delimiter(expression[end]):
+        end += 1
+    word = expression[start:end]
+    try:
+        return float(word), end
+    except ValueError:
+        raise ValueError(f"invalid token: {word}")
+
+
+def _is_delimiter(char):
+    return char.isspace() or char in OPCODES
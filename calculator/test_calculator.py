@@ -43,6 +43,33 @@ class TestCalculator(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.calculator.evaluate("+ 3")
 
+    def test_unspaced_expression(self):
+        result = self.calculator.evaluate("3+7*2")
+        self.assertEqual(result, 17)
+
+    def test_signed_operands(self):
+        result = self.calculator.evaluate("2 * -3 - -4")
+        self.assertEqual(result, -2)
+
+    def test_decimal_operands(self):
+        result = self.calculator.evaluate("0.1 + .2 * 1e1")
+        self.assertEqual(result, 0.1 + 0.2 * 10)
+
+    def test_invalid_token_in_unspaced_expression(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("3+abc")
+
+    def test_variables(self):
+        result = self.calculator.evaluate("a * b + 1", {"a": 3, "b": 4})
+        self.assertEqual(result, 13)
+        with self.assertRaisesRegex(ValueError, "undefined name: c"):
+            self.calculator.evaluate("a + c", {"a": 1})
+
+    def test_long_expression(self):
+        expression = " + ".join(["1"] * 100_000)
+        result = self.calculator.evaluate(expression)
+        self.assertEqual(result, 100_000)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,69 @@
+import math
+import unittest
+
+from pkg.calculator import Calculator
+from pkg.optimizer import compile_batch
+from pkg.render import format_json_lines
+
+
+class TestOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.calculator = Calculator()
+
+    def test_matches_calculator(self):
+        expressions = [
+            "a * b + c * d - a * b / 2",
+            "2 * 3 - 8 / 2 + 5",
+            "b * a + 1e3 - 0.1 * c",
+            "a - b - c",
+            "",
+        ]
+        variables = {"a": 3.5, "b": -2, "c": 0.1, "d": 7}
+        plan = compile_batch(expressions, self.calculator)
+        expected = [self.calculator.evaluate(e, variables) for e in expressions]
+        self.assertEqual(plan.evaluate(variables), expected)
+
+    def test_integer_inputs_match_calculator(self):
+        expressions = ["1 + 2", "a + b", "a * b - 2 * 3", "a / b", "c + 1"]
+        variables = {"a": 6, "b": 3, "c": 2**53 + 1}
+        plan = compile_batch(expressions, self.calculator)
+        expected = [self.calculator.evaluate(e, variables) for e in expressions]
+        results = plan.evaluate(variables)
+        # Same values and types, so both render the same
+        self.assertEqual([repr(r) for r in results], [repr(r) for r in expected])
+        self.assertEqual(
+            format_json_lines(zip(expressions, results)),
+            format_json_lines(zip(expressions, expected)),
+        )
+
+    def test_constant_folding(self):
+        plan = compile_batch(["2 * 3 * x + 4 / 2"])
+        self.assertEqual(plan.stats.operations, 4)
+        self.assertEqual(plan.stats.folded, 2)
+        self.assertEqual(len(plan.instructions), 2)
+        self.assertEqual(plan.evaluate({"x": 1}), [8])
+
+    def test_shared_subexpressions_across_batch(self):
+        plan = compile_batch(["a * b + 1", "1 + b * a", "a * b - c"])
+        self.assertEqual(plan.stats.operations, 6)
+        self.assertEqual(plan.stats.deduplicated, 3)
+        self.assertEqual(plan.stats.planned, 3)
+        self.assertEqual(plan.evaluate({"a": 2, "b": 5, "c": 1}), [11, 11, 9])
+
+    def test_negative_zero_is_not_merged(self):
+        plan = compile_batch(["0.0 * x", "-0.0 * x"])
+        results = plan.evaluate({"x": 1})
+        self.assertEqual([math.copysign(1, r) for r in results], [1, -1])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            compile_batch(["+ 3"])
+        plan = compile_batch(["x / 0"])
+        with self.assertRaises(ZeroDivisionError):
+            plan.evaluate({"x": 1})
+        with self.assertRaisesRegex(ValueError, "undefined name: x"):
+            plan.evaluate({})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import io
+import json
+import unittest
+
+from pkg.render import (
+    JsonLinesWriter,
+    format_compact_output,
+    format_json_lines,
+    format_json_output,
+)
+
+RESULTS = [
+    ("3 + 5", 8.0),
+    ("10 / 4", 2.5),
+    ("1 / 3", 1 / 3),
+    ("big", 1e300),
+    ("tiny", -1e-300),
+    ('quote " and \\ and ünïcode', -0.0),
+    ("inf", float("inf")),
+    ("-inf", float("-inf")),
+    ("nan", float("nan")),
+    ("int", 7),
+]
+
+
+def reference(expression, result, **kwargs):
+    if isinstance(result, float) and result.is_integer():
+        result = int(result)
+    return json.dumps({"expression": expression, "result": result}, **kwargs)
+
+
+class TestRender(unittest.TestCase):
+    def test_default_output_unchanged(self):
+        for expression, result in RESULTS:
+            self.assertEqual(
+                format_json_output(expression, result),
+                reference(expression, result, indent=2),
+            )
+
+    def test_other_indent(self):
+        self.assertEqual(
+            format_json_output("3 + 5", 8.0, indent=4),
+            reference("3 + 5", 8.0, indent=4),
+        )
+
+    def test_compact_output(self):
+        for expression, result in RESULTS:
+            self.assertEqual(
+                format_compact_output(expression, result),
+                reference(expression, result, separators=(",", ":")),
+            )
+
+    def test_json_lines(self):
+        lines = format_json_lines(RESULTS).splitlines()
+        self.assertEqual(len(lines), len(RESULTS))
+        self.assertEqual(json.loads(lines[0]), {"expression": "3 + 5", "result": 8})
+
+    def test_writer_streams_in_chunks(self):
+        stream = io.BytesIO()
+        with JsonLinesWriter(stream, buffer_size=64) as writer:
+            writer.write("3 + 5", 8.0)
+            writer.write_many(RESULTS * 20)
+        expected = format_json_lines([("3 + 5", 8.0)] + RESULTS * 20)
+        self.assertEqual(stream.getvalue().decode("ascii"), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
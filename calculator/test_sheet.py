@@ -0,0 +1,73 @@
+import time
+import unittest
+
+from pkg.sheet import Sheet
+
+
+class TestSheet(unittest.TestCase):
+    def setUp(self):
+        self.sheet = Sheet()
+
+    def test_references(self):
+        self.sheet.update({"price": "20", "qty": "3", "total": "price * qty + 5"})
+        self.assertEqual(self.sheet["total"], 65)
+
+    def test_forward_reference(self):
+        self.sheet.set("total", "price * 2")
+        self.assertIsNone(self.sheet.get("total"))
+        with self.assertRaisesRegex(ValueError, "undefined name: price"):
+            self.sheet["total"]
+        self.sheet.set("price", 4)
+        self.assertEqual(self.sheet["total"], 8)
+
+    def test_update_recomputes_only_downstream(self):
+        self.sheet.set("x", "1")
+        for i in range(1000):
+            self.sheet.set(f"unrelated_{i}", f"{i} * 2")
+        self.sheet.update({"y": "x + 1", "z": "y * 10"})
+
+        self.sheet.set("x", "5")
+        self.assertEqual(self.sheet.last_recalculated, 3)
+        self.assertEqual(self.sheet["z"], 60)
+
+    def test_diamond_evaluated_in_topological_order(self):
+        self.sheet.update({"a": "1", "b": "a + 1", "c": "a * 2", "d": "b + c"})
+        self.sheet.set("a", "10")
+        self.assertEqual(self.sheet["d"], 31)
+        self.assertEqual(self.sheet.last_recalculated, 4)
+
+    def test_cycle_rejected(self):
+        self.sheet.update({"a": "1", "b": "a + 1"})
+        with self.assertRaisesRegex(ValueError, "circular reference: a -> b -> a"):
+            self.sheet.set("a", "b * 2")
+        self.assertEqual(self.sheet["b"], 2)
+        self.assertEqual(self.sheet.formula("a"), "1")
+
+    def test_long_chain_loads_and_updates_fast(self):
+        n = 5000
+        start = time.perf_counter()
+        self.sheet.set("x0", "1")
+        for i in range(1, n):
+            self.sheet.set(f"x{i}", f"x{i - 1} + 1")
+        self.sheet.update({f"y{i}": f"y{i - 1} + 1" for i in range(1, n)})
+        self.sheet.set("y0", "1")
+        self.assertEqual(self.sheet[f"y{n - 1}"], n)
+
+        # Changing the end of the chain only looks at the end of the chain
+        self.sheet.set(f"x{n - 1}", f"x{n - 2} * 2")
+        self.assertEqual(self.sheet.last_recalculated, 1)
+        self.assertEqual(self.sheet[f"x{n - 1}"], 2 * (n - 1))
+        with self.assertRaisesRegex(ValueError, "circular reference"):
+            self.sheet.set("x0", f"x{n - 1}")
+        self.assertLess(time.perf_counter() - start, 2)
+
+    def test_errors_propagate(self):
+        self.sheet.update({"a": "1 / 0", "b": "a + 1"})
+        with self.assertRaisesRegex(ValueError, "b: depends on a"):
+            self.sheet["b"]
+        self.sheet.set("a", "2")
+        self.assertEqual(self.sheet["b"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from pkg.tokenizer import NAME, NUMBER, OPCODES, tokenize
+
+
+class TestTokenizer(unittest.TestCase):
+    def test_spacing_is_optional(self):
+        self.assertEqual(list(tokenize("3+7*2")), list(tokenize(" 3 + 7 * 2 ")))
+
+    def test_compact_representation(self):
+        tokens = tokenize("3 - 4.5")
+        self.assertEqual(tokens.opcodes.typecode, "b")
+        self.assertEqual(tokens.operands.typecode, "d")
+        self.assertEqual(list(tokens.opcodes), [NUMBER, OPCODES["-"], NUMBER])
+        self.assertEqual(list(tokens.operands), [3.0, 4.5])
+
+    def test_sign_binds_only_in_operand_position(self):
+        self.assertEqual(list(tokenize("3-2")), [3.0, "-", 2.0])
+        self.assertEqual(list(tokenize("3*-2")), [3.0, "*", -2.0])
+        self.assertEqual(list(tokenize("- 2")), ["-", 2.0])
+
+    def test_numbers_match_float(self):
+        for literal in [
+            "0.1",
+            "123.456",
+            "1e-7",
+            "2.5E+3",
+            "9007199254740993",
+            "1e400",
+        ]:
+            self.assertEqual(list(tokenize(literal)), [float(literal)])
+
+    def test_names(self):
+        tokens = tokenize("rate*hours_2+inf")
+        self.assertEqual(list(tokens.opcodes)[:3], [NAME, OPCODES["*"], NAME])
+        self.assertEqual(tokens.names, ["rate", "hours_2"])
+        self.assertEqual(list(tokens.operands), [float("inf")])
+
+    def test_invalid_token(self):
+        with self.assertRaisesRegex(ValueError, r"invalid token: \$"):
+            tokenize("$ 3 5")
+        with self.assertRaisesRegex(ValueError, "invalid token: 1.2.3"):
+            tokenize("1.2.3 + 4")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,51 @@
 MAX_CHARS = 10000
+MAX_BATCH_CHARS = MAX_CHARS
+MAX_BATCH_FILES = 20
+# Estimated tokens (see tokens.py) allowed in one prompt, in one file read or
+# function result, and in all function results of one turn
+MAX_PROMPT_TOKENS = 15000
+MAX_READ_TOKENS = 4000
+MAX_TURN_RESULT_TOKENS = 6000
 WORKING_DIR = "./calculator"
+MODEL = "gemma-3-27b-it"
+# Model for each kind of turn (see router.py). Mechanical turns go to a
+# smaller model; a turn after a failure on it is escalated to MODEL.
+SMALL_MODEL = "gemma-3-12b-it"
+TURN_MODELS = {
+    "discovery": SMALL_MODEL,
+    "error_recovery": SMALL_MODEL,
+    "editing": MODEL,
+    "final_answer": SMALL_MODEL,
+}
+# Seconds before a model request is given up on
+REQUEST_TIMEOUT = 120
+# Send a duplicate of a request once it is slower than this percentile of the
+# model's recent latencies (None turns hedging off), for at most HEDGE_BUDGET
+# of all requests, and only after HEDGE_MIN_SAMPLES requests to that model.
+# Requests are never hedged before HEDGE_MIN_DELAY seconds.
+HEDGE_PERCENTILE = 95
+HEDGE_BUDGET = 0.1
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 1.0
+# Recent latencies kept per model for hedging and latency reports
+LATENCY_WINDOW = 500
 MAX_ITERS = 20
+MAX_STALLED_TURNS = 3
+SESSIONS_DIR = ".sessions"
+CACHE_DIR = ".cache"
+# Check .py files after write_file: "off", "syntax", or "import" (syntax, then
+# import the module in a forked child of a warm helper interpreter)
+WRITE_FILE_CHECK = "syntax"
+# Tools whose full schemas go into the system prompt, picked by relevance to
+# the task and the last RECENT_TOOL_TURNS turns; the rest are listed by their
+# compact signature only
+FULL_TOOL_SCHEMAS = 3
+RECENT_TOOL_TURNS = 3
+# Functions listed in a run_python_file(profile=true) hotspot table
+PROFILE_TOP = 10
+# Model calls shared by all branches of a --branches race
+BRANCH_MAX_CALLS = 40
+# Model requests per minute across all workers of a batch.py run
+BATCH_REQUESTS_PER_MINUTE = 30
+# Unix socket daemon.py listens on and ask.py connects to
+DAEMON_SOCKET = ".cache/agent.sock"
@@ -0,0 +1,15 @@
+from collections import deque
+
+import pytest
+
+from tokens import token_estimator
+
+
+@pytest.fixture(autouse=True)
+def uncalibrated_token_estimator(monkeypatch):
+    """Keep fake token counts out of the real calibration file, and tests apart."""
+    monkeypatch.setattr(token_estimator, "path", None)
+    monkeypatch.setattr(token_estimator, "_loaded", True)
+    monkeypatch.setattr(token_estimator, "_scale", 1.0)
+    monkeypatch.setattr(token_estimator, "_samples", deque(maxlen=200))
+    monkeypatch.setattr(token_estimator, "_errors", deque(maxlen=200))
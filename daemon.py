@@ -0,0 +1,202 @@
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable, Optional, TextIO
+
+from google import genai
+
+import main as agent
+from config import DAEMON_SOCKET, MODEL, WORKING_DIR, WRITE_FILE_CHECK
+from functions.check_python import import_checker
+from functions.run_tests import prepare_index
+from functions.workspace import as_workspace
+from snapshot import build_workspace_snapshot
+
+
+class StreamRouter(io.TextIOBase):
+    """
+    Stands in for sys.stdout or sys.stderr and sends each thread's output to
+    the stream registered for that thread, so concurrent sessions each reach
+    their own client. Threads without one write to the daemon's own stream.
+    """
+
+    def __init__(self, default: TextIO):
+        self.default = default
+        self._local = threading.local()
+
+    def route(self, stream: Optional[TextIO]) -> None:
+        self._local.stream = stream
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        return (getattr(self._local, "stream", None) or self.default).write(text)
+
+    def flush(self) -> None:
+        (getattr(self._local, "stream", None) or self.default).flush()
+
+
+class ClientStream(io.TextIOBase):
+    """One of a client's output streams, sent over its socket as it is written."""
+
+    def __init__(self, send: Callable[[dict[str, Any]], None], name: str):
+        self._send = send
+        self.name = name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            self._send({"stream": self.name, "text": text})
+        return len(text)
+
+
+class SessionHandler(socketserver.StreamRequestHandler):
+    """
+    Runs one main.py session per connection. The client sends a single JSON
+    line with the arguments it was given and its working directory; the
+    daemon answers with {"stream": ..., "text": ...} lines as the session
+    prints, then {"exit": code}.
+    """
+
+    server: "AgentServer"
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return  # a liveness probe, or a client that gave up
+        request = json.loads(line)
+        lock = threading.Lock()
+
+        def send(message: dict[str, Any]) -> None:
+            with lock:
+                self.wfile.write((json.dumps(message) + "\n").encode())
+                self.wfile.flush()
+
+        if request.get("cwd") != os.getcwd():
+            # Paths such as WORKING_DIR and --resume files are relative
+            send(
+                {
+                    "stream": "stderr",
+                    "text": f"The daemon serves {os.getcwd()}; start one in "
+                    f"{request.get('cwd')} to work there.\n",
+                }
+            )
+            send({"exit": 2})
+            return
+
+        stdout, stderr = install_routers()
+        stdout.route(ClientStream(send, "stdout"))
+        stderr.route(ClientStream(send, "stderr"))
+        # Files may have changed on disk since the last session
+        as_workspace(WORKING_DIR).refresh()
+        code = 0
+        try:
+            agent.main(request["argv"], client=self.server.client)
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else int(e.code is not None)
+        except (BrokenPipeError, ConnectionResetError):
+            return  # the client went away; the session file keeps its progress
+        except Exception:
+            traceback.print_exc()
+            code = 1
+        finally:
+            stdout.route(None)
+            stderr.route(None)
+        try:
+            send({"exit": code})
+        except OSError:
+            pass
+
+
+class AgentServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Serves sessions on a Unix socket with one genai client, and so one HTTP
+    connection pool, for all of them. Tool caches and indexes live in this
+    process too, so every session after the first finds them warm.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, client: genai.Client):
+        self.client = client
+        if os.path.exists(socket_path):
+            if _is_listening(socket_path):
+                raise RuntimeError(
+                    f"An agent daemon is already listening on {socket_path}"
+                )
+            os.unlink(socket_path)  # left behind by a daemon that was killed
+        os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+        super().__init__(socket_path, SessionHandler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+_routers_lock = threading.Lock()
+
+
+def install_routers() -> tuple[StreamRouter, StreamRouter]:
+    """Put StreamRouters in place of sys.stdout and sys.stderr, once."""
+    with _routers_lock:
+        if not isinstance(sys.stdout, StreamRouter):
+            sys.stdout = StreamRouter(sys.stdout)
+        if not isinstance(sys.stderr, StreamRouter):
+            sys.stderr = StreamRouter(sys.stderr)
+        return sys.stdout, sys.stderr
+
+
+def warm_up(client: genai.Client, working_directory: str = WORKING_DIR) -> None:
+    """Fill the caches a first session would otherwise fill on its own time."""
+    build_workspace_snapshot(working_directory)
+    prepare_index(working_directory)
+    if WRITE_FILE_CHECK == "import":
+        import_checker.start()
+    try:
+        # Opens the pooled TLS connection without generating anything
+        client.models.get(model=MODEL)
+    except Exception as e:
+        print(f"Could not reach the Gemini API yet: {e}", file=sys.stderr)
+
+
+def _is_listening(socket_path: str) -> bool:
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def serve(socket_path: str = DAEMON_SOCKET) -> None:
+    install_routers()
+    client = agent.create_client()
+    with AgentServer(socket_path, client) as server:
+        start_time = time.perf_counter()
+        warm_up(client)
+        print(
+            f"Warmed up in {time.perf_counter() - start_time:.2f}s; "
+            f"listening on {socket_path}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopping.")
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,56 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Union
+
+from google import genai
+
+Reply = Callable[[str, list[genai.types.Content]], str]
+
+
+class FakeClient:
+    """
+    Local stand-in for genai.Client. Answers generate_content from a list of
+    replies, or from a function of the model name and messages, and records
+    which model each request went to. Reply i answers the request whose
+    history holds i model turns, so a repeated request gets the same reply.
+    `latency` (seconds, or a function of the model name) makes it a slow
+    server for routing and hedging tests.
+    """
+
+    def __init__(
+        self,
+        replies: Union[list[str], Reply],
+        latency: Union[float, Callable[[str], float]] = 0,
+        prompt_tokens: int = 100,
+        response_tokens: int = 10,
+    ):
+        self.replies = replies
+        self.latency = latency
+        self.prompt_tokens = prompt_tokens
+        self.response_tokens = response_tokens
+        self.requests: list[str] = []
+        self._lock = threading.Lock()
+        self.models = self
+
+    def generate_content(self, model: str, contents: list[genai.types.Content]):
+        with self._lock:
+            self.requests.append(model)
+            if callable(self.replies):
+                text = self.replies(model, contents)
+            else:
+                text = self.replies[model_turns(contents)]
+            latency = self.latency(model) if callable(self.latency) else self.latency
+        time.sleep(latency)
+        usage = SimpleNamespace(
+            prompt_token_count=self.prompt_tokens,
+            candidates_token_count=self.response_tokens,
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def get(self, model: str):
+        return SimpleNamespace(name=model)
+
+
+def model_turns(contents: list[genai.types.Content]) -> int:
+    return sum(1 for content in contents if content.role == "model")
@@ -0,0 +1,152 @@
+import atexit
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import threading
+from typing import Optional
+
+IMPORT_CHECK_TIMEOUT = 10  # seconds
+
+# Runs in the warm helper process. Each request is imported in a forked child,
+# so every check starts from the same clean, already-initialized interpreter
+# and nothing a checked module does leaks into the next check.
+_SERVER = r"""
+import json, os, sys, traceback
+results = os.fdopen(os.dup(1), "w")
+for line in sys.stdin:
+    request = json.loads(line)
+    pid = os.fork()
+    if pid == 0:
+        devnull = os.open(os.devnull, os.O_RDWR)
+        os.dup2(devnull, 0)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        error = None
+        try:
+            os.chdir(request["cwd"])
+            sys.path.insert(0, request["cwd"])
+            __import__(request["module"])
+        except BaseException:
+            error = traceback.format_exc(limit=-3)
+        results.write(json.dumps({"error": error}) + "\n")
+        results.flush()
+        os._exit(0)
+    _, status = os.waitpid(pid, 0)
+    if status:
+        # The child died before it could answer (e.g. a crash in C code)
+        results.write(json.dumps({"error": f"Import crashed (status {status})"}) + "\n")
+        results.flush()
+"""
+
+
+def check_syntax(content: str, file_path: str) -> Optional[str]:
+    """Compile `content` without running it; a short error message or None."""
+    try:
+        compile(content, file_path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        message = f'Syntax error in "{file_path}" at line {e.lineno}, column {e.offset}: {e.msg}'
+        if e.text:
+            caret = " " * max((e.offset or 1) - 1, 0)
+            message += f"\n    {e.text.rstrip()}\n    {caret}^"
+        return message
+    except ValueError as e:  # e.g. null bytes
+        return f'Syntax error in "{file_path}": {e}'
+    return None
+
+
+def module_name(file_path: str) -> Optional[str]:
+    """Dotted module name of a .py path relative to the working directory."""
+    parts = os.path.normpath(file_path)[: -len(".py")].split(os.sep)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    if not parts or not all(part.isidentifier() for part in parts):
+        return None
+    return ".".join(parts)
+
+
+class ImportChecker:
+    """
+    Imports modules in a forked child of a long-lived helper interpreter, so
+    a check costs a fork rather than a cold interpreter start.
+    """
+
+    def __init__(self):
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()  # one request at a time on the pipe
+        atexit.register(self.close)
+
+    def check(self, working_directory: str, module: str) -> Optional[str]:
+        """The tail of the import traceback, or None if the import worked."""
+        if not hasattr(os, "fork"):
+            return self._check_cold(working_directory, module)
+        with self._lock:
+            return self._check_warm(working_directory, module)
+
+    def _check_warm(self, working_directory: str, module: str) -> Optional[str]:
+        process = self._start()
+        assert process.stdin is not None and process.stdout is not None
+        request = {"cwd": os.path.abspath(working_directory), "module": module}
+        ready = []
+        try:
+            process.stdin.write(json.dumps(request) + "\n")
+            process.stdin.flush()
+            ready, _, _ = select.select([process.stdout], [], [], IMPORT_CHECK_TIMEOUT)
+            line = process.stdout.readline() if ready else ""
+        except OSError:
+            line = ""
+        if not line:
+            self.close()
+            if ready:
+                return "Import check failed: the checker process died"
+            return f"Import timed out after {IMPORT_CHECK_TIMEOUT} seconds"
+        return json.loads(line)["error"]
+
+    def start(self) -> None:
+        """Start the helper now, so the first check does not wait for it."""
+        if hasattr(os, "fork"):
+            with self._lock:
+                self._start()
+
+    def close(self) -> None:
+        if self._process is None:
+            return
+        try:
+            # Also stops a child stuck importing a module that never returns
+            os.killpg(self._process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self._process.wait()
+        self._process = None
+
+    def _start(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                [sys.executable, "-c", _SERVER],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                start_new_session=True,
+            )
+        return self._process
+
+    def _check_cold(self, working_directory: str, module: str) -> Optional[str]:
+        try:
+            result = subprocess.run(
+                [sys.executable, "-c", f"import {module}"],
+                capture_output=True,
+                text=True,
+                timeout=IMPORT_CHECK_TIMEOUT,
+                cwd=os.path.abspath(working_directory),
+            )
+        except subprocess.TimeoutExpired:
+            return f"Import timed out after {IMPORT_CHECK_TIMEOUT} seconds"
+        if result.returncode == 0:
+            return None
+        return "\n".join(result.stderr.strip().splitlines()[-6:])
+
+
+import_checker = ImportChecker()
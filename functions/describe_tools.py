@@ -0,0 +1,33 @@
+from google import genai
+
+from tool_registry import tool_registry
+
+
+def describe_tools(working_directory, names):
+    unknown = [name for name in names if name not in tool_registry]
+    if unknown:
+        return (
+            f"Error: Unknown tool(s): {', '.join(unknown)}. "
+            f"Available: {', '.join(tool_registry.tools)}"
+        )
+    return "\n".join(str(schema) for schema in tool_registry.describe(names))
+
+
+schema_describe_tools = genai.types.FunctionDeclaration(
+    name="describe_tools",
+    description=(
+        "Returns the full schemas (parameter types and descriptions) of the "
+        "named tools. The system prompt shows only a short signature for most tools."
+    ),
+    parameters=genai.types.Schema(
+        type=genai.types.Type.OBJECT,
+        properties={
+            "names": genai.types.Schema(
+                type=genai.types.Type.ARRAY,
+                items=genai.types.Schema(type=genai.types.Type.STRING),
+                description="Names of the tools to describe.",
+            ),
+        },
+        required=["names"],
+    ),
+)
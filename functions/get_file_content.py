@@ -1,32 +1,78 @@
-import os
+from itertools import islice
 
 from google import genai
 
-from config import MAX_CHARS
+from config import MAX_CHARS, MAX_READ_TOKENS
+from functions.workspace import as_workspace
+from tokens import token_estimator
 
 
-def get_file_content(working_directory, file_path):
-    abs_working_dir = os.path.abspath(working_directory)
-    abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
-    if not abs_file_path.startswith(abs_working_dir):
+def get_file_content(working_directory, file_path, start_line=None, end_line=None):
+    workspace = as_workspace(working_directory)
+    abs_file_path = workspace.resolve(file_path)
+    if abs_file_path is None:
         return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory'
-    if not os.path.isfile(abs_file_path):
+    if not workspace.is_file(abs_file_path):
         return f'Error: File not found or is not a regular file: "{file_path}"'
+    if start_line is not None or end_line is not None:
+        return _read_lines(
+            workspace, abs_file_path, file_path, start_line or 1, end_line
+        )
     try:
-        with open(abs_file_path, "r") as f:
+        with workspace.open_text(abs_file_path) as f:
             content = f.read(MAX_CHARS)
-            if os.path.getsize(abs_file_path) > MAX_CHARS:
-                content += (
-                    f'[...File "{file_path}" truncated at {MAX_CHARS} characters]'
-                )
-        return content
+            truncated = workspace.size(abs_file_path) > MAX_CHARS
     except Exception as e:
         return f'Error reading file "{file_path}": {e}'
+    lines = content.splitlines(keepends=True)
+    kept = token_estimator.fit_lines(lines, MAX_READ_TOKENS)
+    if 0 < kept < len(lines):
+        return "".join(lines[:kept]) + _continue_note(file_path, kept)
+    if truncated:
+        content += f'[...File "{file_path}" truncated at {MAX_CHARS} characters]'
+    return content
+
+
+def _read_lines(workspace, abs_file_path, file_path, start_line, end_line):
+    if start_line < 1 or (end_line is not None and end_line < start_line):
+        return f"Error: Invalid line range {start_line}-{end_line}"
+    try:
+        with workspace.open_text(abs_file_path) as f:
+            skipped = sum(1 for _ in islice(f, start_line - 1))
+            selected = list(islice(f, None if end_line is None else end_line - skipped))
+            total_lines = skipped + len(selected) + sum(1 for _ in f)
+    except Exception as e:
+        return f'Error reading file "{file_path}": {e}'
+    if not selected:
+        return f'Error: "{file_path}" has only {total_lines} lines'
+
+    note = ""
+    kept = token_estimator.fit_lines(selected, MAX_READ_TOKENS)
+    if 0 < kept < len(selected):
+        selected = selected[:kept]
+        note = _continue_note(file_path, start_line + kept - 1)
+    last_line = start_line + len(selected) - 1
+    content = "".join(selected)
+    header = f'[Lines {start_line}-{last_line} of {total_lines} in "{file_path}"]\n'
+    if note:
+        return header + content + note
+    if len(content) > MAX_CHARS:
+        content = content[:MAX_CHARS] + (
+            f'[...Lines of "{file_path}" truncated at {MAX_CHARS} characters]'
+        )
+    return header + content
+
+
+def _continue_note(file_path, last_line):
+    return (
+        f'[...Stopped after line {last_line} of "{file_path}" to stay within '
+        f"{MAX_READ_TOKENS} tokens; read on with start_line={last_line + 1}]"
+    )
 
 
 schema_get_file_content = genai.types.FunctionDeclaration(
     name="get_file_content",
-    description=f"Reads and returns the first {MAX_CHARS} characters of the content from a specified file within the working directory.",
+    description=f"Reads and returns the first {MAX_CHARS} characters of the content from a specified file within the working directory, or only the given range of lines.",
     parameters=genai.types.Schema(
         type=genai.types.Type.OBJECT,
         properties={
@@ -34,6 +80,14 @@ schema_get_file_content = genai.types.FunctionDeclaration(
                 type=genai.types.Type.STRING,
                 description="The path to the file whose content should be read, relative to the working directory.",
             ),
+            "start_line": genai.types.Schema(
+                type=genai.types.Type.INTEGER,
+                description="First line to read, counting from 1. Defaults to the start of the file.",
+            ),
+            "end_line": genai.types.Schema(
+                type=genai.types.Type.INTEGER,
+                description="Last line to read, inclusive. Defaults to the end of the file.",
+            ),
         },
         required=["file_path"],
     ),
@@ -0,0 +1,98 @@
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+
+from google import genai
+
+from functions.workspace import as_workspace
+
+# Outlines keyed by a hash of the file's bytes, so an unchanged file is never
+# parsed twice however often it is asked for, and an edited one always is
+_OUTLINE_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_OUTLINE_CACHE_SIZE = 256
+_OUTLINE_CACHE_LOCK = threading.Lock()
+
+
+def get_file_outline(working_directory, file_path):
+    workspace = as_workspace(working_directory)
+    abs_file_path = workspace.resolve(file_path)
+    if abs_file_path is None:
+        return f'Error: Cannot outline "{file_path}" as it is outside the permitted working directory'
+    if not workspace.is_file(abs_file_path):
+        return f'Error: File not found or is not a regular file: "{file_path}"'
+    if not file_path.endswith(".py"):
+        return f'Error: "{file_path}" is not a Python file'
+    try:
+        source = workspace.read_bytes(abs_file_path)
+    except Exception as e:
+        return f'Error reading file "{file_path}": {e}'
+
+    key = hashlib.blake2b(source, digest_size=16).hexdigest()
+    with _OUTLINE_CACHE_LOCK:
+        outline = _OUTLINE_CACHE.get(key)
+        if outline is not None:
+            _OUTLINE_CACHE.move_to_end(key)
+    if outline is None:
+        try:
+            outline = outline_source(source)
+        except SyntaxError as e:
+            return f'Error: Cannot outline "{file_path}": syntax error at line {e.lineno}: {e.msg}'
+        with _OUTLINE_CACHE_LOCK:
+            _OUTLINE_CACHE[key] = outline
+            if len(_OUTLINE_CACHE) > _OUTLINE_CACHE_SIZE:
+                _OUTLINE_CACHE.popitem(last=False)
+    return f"{file_path}\n{outline}"
+
+
+def outline_source(source):
+    """Classes, functions and methods with signatures and line ranges."""
+    tree = ast.parse(source)
+    lines = [f"({len(source.splitlines())} lines)"]
+    _outline_body(tree.body, "", lines)
+    return "\n".join(lines)
+
+
+def _outline_body(body, indent, lines):
+    for node in body:
+        if isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            header = f"class {node.name}({bases})" if bases else f"class {node.name}"
+            lines.append(f"{indent}{_decorators(node)}{header}  {_line_range(node)}")
+            _outline_body(node.body, indent + "    ", lines)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+            signature = f"{prefix} {node.name}({ast.unparse(node.args)})"
+            if node.returns is not None:
+                signature += f" -> {ast.unparse(node.returns)}"
+            lines.append(f"{indent}{_decorators(node)}{signature}  {_line_range(node)}")
+
+
+def _decorators(node):
+    return "".join(f"@{ast.unparse(d)} " for d in node.decorator_list)
+
+
+def _line_range(node):
+    start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+    return f"[lines {start}-{node.end_lineno}]"
+
+
+schema_get_file_outline = genai.types.FunctionDeclaration(
+    name="get_file_outline",
+    description=(
+        "Lists the classes, functions and methods of a Python file in the working "
+        "directory, with their signatures and line ranges. Much shorter than the "
+        "full file: use it first, then read only the lines you need with "
+        "get_file_content(start_line=..., end_line=...)."
+    ),
+    parameters=genai.types.Schema(
+        type=genai.types.Type.OBJECT,
+        properties={
+            "file_path": genai.types.Schema(
+                type=genai.types.Type.STRING,
+                description="The path to the Python file to outline, relative to the working directory.",
+            ),
+        },
+        required=["file_path"],
+    ),
+)
@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from google import genai
+
+from config import MAX_BATCH_CHARS, MAX_BATCH_FILES
+from functions.workspace import as_workspace
+
+
+def get_files_content(working_directory, paths, max_total_chars=MAX_BATCH_CHARS):
+    if not isinstance(paths, list) or not paths:
+        return "Error: paths must be a non-empty list of file paths"
+    if len(paths) > MAX_BATCH_FILES:
+        return f"Error: Cannot read more than {MAX_BATCH_FILES} files in one call"
+    budget = max(0, min(max_total_chars, MAX_BATCH_CHARS))
+    workspace = as_workspace(working_directory)
+
+    # Reads are I/O bound, so threads overlap them well. No file needs more
+    # than the whole budget, whatever its size.
+    with ThreadPoolExecutor(max_workers=min(len(paths), 8)) as pool:
+        contents = list(pool.map(lambda path: _read(workspace, path, budget), paths))
+
+    allowances = _share_budget(
+        [len(c) if error is None else 0 for c, error in contents], budget
+    )
+
+    sections = []
+    for path, (content, error), allowance in zip(paths, contents, allowances):
+        if error is not None:
+            sections.append(f"==> {path} <==\n{error}")
+        elif allowance < len(content):
+            sections.append(
+                f"==> {path} (first {allowance} characters; shared budget used up) <==\n"
+                f"{content[:allowance]}"
+            )
+        else:
+            sections.append(f"==> {path} <==\n{content}")
+    return "\n\n".join(sections)
+
+
+def _read(workspace, file_path, limit):
+    """(content, error) for one file; content is at most `limit` + 1 chars."""
+    abs_file_path = workspace.resolve(file_path)
+    if abs_file_path is None:
+        return "", (
+            f'Error: Cannot read "{file_path}" as it is outside the permitted '
+            "working directory"
+        )
+    if not workspace.is_file(abs_file_path):
+        return "", f'Error: File not found or is not a regular file: "{file_path}"'
+    try:
+        with workspace.open_text(abs_file_path) as f:
+            # One extra character tells a file that fits from one that doesn't
+            return f.read(limit + 1), None
+    except Exception as e:
+        return "", f'Error reading file "{file_path}": {e}'
+
+
+def _share_budget(lengths, budget):
+    """
+    Split `budget` characters across files of the given lengths. Every file
+    first gets an equal share (or less, if it is shorter); whatever short
+    files leave over goes to the remaining files in the order they were asked
+    for.
+    """
+    allowances = [0] * len(lengths)
+    wanting = [i for i, length in enumerate(lengths) if length]
+    remaining = budget
+    # Equal shares, repeated while short files keep freeing up budget
+    while wanting and remaining >= len(wanting):
+        share = remaining // len(wanting)
+        still_wanting = []
+        for i in wanting:
+            grant = min(share, lengths[i] - allowances[i])
+            allowances[i] += grant
+            remaining -= grant
+            if allowances[i] < lengths[i]:
+                still_wanting.append(i)
+        if len(still_wanting) == len(wanting):
+            break  # every file took a full share; only the remainder is left
+        wanting = still_wanting
+    for i in wanting:
+        grant = min(remaining, lengths[i] - allowances[i])
+        allowances[i] += grant
+        remaining -= grant
+    return allowances
+
+
+schema_get_files_content = genai.types.FunctionDeclaration(
+    name="get_files_content",
+    description=(
+        "Reads several files within the working directory in one call. The files "
+        f"share a budget of {MAX_BATCH_CHARS} characters: each gets an equal share, "
+        "and what shorter files leave over goes to the others in the order listed. "
+        "Prefer this over several get_file_content calls."
+    ),
+    parameters=genai.types.Schema(
+        type=genai.types.Type.OBJECT,
+        properties={
+            "paths": genai.types.Schema(
+                type=genai.types.Type.ARRAY,
+                items=genai.types.Schema(type=genai.types.Type.STRING),
+                description=(
+                    f"Up to {MAX_BATCH_FILES} file paths relative to the working "
+                    "directory, most important first."
+                ),
+            ),
+            "max_total_chars": genai.types.Schema(
+                type=genai.types.Type.INTEGER,
+                description=(
+                    "Total characters to return across all files. Defaults to, "
+                    f"and may not exceed, {MAX_BATCH_CHARS}."
+                ),
+            ),
+        },
+        required=["paths"],
+    ),
+)
@@ -1,22 +1,18 @@
-import os
-
 from google import genai
 
+from functions.workspace import as_workspace
+
 
 def get_files_info(working_directory, directory="."):
-    abs_working_dir = os.path.abspath(working_directory)
-    target_dir = os.path.abspath(os.path.join(working_directory, directory))
-    if not target_dir.startswith(abs_working_dir):
+    workspace = as_workspace(working_directory)
+    target_dir = workspace.resolve(directory)
+    if target_dir is None:
         return f'Error: Cannot list "{directory}" as it is outside the permitted working directory'
-    if not os.path.isdir(target_dir):
+    if not workspace.is_dir(target_dir):
         return f'Error: "{directory}" is not a directory'
     try:
         files_info = []
-        for filename in os.listdir(target_dir):
-            filepath = os.path.join(target_dir, filename)
-            file_size = 0
-            is_dir = os.path.isdir(filepath)
-            file_size = os.path.getsize(filepath)
+        for filename, file_size, is_dir in workspace.list_dir(target_dir):
             files_info.append(
                 f"- {filename}: file_size={file_size} bytes, is_dir={is_dir}"
             )
@@ -1,29 +1,52 @@
 import os
+import pstats
+import signal
 import subprocess
+import sys
+import tempfile
+import threading
+from time import perf_counter, sleep
 
 from google import genai
 
+from config import PROFILE_TOP
+from functions.workspace import as_workspace
 
-def run_python_file(working_directory, file_path, args=None):
-    abs_working_dir = os.path.abspath(working_directory)
-    abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
-    if not abs_file_path.startswith(abs_working_dir):
+RUN_TIMEOUT = 30  # seconds
+
+
+def run_python_file(working_directory, file_path, args=None, profile=False, state=None):
+    workspace = as_workspace(working_directory)
+    abs_file_path = workspace.resolve(file_path)
+    if abs_file_path is None:
         return f'Error: Cannot execute "{file_path}" as it is outside the permitted working directory'
-    if not os.path.exists(abs_file_path):
+    if not workspace.is_file(abs_file_path):
         return f'Error: File "{file_path}" not found.'
     if not file_path.endswith(".py"):
         return f'Error: "{file_path}" is not a Python file.'
+    stats_path = None
     try:
-        commands = ["python", abs_file_path]
+        # With pending overlay edits this is a scratch copy of the merged view
+        abs_working_dir = workspace.execution_root()
+        script = os.path.join(
+            abs_working_dir, os.path.relpath(abs_file_path, workspace.root)
+        )
+        commands = ["python", script]
+        if profile:
+            fd, stats_path = tempfile.mkstemp(prefix="profile-", suffix=".pstats")
+            os.close(fd)
+            commands = ["python", "-m", "cProfile", "-o", stats_path, script]
         if args:
             commands.extend(args)
-        result = subprocess.run(
-            commands,
-            capture_output=True,
-            text=True,
-            timeout=30,
-            cwd=abs_working_dir,
-        )
+        # The session's totals, for its stats
+        totals = None
+        if state is not None:
+            totals = state.setdefault(
+                "script_runs", {"runs": 0, "wall": 0.0, "cpu": 0.0, "peak_rss": 0}
+            )
+        result, usage = _run(commands, abs_working_dir, RUN_TIMEOUT, totals)
+        # The script may have moved directories around
+        workspace.refresh()
         output = []
         if result.stdout:
             output.append(f"STDOUT:\n{result.stdout}")
@@ -33,14 +56,148 @@ def run_python_file(working_directory, file_path, args=None):
         if result.returncode != 0:
             output.append(f"Process exited with code {result.returncode}")
 
+        if profile:
+            output.append(format_usage(usage))
+            output.append(format_profile(stats_path, abs_working_dir))
         return "\n".join(output) if output else "No output produced."
     except Exception as e:
         return f"Error: executing Python file: {e}"
+    finally:
+        if stats_path is not None:
+            os.remove(stats_path)
+
+
+def _run(commands, cwd, timeout, totals=None):
+    """
+    Run `commands` and capture its output, like subprocess.run, but reap the
+    process with wait4 so its CPU time and peak memory come back too, and are
+    added to `totals` if given. Returns (CompletedProcess, usage), where
+    usage is None where wait4 is missing.
+    """
+    start = perf_counter()
+    if not hasattr(os, "wait4"):
+        result = subprocess.run(
+            commands, capture_output=True, text=True, timeout=timeout, cwd=cwd
+        )
+        return result, None
+
+    process = subprocess.Popen(
+        commands,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=cwd,
+        start_new_session=True,  # so a timeout also stops its children
+    )
+    output = {}
+    readers = [
+        threading.Thread(target=lambda n=name, s=stream: output.update({n: s.read()}))
+        for name, stream in (("stdout", process.stdout), ("stderr", process.stderr))
+    ]
+    for reader in readers:
+        reader.start()
+
+    # Poll rather than block, so the process is only ever killed while it
+    # is still ours to reap and its pid cannot have been reused
+    timed_out = False
+    delay = 0.001
+    while True:
+        pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            break
+        if perf_counter() - start > timeout and not timed_out:
+            os.killpg(process.pid, signal.SIGKILL)
+            timed_out = True
+        sleep(delay)
+        delay = min(delay * 2, 0.05)
+    wall = perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if not timed_out:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)  # leftovers holding the pipes
+        except OSError:
+            pass
+    for reader in readers:
+        reader.join()
+    process.stdout.close()
+    process.stderr.close()
+
+    usage = {
+        "wall": wall,
+        "user": rusage.ru_utime,
+        "system": rusage.ru_stime,
+        # Kilobytes on Linux, bytes on macOS
+        "peak_rss": rusage.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+    }
+    if totals is not None:
+        totals["runs"] += 1
+        totals["wall"] += wall
+        totals["cpu"] += usage["user"] + usage["system"]
+        totals["peak_rss"] = max(totals["peak_rss"], usage["peak_rss"])
+    if timed_out:
+        raise subprocess.TimeoutExpired(commands, timeout)
+    result = subprocess.CompletedProcess(
+        commands, process.returncode, output.get("stdout", ""), output.get("stderr", "")
+    )
+    return result, usage
+
+
+def format_usage(usage):
+    if usage is None:
+        return "Resources: not available on this platform"
+    return (
+        f"Resources: wall {usage['wall']:.2f}s, CPU {usage['user'] + usage['system']:.2f}s "
+        f"(user {usage['user']:.2f}s, system {usage['system']:.2f}s), "
+        f"peak RSS {usage['peak_rss'] / 2**20:.1f} MB"
+    )
+
+
+def format_profile(stats_path, root, top=PROFILE_TOP):
+    """The functions with the most own time, as a compact table."""
+    try:
+        stats = pstats.Stats(stats_path)
+    except Exception:
+        return "Profile: no data (the script exited before the profiler could save it)"
+    rows = sorted(
+        (
+            item
+            for item in stats.stats.items()
+            if "_lsprof.Profiler" not in item[0][2]  # the profiler switching off
+        ),
+        key=lambda item: item[1][2],
+        reverse=True,
+    )
+    total_calls = sum(ncalls for _, (_, ncalls, _, _, _) in rows)
+    lines = [
+        f"Profile (top {min(top, len(rows))} of {len(rows)} functions by own time; "
+        f"{total_calls} calls in total, timings include profiler overhead):",
+        f"{'own s':>8} {'total s':>8} {'calls':>9}  function",
+    ]
+    for function, (_, ncalls, own, total, _) in rows[:top]:
+        lines.append(
+            f"{own:8.3f} {total:8.3f} {ncalls:9d}  {_function_label(function, root)}"
+        )
+    return "\n".join(lines)
+
+
+def _function_label(function, root):
+    filename, line, name = function
+    if filename == "~":
+        return name  # a built-in, already labelled like <built-in method ...>
+    if filename.startswith(root + os.sep):
+        filename = os.path.relpath(filename, root)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{line}({name})"
 
 
 schema_run_python_file = genai.types.FunctionDeclaration(
     name="run_python_file",
-    description="Executes a Python file within the working directory and returns the output from the interpreter.",
+    description=(
+        "Executes a Python file within the working directory and returns the "
+        "output from the interpreter. With profile=true it also reports wall "
+        "time, CPU time, peak memory and the functions that took the most time."
+    ),
     parameters=genai.types.Schema(
         type=genai.types.Type.OBJECT,
         properties={
@@ -56,6 +213,14 @@ schema_run_python_file = genai.types.FunctionDeclaration(
                 ),
                 description="Optional arguments to pass to the Python file.",
             ),
+            "profile": genai.types.Schema(
+                type=genai.types.Type.BOOLEAN,
+                description=(
+                    "Run under cProfile and report resource usage and the "
+                    f"{PROFILE_TOP} functions with the most own time. Use it "
+                    "for performance work."
+                ),
+            ),
         },
         required=["file_path"],
     ),
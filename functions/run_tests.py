@@ -0,0 +1,300 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from google import genai
+
+from config import MAX_CHARS
+from functions.check_python import module_name
+from functions.workspace import as_workspace
+
+TEST_TIMEOUT = 60  # seconds per test file
+WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests_worker.py")
+
+
+def run_tests(working_directory, paths=None, scope="affected"):
+    if scope not in ("affected", "all"):
+        return 'Error: scope must be "affected" or "all"'
+    workspace = as_workspace(working_directory)
+    # With pending overlay edits this is a scratch copy of the merged view
+    abs_working_dir = workspace.execution_root()
+    index = _index_for(abs_working_dir)
+    with index.lock:
+        files = index.scan()
+
+    if paths:
+        test_files = []
+        for path in paths:
+            abs_path = workspace.resolve(path)
+            if abs_path is None:
+                return f'Error: Cannot run "{path}" as it is outside the permitted working directory'
+            rel_path = os.path.relpath(abs_path, workspace.root)
+            if rel_path not in files:
+                return f'Error: Test file "{path}" not found'
+            test_files.append(rel_path)
+        not_run = []
+    else:
+        with index.lock:
+            all_tests = index.test_files()
+            affected = index.affected()
+        if not all_tests:
+            return "No test files (test_*.py or *_test.py) found."
+        if scope == "affected" and affected is not None:
+            test_files = affected
+            not_run = [t for t in all_tests if t not in affected]
+            if not test_files:
+                return (
+                    f"No tests are affected by changes since the last run "
+                    f'({len(all_tests)} test files). Use scope="all" to run them anyway.'
+                )
+        else:
+            # Tests that depend on recent changes run first
+            test_files = (affected or []) + [
+                t for t in all_tests if t not in (affected or [])
+            ]
+            not_run = []
+
+    results = _run_shards(abs_working_dir, test_files)
+    workspace.refresh()  # tests may have moved directories around
+    with index.lock:
+        index.record_run(results)
+    return _format_summary(test_files, results, not_run)
+
+
+class TestIndex:
+    """
+    Map from the Python files of a working directory to the test files that
+    import them, directly or indirectly. Files are re-parsed only when their
+    mtime or size changes.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._files = {}  # rel path -> (fingerprint, imported module names)
+        # test file -> fingerprints of the files it depended on when it last ran
+        self._last_runs = {}
+        self._failing = set()
+        self.lock = threading.Lock()  # branches may share one directory
+
+    def scan(self):
+        """Current fingerprint of every .py file, re-parsing changed ones."""
+        current = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [
+                d for d in dirnames if not d.startswith(".") and d != "__pycache__"
+            ]
+            for filename in filenames:
+                if not filename.endswith(".py"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                current[os.path.relpath(path, self.root)] = (
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                )
+        for rel_path, fingerprint in current.items():
+            cached = self._files.get(rel_path)
+            if cached is None or cached[0] != fingerprint:
+                self._files[rel_path] = (fingerprint, self._imports(rel_path))
+        for rel_path in set(self._files) - set(current):
+            del self._files[rel_path]
+        return current
+
+    def test_files(self):
+        return sorted(
+            path
+            for path in self._files
+            if os.path.basename(path).startswith("test_") or path.endswith("_test.py")
+        )
+
+    def affected(self):
+        """
+        Test files that depend on a file changed since they last ran, that
+        failed then, or that have never run; None if no tests have run yet.
+        """
+        if not self._last_runs:
+            return None
+        return [
+            test
+            for test in self.test_files()
+            if test in self._failing or self._changed_since_run(test)
+        ]
+
+    def _changed_since_run(self, test):
+        last_run = self._last_runs.get(test)
+        if last_run is None:
+            return True
+        current = {path: self._files[path][0] for path in self.dependencies(test)}
+        return current != last_run
+
+    def dependencies(self, rel_path):
+        """The file itself and every file of the working directory it imports."""
+        seen = {rel_path}
+        stack = [rel_path]
+        while stack:
+            for module in self._files[stack.pop()][1]:
+                dependency = self._resolve(module)
+                if dependency and dependency not in seen:
+                    seen.add(dependency)
+                    stack.append(dependency)
+        return seen
+
+    def record_run(self, results):
+        """Remember what the test files in `results` ran against, and which failed."""
+        for test, result in results.items():
+            if test not in self._files:
+                continue
+            self._last_runs[test] = {
+                path: self._files[path][0] for path in self.dependencies(test)
+            }
+            if result["failed"]:
+                self._failing.add(test)
+            else:
+                self._failing.discard(test)
+
+    def _imports(self, rel_path):
+        try:
+            with open(os.path.join(self.root, rel_path), "rb") as f:
+                tree = ast.parse(f.read())
+        except (OSError, SyntaxError, ValueError):
+            return set()
+        package = os.path.dirname(rel_path).replace(os.sep, ".")
+        modules = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                base = node.module or ""
+                if node.level:
+                    parts = package.split(".") if package else []
+                    parts = parts[: len(parts) - node.level + 1]
+                    base = ".".join(p for p in parts + [base] if p)
+                if base:
+                    modules.add(base)
+                # `from pkg import calculator` may name a module
+                modules.update(
+                    f"{base}.{alias.name}".lstrip(".") for alias in node.names
+                )
+        return modules
+
+    def _resolve(self, module):
+        path = module.replace(".", os.sep)
+        for candidate in (f"{path}.py", os.path.join(path, "__init__.py")):
+            if candidate in self._files:
+                return candidate
+        return None
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_for(root):
+    with _indexes_lock:
+        if root not in _indexes:
+            _indexes[root] = TestIndex(root)
+        return _indexes[root]
+
+
+def prepare_index(working_directory):
+    """Parse a working directory's import graph ahead of the first run_tests."""
+    index = _index_for(os.path.abspath(working_directory))
+    with index.lock:
+        index.scan()
+
+
+def _run_shards(root, test_files):
+    """Run each test file in its own worker process, several at a time."""
+
+    def run(test_file):
+        if module_name(test_file) is None:
+            return _failure(test_file, "not importable as a module")
+        try:
+            result = subprocess.run(
+                [sys.executable, WORKER, test_file],
+                capture_output=True,
+                text=True,
+                timeout=TEST_TIMEOUT,
+                cwd=root,
+            )
+        except subprocess.TimeoutExpired:
+            return _failure(test_file, f"timed out after {TEST_TIMEOUT} seconds")
+        try:
+            return json.loads(result.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            stderr = "\n".join(result.stderr.strip().splitlines()[-6:])
+            return _failure(
+                test_file, f"worker exited with code {result.returncode}\n{stderr}"
+            )
+
+    workers = max(1, min(len(test_files), os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(test_files, pool.map(run, test_files)))
+
+
+def _failure(test_file, detail):
+    return {
+        "passed": 0,
+        "skipped": 0,
+        "failed": [{"test": test_file, "detail": detail}],
+        "seconds": 0,
+    }
+
+
+def _format_summary(test_files, results, not_run):
+    passed = sum(r["passed"] for r in results.values())
+    skipped = sum(r["skipped"] for r in results.values())
+    failures = [f for r in results.values() for f in r["failed"]]
+    seconds = max((r["seconds"] for r in results.values()), default=0)
+
+    counts = f"{passed} passed, {len(failures)} failed"
+    if skipped:
+        counts += f", {skipped} skipped"
+    files = f"{len(test_files)} test file{'' if len(test_files) == 1 else 's'}"
+    lines = [f"{'FAILED' if failures else 'OK'}: {counts} in {files} ({seconds:.2f}s)"]
+    for test_file in test_files:
+        result = results[test_file]
+        status = "FAILED" if result["failed"] else "ok"
+        lines.append(f"- {test_file}: {status} ({result['passed']} passed)")
+    if not_run:
+        lines.append(f"Not run (unaffected by changes): {', '.join(not_run)}")
+    for failure in failures:
+        lines.append(f"\n{failure['test']}:\n{failure['detail']}")
+
+    text = "\n".join(lines)
+    if len(text) > MAX_CHARS:
+        text = (
+            text[:MAX_CHARS]
+            + f"\n[...Test summary truncated at {MAX_CHARS} characters]"
+        )
+    return text
+
+
+schema_run_tests = genai.types.FunctionDeclaration(
+    name="run_tests",
+    description=(
+        "Runs the tests in the working directory with pytest (unittest TestCases "
+        "included), each test file in its own process, and returns a short "
+        "pass/fail summary. By default only runs tests affected by files changed "
+        "since the last run (all tests on the first run), plus any that failed "
+        "last time."
+    ),
+    parameters=genai.types.Schema(
+        type=genai.types.Type.OBJECT,
+        properties={
+            "paths": genai.types.Schema(
+                type=genai.types.Type.ARRAY,
+                items=genai.types.Schema(type=genai.types.Type.STRING),
+                description="Specific test files to run, relative to the working directory.",
+            ),
+            "scope": genai.types.Schema(
+                type=genai.types.Type.STRING,
+                description='"affected" (default) or "all" to run every test file.',
+            ),
+        },
+    ),
+)
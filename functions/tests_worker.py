@@ -0,0 +1,80 @@
+"""
+Runs one test file under pytest and prints a JSON summary on the last line
+of stdout. run_tests starts one of these per test file, so files run in
+parallel and a crash or hang in one cannot take the others down.
+
+pytest runs unittest TestCases, plain test functions and Test* classes
+alike, with fixtures, parametrization and the working directory's conftest.py.
+
+Usage: python tests_worker.py <test file>   (from the working directory)
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+import pytest
+
+DETAIL_LINES = 6  # traceback lines kept per failure
+
+
+class SummaryPlugin:
+    """Collects the outcome of each test as pytest reports it."""
+
+    def __init__(self):
+        self.passed = set()
+        self.skipped = set()
+        self.failures = {}  # node id -> detail of its first failure
+
+    def pytest_collectreport(self, report):
+        if report.failed:
+            self.failures[report.nodeid] = _tail(report.longreprtext)
+
+    def pytest_runtest_logreport(self, report):
+        # Setup, call and teardown each report; a failure in any one wins
+        if report.failed:
+            self.failures.setdefault(report.nodeid, _tail(report.longreprtext))
+        elif report.skipped:
+            self.skipped.add(report.nodeid)
+        elif report.when == "call":
+            self.passed.add(report.nodeid)
+
+    def summary(self):
+        return {
+            "passed": len(self.passed - self.failures.keys()),
+            "skipped": len(self.skipped - self.failures.keys()),
+            "failed": [
+                {"test": test, "detail": detail}
+                for test, detail in self.failures.items()
+            ],
+        }
+
+
+def main() -> None:
+    test_file = sys.argv[1]
+    sys.path[0] = os.getcwd()  # instead of this script's directory
+    plugin = SummaryPlugin()
+    start = time.perf_counter()
+    # Tests that print, and pytest's own report, must not corrupt the summary line
+    with (
+        contextlib.redirect_stdout(io.StringIO()),
+        contextlib.redirect_stderr(io.StringIO()),
+    ):
+        pytest.main(
+            [test_file, "-q", "-p", "no:cacheprovider", "--tb=short"],
+            plugins=[plugin],
+        )
+    summary = plugin.summary()
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    print(json.dumps(summary))
+
+
+def _tail(text: str) -> str:
+    return "\n".join(text.strip().splitlines()[-DETAIL_LINES:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import glob
+import io
+import os
+import shutil
+import stat
+import tempfile
+import threading
+from typing import Optional, TextIO
+
+# Scratch copies go on tmpfs when there is one
+SCRATCH_PARENT = "/dev/shm" if os.path.isdir("/dev/shm") else None
+SKIPPED_DIRS = {"__pycache__"}
+RESOLVED_CACHE_SIZE = 4096
+DIR_FLAGS = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW | os.O_CLOEXEC
+
+
+class Workspace:
+    """
+    The directory the tools work in. Every tool goes through this class.
+
+    The directory is opened once, and every file is opened and stat'ed
+    relative to it, one path component at a time without following symbolic
+    links, so no path can lead out of it. Directory fds are cached.
+
+    With `overlay=True`, writes are kept in memory instead of going to disk.
+    Reads see the files on disk with the written ones on top, and code runs
+    in a scratch copy of that merged view. commit() writes the changes to
+    disk and discard() drops them.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        overlay: bool = False,
+        files: Optional[dict[str, str]] = None,
+    ):
+        self.root = os.path.abspath(root)
+        self.overlay = overlay
+        # Relative path -> content of every file written to the overlay. May
+        # be a dict from the session state so the overlay survives --resume.
+        self.files = files if files is not None else {}
+        self._scratch: Optional[str] = None
+        self._synced: dict[str, object] = {}  # what each scratch file holds
+        self._resolved: dict[str, Optional[str]] = {}
+        self._dir_fds: dict[str, int] = {}  # relative path -> open directory
+        self._lock = threading.RLock()
+
+    def resolve(self, path: str) -> Optional[str]:
+        """
+        Absolute path of `path` if it is inside the workspace, else None.
+        Only the spelling is checked here (and cached); symbolic links are
+        refused when the path is used.
+        """
+        try:
+            return self._resolved[path]
+        except KeyError:
+            pass
+        abs_path = os.path.normpath(os.path.join(self.root, path))
+        if os.path.commonpath([self.root, abs_path]) != self.root:
+            abs_path = None
+        if len(self._resolved) >= RESOLVED_CACHE_SIZE:
+            self._resolved.clear()
+        self._resolved[path] = abs_path
+        return abs_path
+
+    def is_file(self, abs_path: str) -> bool:
+        if self._rel(abs_path) in self.files:
+            return True
+        st = self._lstat(abs_path)
+        return st is not None and stat.S_ISREG(st.st_mode)
+
+    def is_dir(self, abs_path: str) -> bool:
+        st = self._lstat(abs_path)
+        if st is not None and stat.S_ISDIR(st.st_mode):
+            return True
+        prefix = self._rel(abs_path) + os.sep
+        return any(path.startswith(prefix) for path in self.files)
+
+    def size(self, abs_path: str) -> int:
+        content = self.files.get(self._rel(abs_path))
+        if content is not None:
+            return len(content.encode())
+        st = self._lstat(abs_path)
+        if st is None:
+            raise FileNotFoundError(abs_path)
+        return st.st_size
+
+    def open_text(self, abs_path: str) -> TextIO:
+        content = self.files.get(self._rel(abs_path))
+        if content is not None:
+            return io.StringIO(content)
+        return os.fdopen(self._open(abs_path, os.O_RDONLY), "r")
+
+    def read_bytes(self, abs_path: str) -> bytes:
+        content = self.files.get(self._rel(abs_path))
+        if content is not None:
+            return content.encode()
+        with os.fdopen(self._open(abs_path, os.O_RDONLY), "rb") as f:
+            return f.read()
+
+    def list_dir(self, abs_path: str) -> list[tuple[str, int, bool]]:
+        """(name, size, is_dir) of each entry, overlay files included."""
+        entries = {}
+        rel_dir = self._rel(abs_path)
+        try:
+            dir_fd = self._dir_fd(rel_dir)
+        except (OSError, ValueError):
+            dir_fd = None  # only in the overlay, if anywhere
+        if dir_fd is not None:
+            with os.scandir(dir_fd) as it:
+                for entry in it:
+                    entries[entry.name] = (
+                        entry.name,
+                        entry.stat(follow_symlinks=False).st_size,
+                        entry.is_dir(follow_symlinks=False),
+                    )
+        prefix = "" if rel_dir == "." else rel_dir + os.sep
+        for path, content in self.files.items():
+            if not path.startswith(prefix):
+                continue
+            name, _, rest = path[len(prefix) :].partition(os.sep)
+            if rest:
+                entries.setdefault(name, (name, 0, True))
+            else:
+                entries[name] = (name, len(content.encode()), False)
+        return list(entries.values())
+
+    def write_text(self, abs_path: str, content: str) -> None:
+        rel_path = self._rel(abs_path)
+        self._check_writable(rel_path)
+        if self.overlay:
+            self.files[rel_path] = content
+            return
+        self._write_disk(rel_path, content)
+
+    def execution_root(self) -> str:
+        """
+        Directory to run code in: the workspace itself, or a scratch copy of
+        the merged view while the overlay holds changes.
+        """
+        if not self.files:
+            return self.root
+        return self._materialize()
+
+    def commit(self) -> list[str]:
+        """Write every overlay file to disk; returns their paths."""
+        written = sorted(self.files)
+        for path in written:
+            self._write_disk(path, self.files[path])
+        self.files.clear()
+        return written
+
+    def discard(self) -> list[str]:
+        """Drop every overlay file; returns their paths."""
+        dropped = sorted(self.files)
+        self.files.clear()
+        return dropped
+
+    def close(self) -> None:
+        if self._scratch is not None:
+            shutil.rmtree(self._scratch, ignore_errors=True)
+            self._scratch = None
+            self._synced = {}
+        self._close_dir_fds()
+
+    def refresh(self) -> None:
+        """
+        Forget cached directory fds. A cached fd notices its directory being
+        removed, but not being renamed, so call this after running code that
+        may have moved directories around.
+        """
+        self._close_dir_fds()
+
+    def __del__(self) -> None:
+        if hasattr(self, "_dir_fds"):
+            self._close_dir_fds()
+
+    def _rel(self, abs_path: str) -> str:
+        return os.path.relpath(abs_path, self.root)
+
+    def _dir_fd(self, rel_dir: str, create: bool = False) -> int:
+        """
+        Open directory `rel_dir` relative to the workspace, one component at
+        a time and refusing symbolic links, or return the cached fd. Raises
+        OSError if it does not exist or leads through a link.
+        """
+        with self._lock:
+            fd = self._dir_fds.get(rel_dir)
+            if fd is not None:
+                if os.fstat(fd).st_nlink > 0:
+                    return fd
+                # Removed since it was opened; it may have been recreated
+                os.close(fd)
+                del self._dir_fds[rel_dir]
+            if rel_dir == ".":
+                fd = os.open(self.root, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+            else:
+                parent, name = os.path.split(rel_dir)
+                parent_fd = self._dir_fd(parent or ".", create)
+                if create:
+                    try:
+                        os.mkdir(name, dir_fd=parent_fd)
+                    except FileExistsError:
+                        pass
+                fd = os.open(name, DIR_FLAGS, dir_fd=parent_fd)
+            self._dir_fds[rel_dir] = fd
+            return fd
+
+    def _lstat(self, abs_path: str) -> Optional[os.stat_result]:
+        rel_path = self._rel(abs_path)
+        try:
+            if rel_path == ".":
+                return os.fstat(self._dir_fd("."))
+            parent, name = os.path.split(rel_path)
+            return os.stat(
+                name, dir_fd=self._dir_fd(parent or "."), follow_symlinks=False
+            )
+        except (OSError, ValueError):  # ValueError: a NUL byte in the path
+            return None
+
+    def _open(self, abs_path: str, flags: int, create: bool = False) -> int:
+        parent, name = os.path.split(self._rel(abs_path))
+        parent_fd = self._dir_fd(parent or ".", create)
+        return os.open(
+            name, flags | os.O_NOFOLLOW | os.O_CLOEXEC, 0o644, dir_fd=parent_fd
+        )
+
+    def _check_writable(self, rel_path: str) -> None:
+        """Refuse a path that leads through, or ends in, a symbolic link."""
+        parent, name = os.path.split(rel_path)
+        try:
+            parent_fd = self._dir_fd(parent or ".")
+            st = os.stat(name, dir_fd=parent_fd, follow_symlinks=False)
+        except FileNotFoundError:
+            return  # created on write
+        except ValueError:
+            raise PermissionError(f"{rel_path!r} is not a valid path") from None
+        except OSError:
+            raise PermissionError(
+                f'"{rel_path}" leads through a symbolic link'
+            ) from None
+        if stat.S_ISLNK(st.st_mode):
+            raise PermissionError(f'"{rel_path}" is a symbolic link')
+
+    def _write_disk(self, rel_path: str, content: str) -> None:
+        fd = self._open(
+            os.path.join(self.root, rel_path),
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+            create=True,
+        )
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+
+    def _close_dir_fds(self) -> None:
+        with self._lock:
+            for fd in self._dir_fds.values():
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+            self._dir_fds.clear()
+
+    def _materialize(self) -> str:
+        """
+        Bring the scratch copy up to date, copying only files that changed
+        since the last call. Files a script creates in the scratch copy are
+        left there but never reach the overlay.
+        """
+        if self._scratch is None:
+            self._scratch = tempfile.mkdtemp(prefix="workspace-", dir=SCRATCH_PARENT)
+
+        wanted: dict[str, object] = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [
+                d for d in dirnames if not d.startswith(".") and d not in SKIPPED_DIRS
+            ]
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                st = os.lstat(path)
+                if stat.S_ISLNK(st.st_mode):
+                    continue  # never copy in what a link points at
+                wanted[self._rel(path)] = (st.st_mtime_ns, st.st_size)
+        for path, content in self.files.items():
+            wanted[path] = content
+
+        for path, source in wanted.items():
+            if self._synced.get(path) == source:
+                continue
+            target = os.path.join(self._scratch, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if isinstance(source, str):
+                with open(target, "w") as f:
+                    f.write(source)
+            else:
+                shutil.copy2(os.path.join(self.root, path), target)
+            _drop_bytecode(target)
+            self._synced[path] = source
+        for path in set(self._synced) - set(wanted):
+            try:
+                os.remove(os.path.join(self._scratch, path))
+            except OSError:
+                pass
+            del self._synced[path]
+        return self._scratch
+
+
+def _drop_bytecode(path: str) -> None:
+    # Bytecode is only checked against the source's mtime in whole seconds
+    # and its size, which two quick edits of the same length can share
+    directory, filename = os.path.split(path)
+    stem, extension = os.path.splitext(filename)
+    if extension != ".py":
+        return
+    cache_dir = glob.escape(os.path.join(directory, "__pycache__"))
+    for cached in glob.glob(os.path.join(cache_dir, f"{glob.escape(stem)}.*.pyc")):
+        os.remove(cached)
+
+
+_shared: dict[str, Workspace] = {}
+_shared_lock = threading.Lock()
+
+
+def as_workspace(working_directory) -> Workspace:
+    """
+    Tools accept either a Workspace or a plain directory path. A path maps
+    to one shared Workspace, so its directory fds and resolved paths are
+    reused from call to call.
+    """
+    if isinstance(working_directory, Workspace):
+        return working_directory
+    root = os.path.abspath(working_directory)
+    with _shared_lock:
+        if root not in _shared:
+            _shared[root] = Workspace(root)
+        return _shared[root]
@@ -2,32 +2,43 @@ import os
 
 from google import genai
 
+from config import WRITE_FILE_CHECK
+from functions.check_python import check_syntax, import_checker, module_name
+from functions.workspace import as_workspace
+
 
 def write_file(working_directory, file_path, content):
-    abs_working_dir = os.path.abspath(working_directory)
-    abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
-    if not abs_file_path.startswith(abs_working_dir):
+    workspace = as_workspace(working_directory)
+    abs_file_path = workspace.resolve(file_path)
+    if abs_file_path is None:
         return f'Error: Cannot write to "{file_path}" as it is outside the permitted working directory'
-    if not os.path.exists(abs_file_path):
-        try:
-            os.makedirs(os.path.dirname(abs_file_path), exist_ok=True)
-        except Exception as e:
-            return f"Error: creating directory: {e}"
-    if os.path.exists(abs_file_path) and os.path.isdir(abs_file_path):
+    if workspace.is_dir(abs_file_path):
         return f'Error: "{file_path}" is a directory, not a file'
     try:
-        with open(abs_file_path, "w") as f:
-            f.write(content)
-        return (
-            f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
-        )
+        workspace.write_text(abs_file_path, content)
     except Exception as e:
         return f"Error: writing to file: {e}"
 
+    result = f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
+    if WRITE_FILE_CHECK == "off" or not file_path.endswith(".py"):
+        return result
+    # Report broken code now rather than after another turn spent running it
+    error = check_syntax(content, file_path)
+    if error:
+        return f"{result}\n{error}\nThe file was written anyway; fix it with another write_file call."
+    if WRITE_FILE_CHECK == "import":
+        module = module_name(os.path.relpath(abs_file_path, workspace.root))
+        if module:
+            error = import_checker.check(workspace.execution_root(), module)
+            if error:
+                return f'{result}\nImporting "{file_path}" failed:\n{error}'
+            return f"{result} Syntax and import check passed."
+    return f"{result} Syntax check passed."
+
 
 schema_write_file = genai.types.FunctionDeclaration(
     name="write_file",
-    description="Writes content to a file within the working directory. Creates the file if it doesn't exist.",
+    description="Writes content to a file within the working directory. Creates the file if it doesn't exist. For Python files the result also reports any syntax error, with its line and column.",
     parameters=genai.types.Schema(
         type=genai.types.Type.OBJECT,
         properties={
@@ -0,0 +1,202 @@
+import math
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from functools import partial
+from time import perf_counter
+from typing import Any, Optional, Protocol
+
+from google import genai
+
+from config import (
+    HEDGE_BUDGET,
+    HEDGE_MIN_DELAY,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    LATENCY_WINDOW,
+    REQUEST_TIMEOUT,
+)
+
+
+class Quota(Protocol):
+    """A request and token budget that hedges are charged to as well."""
+
+    def try_acquire(self) -> bool:
+        """Take a request from the budget if one is free right now."""
+        ...
+
+    def add_tokens(self, tokens: int) -> None: ...
+
+
+class HedgedRequests:
+    """
+    Sends model requests with a timeout, and hedges slow ones: once a request
+    has taken longer than the given percentile of that model's recent
+    latencies, an identical second request is sent and whichever answers
+    first is used. Hedges are limited to a fraction of all requests.
+
+    The client is synchronous, so the losing request cannot be interrupted;
+    it is abandoned and its response dropped when it arrives. Each attempt
+    runs in a daemon thread, so an abandoned one never delays exit.
+    """
+
+    def __init__(
+        self,
+        percentile: Optional[float] = HEDGE_PERCENTILE,
+        budget: float = HEDGE_BUDGET,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        min_delay: float = HEDGE_MIN_DELAY,
+        timeout: float = REQUEST_TIMEOUT,
+    ):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.timeout = timeout
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        # How long the first attempt took, per model, whether or not a hedge
+        # beat it: the latency the session would have seen without hedging
+        self._primary: dict[str, deque[float]] = {}
+        self._unhedged: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._hedged: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def generate(
+        self,
+        client: genai.Client,
+        model: str,
+        contents: list[genai.types.Content],
+        quota: Optional[Quota] = None,
+    ) -> Any:
+        """
+        The first answer to `contents`. With a `quota`, a hedge is only sent
+        if the quota has a request free, and the tokens of the answer that
+        is not used are added to it once that answer arrives.
+        """
+        start = perf_counter()
+        # The caller appends to its list once an answer is in; an abandoned
+        # attempt must not see that
+        contents = list(contents)
+        with self._lock:
+            self.requests += 1
+        primary = self._start(client, model, contents, start, primary=True)
+        pending = {primary}
+
+        delay = self.hedge_delay(model)
+        if delay is not None and delay < self.timeout:
+            done, _ = wait(pending, timeout=delay)
+            if not done and self._take_hedge(quota):
+                pending.add(self._start(client, model, contents, start, primary=False))
+        attempts = set(pending)
+
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = self.timeout - (perf_counter() - start)
+            done, pending = wait(
+                pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    with self._lock:
+                        self._hedged.append(perf_counter() - start)
+                        if future is not primary:
+                            self.hedge_wins += 1
+                    if quota is not None:
+                        for other in attempts - {future}:
+                            other.add_done_callback(partial(_charge_tokens, quota))
+                    return future.result()
+                error = error or future.exception()
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"Model request timed out after {self.timeout} seconds")
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """How long to wait before hedging, or None while there is too little history."""
+        if self.percentile is None:
+            return None
+        with self._lock:
+            samples = list(self._primary.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return max(percentile(samples, self.percentile), self.min_delay)
+
+    def report(self) -> list[str]:
+        with self._lock:
+            if not self._hedged:
+                return []
+            hedged, unhedged = list(self._hedged), list(self._unhedged)
+            requests, hedges, wins = self.requests, self.hedges, self.hedge_wins
+        return [
+            f"Model latency p50/p95/p99 over {requests} request(s): "
+            f"{_percentiles(hedged)} with hedging, {_percentiles(unhedged)} without",
+            f"Hedged requests: {hedges} ({wins} answered first by the hedge)",
+        ]
+
+    def _take_hedge(self, quota: Optional[Quota]) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            if quota is not None and not quota.try_acquire():
+                return False
+            self.hedges += 1
+            return True
+
+    def _start(
+        self,
+        client: genai.Client,
+        model: str,
+        contents: list[genai.types.Content],
+        start: float,
+        primary: bool,
+    ) -> Future:
+        future: Future = Future()
+
+        def run() -> None:
+            try:
+                response = client.models.generate_content(
+                    model=model, contents=contents
+                )
+            except BaseException as e:
+                future.set_exception(e)
+                return
+            if primary:
+                seconds = perf_counter() - start
+                with self._lock:
+                    self._primary.setdefault(
+                        model, deque(maxlen=LATENCY_WINDOW)
+                    ).append(seconds)
+                    self._unhedged.append(seconds)
+            future.set_result(response)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+
+def _charge_tokens(quota: Quota, future: Future) -> None:
+    if future.exception() is not None:
+        return
+    usage = future.result().usage_metadata
+    if usage is not None:
+        quota.add_tokens(
+            (usage.prompt_token_count or 0) + (usage.candidates_token_count or 0)
+        )
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * p / 100))
+    return ordered[rank - 1]
+
+
+def _percentiles(values: list[float]) -> str:
+    if not values:
+        return "n/a"
+    return "/".join(f"{percentile(values, p):.2f}s" for p in (50, 95, 99))
+
+
+hedged_requests = HedgedRequests()
@@ -0,0 +1,154 @@
+import hashlib
+import json
+from typing import Any, Optional, TypedDict
+
+from config import MAX_STALLED_TURNS
+
+# Calls that only observe the workspace. An identical repeat with no other call
+# in between can be answered from the earlier result. run_python_file is left
+# out: a script may write files or print something different each run.
+READ_ONLY_FUNCTIONS = {
+    "get_files_info",
+    "get_file_content",
+    "get_files_content",
+    "get_file_outline",
+    "describe_tools",
+}
+
+# How many earlier turns to compare against when looking for cycles
+CYCLE_WINDOW = 6
+
+
+class NoProgressError(Exception):
+    """Raised when several turns in a row have produced nothing new."""
+
+
+class TurnReport(TypedDict):
+    repeats_turn: Optional[int]  # earlier turn with exactly the same calls
+    stalled: int  # turns in a row without anything new
+    note: Optional[str]  # steering note to append to the results
+
+
+class LoopGuard:
+    """
+    Spots wasted agent turns: exact repeats of read-only calls, turns that
+    repeat an earlier turn's calls, and runs of turns that learn nothing new.
+
+    Counters and fingerprints live in the session state dict so they are
+    checkpointed with the session; cached results are kept in memory only.
+    """
+
+    def __init__(self, state: dict[str, Any]):
+        self.stats = state.setdefault(
+            "loop_guard",
+            {
+                "turn": 0,
+                "turns": [],  # call fingerprint of each recent turn
+                "seen_results": [],  # fingerprints of every result so far
+                "stalled": 0,
+                "cached_calls": 0,
+                "saved_chars": 0,
+            },
+        )
+        self._seen_results = set(self.stats["seen_results"])
+        self._cache: dict[str, tuple[int, Any]] = {}
+        self._turn_calls: list[str] = []
+        self._turn_progress = False
+
+    def cached_result(self, name: str, params: dict[str, Any]) -> Optional[str]:
+        """Short stand-in for an exact repeat of an unchanged read, else None."""
+        if name not in READ_ONLY_FUNCTIONS:
+            return None
+        hit = self._cache.get(call_fingerprint(name, params))
+        if hit is None:
+            return None
+
+        _, result = hit
+        note = (
+            "(Identical to the result of this same call earlier in the "
+            "conversation; nothing in the workspace has changed since.)"
+        )
+        self.stats["cached_calls"] += 1
+        self.stats["saved_chars"] += max(len(str(result)) - len(note), 0)
+        return note
+
+    def record_call(
+        self, name: str, params: dict[str, Any], result: Any, failed: bool = False
+    ) -> None:
+        fingerprint = call_fingerprint(name, params)
+        self._turn_calls.append(fingerprint)
+        if name not in READ_ONLY_FUNCTIONS:
+            # Anything that may have changed the workspace invalidates reads.
+            # It only counts as progress below if it is not an exact repeat,
+            # so writing the same content back and forth still stalls.
+            self._cache.clear()
+        elif not failed:
+            self._cache[fingerprint] = (self.stats["turn"] + 1, result)
+
+        result_fingerprint = _digest(f"{fingerprint}:{result}")
+        if result_fingerprint not in self._seen_results:
+            self._seen_results.add(result_fingerprint)
+            self.stats["seen_results"].append(result_fingerprint)
+            self._turn_progress = True
+
+    def record_cached_call(self, name: str, params: dict[str, Any]) -> None:
+        self._turn_calls.append(call_fingerprint(name, params))
+
+    def forget_results(self) -> None:
+        """
+        Call when earlier results have been dropped from the conversation:
+        the model can no longer see them, so calls repeating them are neither
+        answered from the cache nor counted as stalling.
+        """
+        self._cache.clear()
+        self._seen_results.clear()
+        self.stats["seen_results"] = []
+
+    def end_turn(self) -> TurnReport:
+        """Close the current turn and say whether it repeated earlier ones."""
+        stats = self.stats
+        stats["turn"] += 1
+        turn_fingerprint = _digest("|".join(sorted(self._turn_calls)))
+
+        repeats_turn = None
+        recent = stats["turns"][-CYCLE_WINDOW:]
+        for offset, earlier in enumerate(reversed(recent), 1):
+            if earlier == turn_fingerprint:
+                repeats_turn = stats["turn"] - offset
+                break
+        stats["turns"] = recent + [turn_fingerprint]
+
+        stats["stalled"] = 0 if self._turn_progress else stats["stalled"] + 1
+        self._turn_calls = []
+        self._turn_progress = False
+
+        note = None
+        if stats["stalled"]:
+            note = (
+                "Note: these calls repeat earlier ones and returned nothing new. "
+                "Do not repeat them. Use the results "
+                "you already have and take the next step: read a file you have "
+                "not read yet, make an edit, run the code, or give your final "
+                "answer."
+            )
+        return {"repeats_turn": repeats_turn, "stalled": stats["stalled"], "note": note}
+
+    def check_progress(self) -> None:
+        """
+        Raise NoProgressError once MAX_STALLED_TURNS turns in a row have
+        produced no new result and changed nothing.
+        """
+        stalled = self.stats["stalled"]
+        if stalled >= MAX_STALLED_TURNS:
+            raise NoProgressError(
+                f"No progress in the last {stalled} turns: every call repeated "
+                "an earlier one and nothing in the workspace changed."
+            )
+
+
+def call_fingerprint(name: str, params: dict[str, Any]) -> str:
+    return _digest(json.dumps([name, params], sort_keys=True, default=str))
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
@@ -1,59 +1,339 @@
 import argparse
 import os
 import sys
-from time import sleep
+from functools import partial
+from time import perf_counter, sleep
 from typing import Any, Optional
 
 from dotenv import load_dotenv
 from google import genai
 
+from branches import explore_branches, starts_editing
 from call_function import call_function
-from config import MAX_ITERS
-from parse_response import process_model_response
-from prompts import available_functions, system_prompt
-
-
-def main() -> None:
+from config import (
+    MAX_ITERS,
+    MAX_PROMPT_TOKENS,
+    MODEL,
+    RECENT_TOOL_TURNS,
+    WORKING_DIR,
+)
+from functions.workspace import Workspace
+from hedging import Quota, hedged_requests
+from loop_guard import LoopGuard, NoProgressError
+from parse_response import needs_repair, process_model_response, repair_model_response
+from prompts import (
+    available_functions,
+    build_system_prompt,
+    select_tool_section,
+    tool_tokens_saved,
+    with_tool_section,
+)
+from results import format_function_results
+from router import (
+    FixedRouter,
+    Router,
+    TieredRouter,
+    format_routing_stats,
+    record_request,
+    record_turn,
+)
+from session import SessionLog, load_session, replaced_messages
+from snapshot import build_workspace_snapshot
+from tokens import token_estimator
+
+
+def main(
+    argv: Optional[list[str]] = None, client: Optional[genai.Client] = None
+) -> None:
     parser = argparse.ArgumentParser(description="AI Code Assistant")
-    parser.add_argument("user_prompt", type=str, help="Prompt to send to Gemini")
+    parser.add_argument(
+        "user_prompt", type=str, nargs="?", help="Prompt to send to Gemini"
+    )
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--resume",
+        metavar="SESSION",
+        help="Continue a checkpointed session file from its last completed step",
+    )
+    parser.add_argument(
+        "--snapshot",
+        choices=["outline", "tree", "off"],
+        default="outline",
+        help="Workspace snapshot to include in the first prompt so the model "
+        "can skip directory listings (default: outline)",
+    )
+    parser.add_argument(
+        "--overlay",
+        action="store_true",
+        help="Keep edits in memory and write them to disk only when the agent "
+        "gives its final answer",
+    )
+    parser.add_argument(
+        "--branches",
+        type=int,
+        default=1,
+        metavar="N",
+        help="When the agent starts editing, race N attempts in separate "
+        "overlays; the first whose tests pass is kept",
+    )
+    parser.add_argument(
+        "--model",
+        help="Use this model for every turn instead of picking one per turn "
+        "(see TURN_MODELS in config.py)",
+    )
+    args = parser.parse_args(argv)
+    if not args.user_prompt and not args.resume:
+        parser.error("a prompt is required unless --resume is given")
+
+    if client is None:
+        client = create_client()
+
+    if args.resume:
+        session = load_session(args.resume)
+        if session["final_response"] is not None:
+            print("Session already finished. Final response:")
+            print(session["final_response"])
+            return
+        messages = session["messages"]
+        start = session["iteration"]
+        pending_response = session["pending_response"]
+        state = session["state"]
+        log = SessionLog.resume(args.resume, state)
+        if args.verbose:
+            print(f"Resuming {args.resume} at iteration {start + 1}\n")
+    else:
+        snapshot = None
+        if args.snapshot != "off":
+            snapshot = build_workspace_snapshot(
+                WORKING_DIR, outline=args.snapshot == "outline"
+            )
+        messages = [
+            genai.types.Content(
+                role="user",
+                parts=[
+                    genai.types.Part(
+                        text=build_system_prompt(snapshot, task=args.user_prompt)
+                    )
+                ],
+            ),
+            genai.types.Content(
+                role="user", parts=[genai.types.Part(text=args.user_prompt)]
+            ),
+        ]
+        start = 0
+        pending_response = None
+        state = {}
+        log = SessionLog.create(messages)
+        if args.verbose:
+            print(f"User prompt: {args.user_prompt}\n")
+            print(f"Session file: {log.path}\n")
+    guard = LoopGuard(state)
+    router = FixedRouter(args.model) if args.model else TieredRouter()
+    workspace = None
+    if args.overlay or "overlay_files" in state:
+        # Shares the dict with the session state, so pending edits are
+        # checkpointed with every step and survive --resume
+        workspace = Workspace(
+            WORKING_DIR, overlay=True, files=state.setdefault("overlay_files", {})
+        )
 
-    load_dotenv()
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY environment variable not set")
+    try:
+        for i in range(start, MAX_ITERS):
+            if args.verbose:
+                print(f"--- Iteration {i + 1} ---")
+
+            try:
+                earlier = list(messages)
+                if pending_response is not None:
+                    # The model already answered this turn before the last
+                    # run stopped; handle that answer instead of asking again
+                    response_text = pending_response
+                    pending_response = None
+                else:
+                    response_text = request_model_response(
+                        client, messages, args.verbose, state, router
+                    )
+                    log.record_response(i, response_text)
+
+                if args.branches > 1 and starts_editing(response_text):
+                    race_branches(
+                        client, messages, state, response_text, i, args, log, router
+                    )
+                    return
+
+                try:
+                    final_response = process_model_turn(
+                        response_text, messages, args.verbose, state, guard, workspace
+                    )
+                except NoProgressError:
+                    # The turn itself completed; keep it so --resume can
+                    # give the model another chance
+                    checkpoint(log, i, earlier, messages, state)
+                    raise
+                checkpoint(log, i, earlier, messages, state)
+                if final_response is not None:
+                    if workspace is not None:
+                        written = workspace.commit()
+                        if written:
+                            print(
+                                f"Wrote {len(written)} edited file(s): {', '.join(written)}"
+                            )
+                    log.finish(i, final_response)
+                    if args.verbose:
+                        print_session_stats(state)
+                    print("Final response:")
+                    print(final_response)
+                    return
+
+                # Add delay between iterations to try to avoid rate limits
+                # Delay increases by 2 seconds each iteration
+                sleep(5 + i * 2)
+            except NoProgressError as e:
+                print(f"Stopping early: {e}", file=sys.stderr)
+                print_iterations_saved(state, MAX_ITERS - i - 1)
+                print_session_stats(state)
+                print_pending_edits(workspace)
+                sys.exit(1)
+            except Exception as e:
+                print(f"Error in generate_content: {e}", file=sys.stderr)
+                print_pending_edits(workspace)
+                print(f"Resume with: --resume {log.path}", file=sys.stderr)
+                sys.exit(1)
+    except KeyboardInterrupt:
+        print_pending_edits(workspace)
+        print(f"\nInterrupted. Resume with: --resume {log.path}", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        log.close()
+        if workspace is not None:
+            workspace.close()
 
-    client = genai.Client(api_key=api_key)
-    messages = [
-        genai.types.Content(role="user", parts=[genai.types.Part(text=system_prompt)]),
-        genai.types.Content(
-            role="user", parts=[genai.types.Part(text=args.user_prompt)]
-        ),
-    ]
     if args.verbose:
-        print(f"User prompt: {args.user_prompt}\n")
+        print_session_stats(state)
+    print_pending_edits(workspace)
+    print(f"Maximum iterations ({MAX_ITERS}) reached", file=sys.stderr)
+    sys.exit(1)
 
-    for i in range(MAX_ITERS):
-        if args.verbose:
-            print(f"--- Iteration {i + 1} ---")
 
-        try:
-            final_response = generate_content(client, messages, args.verbose)
-            if final_response is not None:
-                print("Final response:")
-                print(final_response)
-                return
-
-            # Add delay between iterations to try to avoid rate limits
-            # Delay increases by 2 seconds each iteration
-            sleep(5 + i * 2)
-        except Exception as e:
-            print(f"Error in generate_content: {e}", file=sys.stderr)
-            sys.exit(1)
+def race_branches(
+    client: genai.Client,
+    messages: list[genai.types.Content],
+    state: dict[str, Any],
+    response_text: str,
+    iteration: int,
+    args: argparse.Namespace,
+    log: SessionLog,
+    router: Optional[Router] = None,
+) -> None:
+    print(f"Racing {args.branches} branches from iteration {iteration + 1}")
+    result, report = explore_branches(
+        client,
+        messages,
+        state,
+        response_text,
+        args.branches,
+        iteration,
+        partial(request_model_response, router=router),
+        process_model_turn,
+    )
+    for line in report:
+        print(line)
+    if result is None:
+        print("No branch produced changes that pass the tests", file=sys.stderr)
+        print(f"Resume with: --resume {log.path}", file=sys.stderr)
+        sys.exit(1)
+
+    written = result["workspace"].commit()
+    result["workspace"].close()
+    if written:
+        print(f"Wrote {len(written)} edited file(s): {', '.join(written)}")
+    checkpoint(log, iteration, messages, result["messages"], result["state"])
+    log.finish(iteration, result["final_response"])
+    if args.verbose:
+        print(result["verification"])
+        print_session_stats(result["state"])
+    print("Final response:")
+    print(result["final_response"])
 
-    print(f"Maximum iterations ({MAX_ITERS}) reached", file=sys.stderr)
-    sys.exit(1)
+
+def checkpoint(
+    log: SessionLog,
+    iteration: int,
+    earlier: list[genai.types.Content],
+    messages: list[genai.types.Content],
+    state: dict[str, Any],
+) -> None:
+    """Checkpoint the messages a turn added to `earlier`, and those it replaced."""
+    log.checkpoint(
+        iteration,
+        messages[len(earlier) :],
+        state,
+        replaced_messages(earlier, messages),
+    )
+
+
+def print_session_stats(state: dict[str, Any]) -> None:
+    for line in format_routing_stats(state) + hedged_requests.report():
+        print(line)
+    if state.get("tool_tokens_saved"):
+        print(
+            f"Tool schemas left out of prompts: ~{state['tool_tokens_saved']} tokens "
+            "in total"
+        )
+    elided = state.get("elided_results")
+    if elided:
+        print(
+            f"Function results shortened to fit the per-turn budget: "
+            f"{elided['results']} (~{elided['tokens']} tokens left out)"
+        )
+    calibration = token_estimator.report()
+    if calibration:
+        print(calibration)
+    runs = state.get("script_runs")
+    if runs:
+        print(
+            f"Scripts run: {runs['runs']} (wall {runs['wall']:.2f}s, "
+            f"CPU {runs['cpu']:.2f}s, peak RSS {runs['peak_rss'] / 2**20:.1f} MB)"
+        )
+    repairs = state.get("repairs")
+    if repairs:
+        print(
+            f"Local repairs: {repairs['repaired']}/{repairs['attempted']} malformed "
+            f"responses fixed without re-prompting {repairs['fixes']}"
+        )
+    guard = state.get("loop_guard")
+    if guard and guard["cached_calls"]:
+        print(
+            f"Repeated calls answered from earlier results: {guard['cached_calls']} "
+            f"(~{guard['saved_chars'] // 4} tokens kept out of the prompt)"
+        )
+
+
+def print_pending_edits(workspace: Optional[Workspace]) -> None:
+    if workspace is not None and workspace.files:
+        print(
+            f"{len(workspace.files)} edited file(s) were not written to disk: "
+            f"{', '.join(sorted(workspace.files))} (--resume continues with them)",
+            file=sys.stderr,
+        )
+
+
+def print_iterations_saved(state: dict[str, Any], iterations: int) -> None:
+    # Every skipped iteration would have resent at least the current prompt
+    prompt_tokens = state.get("last_prompt_tokens", 0)
+    print(
+        f"Skipped {iterations} remaining iteration(s), "
+        f"~{iterations * prompt_tokens} prompt tokens saved",
+        file=sys.stderr,
+    )
+
+
+def create_client() -> genai.Client:
+    load_dotenv()
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY environment variable not set")
+    return genai.Client(api_key=api_key)
 
 
 def generate_content(
@@ -61,12 +341,57 @@ def generate_content(
     messages: list[genai.types.Content],
     verbose: bool,
 ) -> Optional[str]:
-    response = client.models.generate_content(model="gemma-3-27b-it", contents=messages)
+    response_text = request_model_response(client, messages, verbose)
+    return process_model_turn(response_text, messages, verbose)
+
+
+def request_model_response(
+    client: genai.Client,
+    messages: list[genai.types.Content],
+    verbose: bool,
+    state: Optional[dict[str, Any]] = None,
+    router: Optional[Router] = None,
+    quota: Optional[Quota] = None,
+) -> str:
+    route = None
+    model = MODEL
+    if state is not None:
+        route = (router or TieredRouter()).choose(state)
+        model = route["model"]
+        if verbose:
+            print(f"Model: {model} ({route['turn_type']} turn, {route['reason']})")
+    estimate = token_estimator.estimate_messages(messages)
+    if verbose and messages and messages[0].parts:
+        saved = tool_tokens_saved(messages[0].parts[0].text or "")
+        if state is not None:
+            state["tool_tokens_saved"] = state.get("tool_tokens_saved", 0) + saved
+        print(f"Tool schemas left out of the prompt: ~{saved} tokens")
+    start_time = perf_counter()
+    response = hedged_requests.generate(client, model, messages, quota)
+    seconds = perf_counter() - start_time
     if response.text is None or response.usage_metadata is None:
         raise RuntimeError("Gemini API response appears to be malformed")
 
+    if state is not None:
+        prompt_tokens = response.usage_metadata.prompt_token_count or 0
+        usage = state.setdefault(
+            "usage", {"requests": 0, "prompt_tokens": 0, "response_tokens": 0}
+        )
+        usage["requests"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        response_tokens = response.usage_metadata.candidates_token_count or 0
+        usage["response_tokens"] += response_tokens
+        state["last_prompt_tokens"] = prompt_tokens
+        if route is not None:  # always, when there is a state
+            record_request(state, route, seconds, prompt_tokens, response_tokens)
+    token_estimator.observe(messages, response.usage_metadata.prompt_token_count or 0)
+
     if verbose:
-        print("Prompt tokens:", response.usage_metadata.prompt_token_count)
+        print(
+            "Prompt tokens:",
+            response.usage_metadata.prompt_token_count,
+            f"(estimated {estimate})",
+        )
         print("Response tokens:", response.usage_metadata.candidates_token_count)
 
     response_text = response.text.strip()
@@ -76,10 +401,21 @@ def generate_content(
     if verbose:
         print(f"\nModel response:\n{response_text}\n")
 
-    # Add model's response to messages
-    messages.append(
-        genai.types.Content(role="model", parts=[genai.types.Part(text=response_text)])
-    )
+    return response_text
+
+
+def process_model_turn(
+    response_text: str,
+    messages: list[genai.types.Content],
+    verbose: bool,
+    state: Optional[dict[str, Any]] = None,
+    guard: Optional[LoopGuard] = None,
+    workspace: Optional[Workspace] = None,
+) -> Optional[str]:
+    if state is None:
+        state = {}
+    if guard is None:
+        guard = LoopGuard(state)
 
     parsed_response = process_model_response(response_text, available_functions)
     if verbose:
@@ -87,13 +423,33 @@ def generate_content(
         if parsed_response["errors"]:
             print(f"Parsing errors: {parsed_response['errors']}")
 
+    if needs_repair(parsed_response, response_text):
+        # Most malformed call lists are mechanical mistakes; fixing them here
+        # saves a full model round trip
+        repair = repair_model_response(response_text, available_functions)
+        record_repair(state, repair["fix"] if repair else None)
+        if repair:
+            if verbose:
+                print(f"Repaired function calls locally ({repair['fix']})")
+            parsed_response = repair["response"]
+            # Keep the well-formed version in the history so the model sees
+            # the format it is expected to use
+            response_text = repair["text"]
+
+    # Add model's response to messages
+    messages.append(
+        genai.types.Content(role="model", parts=[genai.types.Part(text=response_text)])
+    )
+
     if parsed_response["type"] == "text":
+        record_turn(state, "final")
         return parsed_response["content"]  # Final answer
 
     if parsed_response["type"] == "error":
         error_message = "I encountered errors parsing your function calls:\n"
         error_message += "\n".join(f"- {err}" for err in parsed_response["errors"])
         error_message += "\n\nPlease format your function calls correctly."
+        record_turn(state, "parse_error")
 
         if verbose:
             print(f"Sending error feedback to model:\n{error_message}\n")
@@ -111,6 +467,7 @@ def generate_content(
         error_message += "\n".join(f"- {err}" for err in parsed_response["errors"])
         error_message += "\n\nPlease fix the function call syntax."
         error_message += "\nCheck the FUNCTION CALL MODE instructions from the first message and try again."
+        record_turn(state, "invalid_calls")
 
         if verbose:
             print(f"Sending validation errors to model:\n{error_message}\n")
@@ -133,12 +490,23 @@ def generate_content(
         if verbose:
             print(f"Calling function: {func_name} with params: {func_params}")
 
+        cached = guard.cached_result(func_name, func_params)
+        if cached is not None:
+            # Nothing has changed since the identical call ran; skip it
+            guard.record_cached_call(func_name, func_params)
+            function_results.append({"name": func_name, "result": cached})
+            if verbose:
+                print(f"-> Repeat of an earlier call: {cached}\n")
+            continue
+
         try:
-            result = call_function(func_name, func_params, verbose)
+            result = call_function(func_name, func_params, verbose, workspace, state)
+            guard.record_call(func_name, func_params, result)
             function_results.append({"name": func_name, "result": result})
             if verbose:
                 print(f"-> Result: {result}\n")
         except Exception as e:
+            guard.record_call(func_name, func_params, str(e), failed=True)
             if verbose:
                 print(f"-> Error: {e}\n")
             function_results.append({"name": func_name, "error": str(e)})
@@ -146,26 +514,100 @@ def generate_content(
     if not function_results:
         raise RuntimeError("No function results generated; exiting.")
 
-    results_text = format_function_results(function_results)
+    results_text = format_function_results(function_results, state=state)
+    report = guard.end_turn()
+    record_turn(state, "calls", function_results, stalled=report["stalled"] > 0)
+    if verbose and report["repeats_turn"] is not None:
+        print(f"These calls repeat turn {report['repeats_turn']}")
+    if report["note"]:
+        results_text += report["note"]
     if verbose:
         print(f"Sending function results back to model:\n{results_text}\n")
 
     messages.append(
         genai.types.Content(role="user", parts=[genai.types.Part(text=results_text)])
     )
+    refresh_tool_section(messages)
+    estimate = fit_prompt_budget(messages, guard)
+    if verbose:
+        print(f"Estimated prompt tokens for the next request: {estimate}")
+    guard.check_progress()
     return None  # Continue loop
 
 
-def format_function_results(function_results: list[dict[str, Any]]) -> str:
-    results_text = "Function execution results:\n\n"
-    for result in function_results:
-        if "error" in result:
-            results_text += f"❌ Function '{result['name']}' failed with error:\n{result['error']}\n\n"
-        else:
-            results_text += (
-                f"✓ Function '{result['name']}' returned:\n{result['result']}\n\n"
-            )
-    return results_text
+def refresh_tool_section(messages: list[genai.types.Content]) -> None:
+    """
+    Give the next prompt full schemas for the tools most relevant to the
+    task and the last RECENT_TOOL_TURNS turns.
+    """
+    if len(messages) < 2 or not messages[0].parts or not messages[1].parts:
+        return
+    prompt = messages[0].parts[0].text or ""
+    task = messages[1].parts[0].text or ""
+    recent = "\n".join(
+        part.text or ""
+        for message in messages[2:][-2 * RECENT_TOOL_TURNS :]
+        for part in message.parts or []
+    )
+    updated = with_tool_section(prompt, select_tool_section(task, recent))
+    if updated != prompt:
+        # A new message rather than an edit, since branches share the old one
+        messages[0] = genai.types.Content(
+            role=messages[0].role, parts=[genai.types.Part(text=updated)]
+        )
+
+
+def record_repair(state: dict[str, Any], fix: Optional[str]) -> None:
+    stats = state.setdefault("repairs", {"attempted": 0, "repaired": 0, "fixes": {}})
+    stats["attempted"] += 1
+    if fix:
+        stats["repaired"] += 1
+        stats["fixes"][fix] = stats["fixes"].get(fix, 0) + 1
+
+
+COMPACTED_RESULTS = (
+    "(The function results of this turn were removed to keep the prompt "
+    "within its token budget. Call the functions again if you still need them.)"
+)
+# Results of the latest turns are never compacted
+KEEP_RECENT_RESULTS = 2
+
+
+def fit_prompt_budget(
+    messages: list[genai.types.Content],
+    guard: Optional[LoopGuard] = None,
+    budget: int = MAX_PROMPT_TOKENS,
+) -> int:
+    """
+    Replace the oldest function results with a short note until the next
+    prompt's estimated size fits in `budget`. The system prompt, the user's
+    request and the latest results are kept. Returns the estimated size.
+    Compacted results are new messages, so the session checkpoint of the
+    turn records them and --resume restores the compacted conversation.
+    """
+    estimate = token_estimator.estimate_messages(messages)
+    if estimate <= budget:
+        return estimate
+    results = [
+        i
+        for i, message in enumerate(messages[2:], 2)
+        if message.role == "user"
+        and message.parts
+        and message.parts[0].text != COMPACTED_RESULTS
+    ]
+    compacted = False
+    for i in results[:-KEEP_RECENT_RESULTS]:
+        if estimate <= budget:
+            break
+        before = token_estimator.estimate_messages([messages[i]])
+        messages[i] = genai.types.Content(
+            role="user", parts=[genai.types.Part(text=COMPACTED_RESULTS)]
+        )
+        estimate -= before - token_estimator.estimate_messages([messages[i]])
+        compacted = True
+    if compacted and guard is not None:
+        guard.forget_results()
+    return estimate
 
 
 if __name__ == "__main__":
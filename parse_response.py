@@ -69,20 +69,32 @@ def contains_function_call(response: str) -> bool:
 
 
 def find_call_list_segment(response: str) -> Optional[str]:
-    # Greedy-match the first [ ... ] block
-    match = re.search(r"\[[\s\S]+\]", response)
-    if not match:
+    # Same block a greedy \[[\s\S]+\] would match: from the first "[" to the
+    # last "]". Found with two plain scans so it is O(n) on any input,
+    # including ones full of unmatched brackets.
+    start = response.find("[")
+    if start == -1:
+        return None
+    end = response.rfind("]")
+    if end < start + 2:
         return None
 
-    segment = match.group(0)
+    segment = response[start : end + 1]
 
-    # Sanity check: does it contain something like "name("?
-    if not re.search(r"\w+\(", segment):
+    # Sanity check: does it contain something like "name("? A single word
+    # character before "(" is enough, and unlike \w+\( it cannot backtrack
+    # over long runs of word characters.
+    if not _NAME_BEFORE_PAREN.search(segment):
         return None
 
     return segment
 
 
+_NAME_BEFORE_PAREN = re.compile(r"\w\(")
+_SPLIT_SPECIAL = re.compile(r"[()'\"\\]")
+_PAREN = re.compile(r"[()]")
+
+
 def extract_function_calls(response: str) -> list[str]:
     segment = find_call_list_segment(response)
     if not segment:
@@ -91,51 +103,70 @@ def extract_function_calls(response: str) -> list[str]:
     # Strip outer brackets
     inner_content = segment.strip()[1:-1]
 
-    # Split by "), " to handle multiple function calls
-    # But be careful with nested structures
+    calls = _split_calls(inner_content, string_aware=True)
+    if calls is None:
+        # An unterminated string; fall back to splitting on parentheses alone
+        calls = _split_calls(inner_content, string_aware=False)
+    return calls or []
+
+
+def _split_calls(inner_content: str, string_aware: bool) -> Optional[list[str]]:
+    """
+    Split "f(a=1), g(b='x')" into its calls in one left-to-right pass.
+
+    Only parentheses outside string literals count towards nesting, so
+    content such as write_file(content="print(')')") stays in one piece.
+    The regex jumps straight to the next character that can change state.
+    Returns None if a string literal is never closed.
+    """
+    special = _SPLIT_SPECIAL if string_aware else _PAREN
     calls = []
     depth = 0
-    current_call = []
-
+    call_start = 0
+    quote = None
     i = 0
-    while i < len(inner_content):
-        char = inner_content[i]
 
-        if char == "(":
+    while True:
+        match = special.search(inner_content, i)
+        if not match:
+            break
+        i = match.end()
+        char = match.group()
+
+        if quote:
+            if char == "\\":
+                i += 1  # skip the escaped character
+            elif char == quote:
+                quote = None
+        elif char == "(":
             depth += 1
-            current_call.append(char)
         elif char == ")":
+            if depth == 0:
+                continue
             depth -= 1
-            current_call.append(char)
-
             # If we've closed all parentheses, we've completed a call
             if depth == 0:
-                call_str = "".join(current_call).strip()
+                call_str = inner_content[call_start:i].lstrip(", \t\r\n").rstrip()
                 if call_str:
                     calls.append(call_str)
-                current_call = []
-                # Skip comma and optional space after
-                if i + 1 < len(inner_content) and inner_content[i + 1] == ",":
-                    i += 1
-                    while i + 1 < len(inner_content) and inner_content[i + 1] == " ":
-                        i += 1
-        else:
-            if depth > 0 or char not in [",", " "] or current_call:
-                current_call.append(char)
-
-        i += 1
+                call_start = i
+        elif char in "'\"" and depth > 0:
+            quote = char
 
+    if quote:
+        return None
     return calls
 
 
 def parse_function_call(call_str: str) -> ParsedFunctionCall:
-    # Extract function name and parameters
-    match = re.match(r"(\w+)\((.*)\)$", call_str.strip())
-    if not match:
+    # Extract function name and parameters: name(...)
+    call_str = call_str.strip()
+    open_paren = call_str.find("(")
+    func_name = call_str[:open_paren] if open_paren > 0 else ""
+    if not call_str.endswith(")") or not _FUNCTION_NAME.fullmatch(func_name):
         raise ValueError(f"Invalid function call format: {call_str}")
 
-    func_name = match.group(1)
-    params_str = match.group(2).strip()
+    params_str = call_str[open_paren + 1 : -1].strip()
 
     # Parse parameters
     params = {}
@@ -145,47 +176,45 @@ def parse_function_call(call_str: str) -> ParsedFunctionCall:
     return {"function": func_name, "parameters": params}
 
 
+_FUNCTION_NAME = re.compile(r"\w+")
+_PARAM_SPECIAL = re.compile(r"[,()\[\]{}'\"\\]")
+
+
 def parse_parameters(params_str: str) -> dict[str, Any]:
     params = {}
 
-    # Split by comma, but respect nested structures
+    # Split by comma, but respect nested structures and string literals.
+    # The regex jumps straight to the next character that can change state.
     parts = []
-    current = []
+    part_start = 0
     depth = 0
-    in_string = False
     string_char = None
-    escape_next = False
-
-    for char in params_str:
-        # Handle escape sequences in strings
-        if escape_next:
-            current.append(char)
-            escape_next = False
-            continue
-
-        if char == "\\" and in_string:
-            current.append(char)
-            escape_next = True
-            continue
-
-        if char in ['"', "'"] and (not in_string or char == string_char):
-            in_string = not in_string
-            string_char = char if in_string else None
-
-        if not in_string:
-            if char in ["(", "[", "{"]:
-                depth += 1
-            elif char in [")", "]", "}"]:
-                depth -= 1
-            elif char == "," and depth == 0:
-                parts.append("".join(current).strip())
-                current = []
-                continue
+    i = 0
 
-        current.append(char)
+    while True:
+        match = _PARAM_SPECIAL.search(params_str, i)
+        if not match:
+            break
+        i = match.end()
+        char = match.group()
+
+        if string_char:
+            if char == "\\":
+                i += 1  # skip the escaped character
+            elif char == string_char:
+                string_char = None
+        elif char in "\"'":
+            string_char = char
+        elif char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(params_str[part_start : i - 1].strip())
+            part_start = i
 
-    if current:
-        parts.append("".join(current).strip())
+    if part_start < len(params_str):
+        parts.append(params_str[part_start:].strip())
 
     # Parse each key=value pair
     for part in parts:
@@ -279,3 +308,157 @@ def validate_type(value: Any, expected_type: genai.types.Type) -> bool:
         return True  # Unknown type, allow it
 
     return isinstance(value, expected_python_type)
+
+
+class RepairResult(TypedDict):
+    fix: str  # name of the repair that produced a valid call list
+    text: str  # the repaired call list
+    response: ParsedResponse
+
+
+_CALL_LIST_START = re.compile(r"\[\s*\w+\s*\(")
+_KWARG_STRING_START = re.compile(r"\b\w+\s*=\s*(['\"])")
+# What may follow the closing quote of a keyword argument: another keyword
+# argument, or the end of the call (followed by another call or the list end)
+_STRING_END = re.compile(r"\s*(?:,\s*\w+\s*=|\)\s*(?:,\s*\w+\s*\(|\]|$))")
+
+
+def needs_repair(parsed: ParsedResponse, response: str) -> bool:
+    if parsed["type"] == "text":
+        # A call list that was cut off before its closing bracket
+        return _CALL_LIST_START.search(response) is not None
+    return parsed["type"] == "error" or not parsed["valid"]
+
+
+def repair_model_response(
+    response: str, function_schemas: list[genai.types.FunctionDeclaration]
+) -> Optional[RepairResult]:
+    """
+    Try a ranked set of deterministic fixes for a malformed call list.
+
+    Returns the first candidate that parses into valid function calls, or None
+    if every fix fails and the model has to be asked again.
+    """
+    segment = _extract_call_list(response)
+    if segment is None:
+        return None
+
+    requoted = _requote_strings(segment)
+    closed = _close_brackets(segment)
+    candidates = [
+        ("extract_call_list", segment),
+        ("requote_strings", requoted),
+        ("close_brackets", closed),
+        ("requote_and_close", _close_brackets(requoted) if requoted else None),
+        ("close_and_requote", _requote_strings(closed)),
+    ]
+
+    tried = {response.strip()}
+    for fix, candidate in candidates:
+        if candidate is None or candidate in tried:
+            continue
+        tried.add(candidate)
+        parsed = process_model_response(candidate, function_schemas)
+        if parsed["type"] == "function_call" and parsed["valid"]:
+            return {"fix": fix, "text": candidate, "response": parsed}
+    return None
+
+
+def _extract_call_list(response: str) -> Optional[str]:
+    # Drop prose and Markdown fences around the list
+    start = _CALL_LIST_START.search(response)
+    if not start:
+        return None
+    end = response.rfind("]")
+    if end < start.start():
+        return response[start.start() :].rstrip().rstrip("`").rstrip()
+    return response[start.start() : end + 1]
+
+
+def _close_brackets(text: str) -> str:
+    closers = []
+    quote = None
+    escaped = False
+    for char in text:
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "([{":
+            closers.append({"(": ")", "[": "]", "{": "}"}[char])
+        elif char in ")]}" and closers and closers[-1] == char:
+            closers.pop()
+
+    return text + (quote or "") + "".join(reversed(closers))
+
+
+def _requote_strings(text: str) -> Optional[str]:
+    """
+    Re-emit every quoted keyword argument as a well-formed double-quoted
+    string: unescaped inner quotes are escaped and raw newlines become \\n.
+    A quote only ends the value when what follows it looks like the next
+    argument or the end of the call.
+    """
+    pieces = []
+    pos = 0
+    while True:
+        match = _KWARG_STRING_START.search(text, pos)
+        if not match:
+            break
+        quote = match.group(1)
+        body_start = match.end()
+        end = _find_string_end(text, body_start, quote)
+        if end is None:
+            return None
+        pieces.append(text[pos : match.start(1)])
+        pieces.append(_double_quoted(text[body_start:end]))
+        pos = end + 1
+    pieces.append(text[pos:])
+    return "".join(pieces)
+
+
+def _find_string_end(text: str, start: int, quote: str) -> Optional[int]:
+    index = start
+    while True:
+        index = text.find(quote, index)
+        if index == -1:
+            return None
+        backslashes = 0
+        while (
+            index - 1 - backslashes >= start and text[index - 1 - backslashes] == "\\"
+        ):
+            backslashes += 1
+        if backslashes % 2 == 0 and _STRING_END.match(text, index + 1):
+            return index
+        index += 1
+
+
+def _double_quoted(body: str) -> str:
+    out = ['"']
+    escaped = False
+    for char in body:
+        if escaped:
+            escaped = False
+            # \' is only needed inside single quotes
+            out.append("'" if char == "'" else "\\" + char)
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            out.append('\\"')
+        elif char == "\n":
+            out.append("\\n")
+        elif char == "\r":
+            out.append("\\r")
+        elif char == "\t":
+            out.append("\\t")
+        else:
+            out.append(char)
+    if escaped:
+        out.append("\\\\")
+    out.append('"')
+    return "".join(out)
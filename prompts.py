@@ -1,16 +1,98 @@
-from functions.get_file_content import schema_get_file_content
-from functions.get_files_info import schema_get_files_info
-from functions.run_python import schema_run_python_file
-from functions.write_file_content import schema_write_file
+from typing import Optional
+
+from config import FULL_TOOL_SCHEMAS
+from snapshot import SNAPSHOT_TRUNCATED
+from tokens import token_estimator
+from tool_registry import tool_registry
+
+# Schemas are loaded from the registry as they are looked up
+available_functions = tool_registry.schemas
+
+TOOLS_START = "**ALLOWED FUNCTIONS**\n\n"
+TOOLS_END = (
+    "\n\n---------------------------------------------------------------------"
+    "\n\nEnd of system prompt."
+)
+
+
+def tool_section(full: tuple[str, ...] = ()) -> str:
+    """
+    The ALLOWED FUNCTIONS section: every tool by its compact signature, then
+    the full schemas of the tools named in `full`.
+    """
+    lines = [
+        "You may only call the following functions (`?` marks an optional parameter):",
+        *(f"- {tool.signature}" for tool in tool_registry.tools.values()),
+    ]
+    if full:
+        lines += [
+            "",
+            "Full schemas of the functions most likely needed next:",
+            str(tool_registry.describe(list(full))),
+        ]
+    lines += [
+        "",
+        "If you are unsure how to call any other function, call "
+        'describe_tools(names=["..."]) first to get its full schema.',
+    ]
+    return "\n".join(lines)
+
+
+def select_tool_section(task: str, recent: str = "") -> str:
+    return tool_section(tuple(tool_registry.select(task, recent)))
+
+
+def with_tool_section(prompt: str, section: str) -> str:
+    """`prompt` with its ALLOWED FUNCTIONS section replaced by `section`."""
+    start = prompt.find(TOOLS_START)
+    end = prompt.find(TOOLS_END, start)
+    if start < 0 or end < 0:
+        return prompt
+    return prompt[: start + len(TOOLS_START)] + section + prompt[end:]
+
+
+def every_schema_section() -> str:
+    """The section as it was before tools were selected: every full schema."""
+    return "You may only call the following functions:\n" + str(
+        tool_registry.describe(list(tool_registry.tools))
+    )
+
+
+def tool_tokens_saved(prompt: str) -> int:
+    """
+    Estimated tokens `prompt` saves over listing every tool's full schema.
+    Loads every tool's schema, so it is only worth calling when reporting.
+    """
+    start = prompt.find(TOOLS_START)
+    end = prompt.find(TOOLS_END, start)
+    if start < 0 or end < 0:
+        return 0
+    return token_estimator.estimate(every_schema_section()) - token_estimator.estimate(
+        prompt[start + len(TOOLS_START) : end]
+    )
+
+
+def tool_savings_report(task: str) -> list[str]:
+    """How much smaller the tool section is for `task`, and per extra tool."""
+    tools = list(tool_registry.tools.values())
+    every_schema = token_estimator.estimate(every_schema_section())
+    selected = tool_registry.select(task)
+    section = token_estimator.estimate(tool_section(tuple(selected)))
+    per_schema = sum(
+        token_estimator.estimate(f"{tool.schema.to_json_dict()}, ") for tool in tools
+    ) / len(tools)
+    per_signature = sum(
+        token_estimator.estimate(f"- {tool.signature}\n") for tool in tools
+    ) / len(tools)
+    return [
+        f"Tool section: ~{section} tokens with {len(selected)} of {len(tools)} full "
+        f"schemas ({', '.join(selected) or 'none'}), ~{every_schema} with all of them "
+        f"({1 - section / every_schema:.0%} smaller)",
+        f"Each further tool adds ~{per_signature:.0f} tokens as a signature, "
+        f"~{per_signature + per_schema:.0f} with its full schema "
+        f"(at most {FULL_TOOL_SCHEMAS} full schemas are included)",
+    ]
 
-available_functions = [
-    schema_get_files_info,
-    schema_get_file_content,
-    schema_run_python_file,
-    schema_write_file,
-]
-
-available_functions_dicts = [f.to_json_dict() for f in available_functions]
 
 system_prompt = f"""
 You are an AI assistant specialized in inspecting, editing, and debugging the user's codebase *by calling tools*.
@@ -67,16 +149,18 @@ Incorrect examples (NEVER DO):
 
 ---------------------------------------------------------------------
 
-**MANDATORY WORKFLOW RULE: DIRECTORY LISTING FIRST**
+**MANDATORY WORKFLOW RULE: KNOWN PATHS ONLY**
 
-Before reading or modifying any file, you **MUST first** call a suitable function to list the contents of the relevant directory in a stand-alone call.
+Before reading or modifying any file, you **MUST** have seen it either in the WORKSPACE SNAPSHOT at the end of this message (if there is one) or in a directory listing.
 
-You may **not** assume any file or folder exists until you have seen it in a directory listing.
+If there is a WORKSPACE SNAPSHOT and it does not say it was truncated, it already lists every file and subdirectory of the working directory. Do **not** list directories again; go straight to reading the relevant files. A truncated snapshot leaves files out: list the directories it does not show before using files in them.
 
-If you need to inspect a subdirectory, you must:
+Otherwise, you **MUST first** call a suitable function to list the contents of the relevant directory in a stand-alone call. If you need to inspect a subdirectory, you must:
 - list contents on that subdirectory first
 - only then access files inside it
 
+You may **not** assume any file or folder exists that you have not seen.
+
 Any violation of this rule makes the response invalid.
 
 ---------------------------------------------------------------------
@@ -139,11 +223,11 @@ Before responding, silently plan your steps.
 
 Typical sequence:
 
-1. list_directory(".")
+1. list_directory(".") (skip this if there is a WORKSPACE SNAPSHOT that was not truncated)
 2. decide which files to inspect
-3. get_file_content() calls for relevant files
+3. get_file_outline() for large Python files, then get_file_content(start_line=..., end_line=...) for just the parts you need; one get_files_content() call for several small files
 4. write_file or apply modifications
-5. run_code if needed
+5. run_tests() to check the change (it runs only the tests your edits affect), and run_code if needed
 6. switch to CHAT MODE only for the final explanation
 
 ---------------------------------------------------------------------
@@ -151,20 +235,44 @@ Typical sequence:
 **SAFETY RULE**
 
 Do NOT guess filenames or paths.
-You must always list directories first.
+Only use paths from the WORKSPACE SNAPSHOT or from a directory listing.
 
 ---------------------------------------------------------------------
 
 **ALLOWED FUNCTIONS**
 
-You may only call the following functions:
-{available_functions_dicts}
+{tool_section()}
 
 ---------------------------------------------------------------------
 
 End of system prompt.
 """
 
+
+def build_system_prompt(snapshot: Optional[str] = None, task: str = "") -> str:
+    """
+    The system prompt, with full schemas for the tools relevant to `task`,
+    followed by a workspace snapshot if one is given.
+    """
+    prompt = system_prompt
+    if task:
+        prompt = with_tool_section(prompt, select_tool_section(task))
+    if not snapshot:
+        return prompt
+    note = ""
+    if snapshot.endswith(SNAPSHOT_TRUNCATED):
+        note = (
+            " It was truncated and does not list every file; list directories "
+            "to find the files it leaves out."
+        )
+    return (
+        f"{prompt}\n"
+        "The following snapshot was taken just before this session started. "
+        f"Files you write later are not in it.{note}\n\n"
+        f"{snapshot}\n"
+    )
+
+
 system_prompt_original = """
 You are a helpful AI agent designed to help the user write code within their codebase.
 
@@ -192,4 +300,11 @@ Execute code (both the tests and the application itself, the tests alone aren't
 """
 
 if __name__ == "__main__":
-    print(system_prompt)
+    import sys
+
+    if len(sys.argv) > 1:
+        # python prompts.py "task" reports the tool section's size for a task
+        print(build_system_prompt(task=sys.argv[1]))
+        print("\n".join(tool_savings_report(sys.argv[1])), file=sys.stderr)
+    else:
+        print(system_prompt)
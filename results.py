@@ -0,0 +1,161 @@
+import re
+from typing import Any, Callable, Optional
+
+from config import MAX_READ_TOKENS, MAX_TURN_RESULT_TOKENS
+from tokens import token_estimator
+
+# Every result keeps at least this much of its budget share, so a turn with
+# many results still shows the start of each one
+MIN_RESULT_TOKENS = 100
+# Share of a shortened output kept from its start; the rest comes from its
+# end, where tracebacks and final summaries are
+HEAD_SHARE = 0.4
+# Room left in a shortened result for the note saying what was elided
+MARKER_TOKENS = 20
+# Room left in a turn's results for the note on how to get what was elided
+FOOTER_TOKENS = 70
+
+# Results that read files are cut at the end, so the model can read on from
+# where they stop; anything else keeps its head and its tail
+READ_FUNCTIONS = {"get_file_content", "get_files_content", "describe_tools"}
+LISTING_FUNCTIONS = {"get_files_info"}
+
+_LISTING_LINE = re.compile(r"- (.+): file_size=(\d+) bytes, is_dir=(True|False)")
+
+
+def result_priority(result: dict[str, Any]) -> int:
+    """
+    Lower goes first when the turn's budget is shared out: errors, then
+    failing tests and crashed scripts, then other results, then listings.
+    """
+    text = str(result.get("result", ""))
+    if "error" in result or text.startswith("Error"):
+        return 0
+    if result["name"] == "run_tests" and text.startswith("FAILED"):
+        return 1
+    if result["name"] == "run_python_file" and "Process exited with code" in text:
+        return 1
+    if result["name"] in LISTING_FUNCTIONS:
+        return 3
+    return 2
+
+
+def encode_listing(text: str) -> str:
+    """A directory listing as a two-column table; anything else unchanged."""
+    entries = [_LISTING_LINE.fullmatch(line) for line in text.splitlines()]
+    if not entries or not all(entries):
+        return text
+    width = max(len("bytes"), *(len(entry[2]) for entry in entries))
+    rows = [f"{'bytes':>{width}}  name (directories end in /)"]
+    rows += [
+        f"{entry[2]:>{width}}  {entry[1]}{'/' if entry[3] == 'True' else ''}"
+        for entry in entries
+    ]
+    return "\n".join(rows)
+
+
+ENCODERS: dict[str, Callable[[str], str]] = {
+    name: encode_listing for name in LISTING_FUNCTIONS
+}
+
+
+def allocate(
+    needs: list[int], priorities: list[int], budget: int, cap: int = MAX_READ_TOKENS
+) -> list[int]:
+    """
+    Share `budget` tokens among results needing `needs` tokens. Each result
+    first gets up to MIN_RESULT_TOKENS; what is left goes to the results in
+    priority order, split evenly within a priority with what smaller
+    results leave over passed on to the larger ones. No result gets more
+    than `cap`.
+    """
+    wants = [min(need, cap) for need in needs]
+    shares = [min(want, MIN_RESULT_TOKENS) for want in wants]
+    left = max(budget - sum(shares), 0)
+    for priority in sorted(set(priorities)):
+        group = sorted(
+            (i for i, p in enumerate(priorities) if p == priority),
+            key=lambda i: wants[i],
+        )
+        for position, i in enumerate(group):
+            extra = min(wants[i] - shares[i], left // (len(group) - position))
+            shares[i] += extra
+            left -= extra
+    return shares
+
+
+def shorten(text: str, max_tokens: int, keep_tail: bool) -> tuple[str, int]:
+    """
+    Cut `text` at line boundaries to about `max_tokens`, keeping its head,
+    or its head and tail. Returns the text and the tokens elided.
+    """
+    total = token_estimator.estimate(text)
+    if total <= max_tokens:
+        return text, 0
+    lines = text.splitlines(keepends=True)
+    room = max(max_tokens - MARKER_TOKENS, 0)
+    head_tokens = round(room * HEAD_SHARE) if keep_tail else room
+    head = token_estimator.fit_lines(lines, head_tokens)
+    tail = 0
+    if keep_tail:
+        tail = token_estimator.fit_lines(lines[head:][::-1], room - head_tokens)
+    if head == 0 and tail == 0:
+        # One enormous line; cut it by characters instead
+        kept = text[: room * 3]
+        elided = total - token_estimator.estimate(kept)
+        return f"{kept}\n[... ~{elided} tokens of this line elided ...]", elided
+    kept_lines = lines[:head] + lines[len(lines) - tail :]
+    elided = total - sum(token_estimator.estimate(line) for line in kept_lines)
+    marker = f"[... {len(lines) - head - tail} lines (~{elided} tokens) elided ...]\n"
+    return "".join(lines[:head]) + marker + "".join(lines[len(lines) - tail :]), elided
+
+
+def format_function_results(
+    function_results: list[dict[str, Any]],
+    budget: int = MAX_TURN_RESULT_TOKENS,
+    state: Optional[dict[str, Any]] = None,
+) -> str:
+    """
+    Format a turn's function results within `budget` tokens, shared out by
+    allocate(). Results keep their call order; any that had to be shortened
+    say how much was left out, and a closing note tells the model how to
+    get the rest.
+    """
+    names = [result["name"] for result in function_results]
+    bodies = [
+        result["error"]
+        if "error" in result
+        else ENCODERS.get(result["name"], str)(str(result["result"]))
+        for result in function_results
+    ]
+    headers = [
+        f"Function '{name}' failed with error:\n"
+        if "error" in result
+        else f"Function '{name}' returned:\n"
+        for result, name in zip(function_results, names)
+    ]
+    needs = [token_estimator.estimate(body) for body in bodies]
+    # The headers and the closing note come out of the same budget
+    room = budget - FOOTER_TOKENS - sum(map(token_estimator.estimate, headers))
+    shares = allocate(needs, [result_priority(r) for r in function_results], room)
+
+    parts = ["Function execution results:\n\n"]
+    shortened = elided = 0
+    for header, name, body, share in zip(headers, names, bodies, shares):
+        body, cut = shorten(body, share, keep_tail=name not in READ_FUNCTIONS)
+        if cut:
+            shortened += 1
+            elided += cut
+        parts.append(f"{header}{body}\n\n")
+    if shortened:
+        parts.append(
+            f"[{shortened} result(s) were shortened to fit this turn's budget of "
+            f"{budget} tokens, ~{elided} tokens in all. To see more, call again "
+            "for less at once: a line range with get_file_content(start_line=..., "
+            "end_line=...), fewer paths, or run_tests(paths=[...]).]\n"
+        )
+        if state is not None:
+            stats = state.setdefault("elided_results", {"results": 0, "tokens": 0})
+            stats["results"] += shortened
+            stats["tokens"] += elided
+    return "".join(parts)
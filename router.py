@@ -0,0 +1,168 @@
+import statistics
+from typing import Any, Iterable, Optional, Protocol, TypedDict
+
+from config import MODEL, TURN_MODELS
+
+# Calls that only find out what is in the workspace; the turn after them is
+# usually another mechanical step, not the one where the bug gets worked out
+DISCOVERY_FUNCTIONS = {"get_files_info"}
+EDITING_FUNCTIONS = {"write_file"}
+VERIFYING_FUNCTIONS = {"run_tests"}
+
+# Turn outcomes the model has to recover from with a corrected call list
+MALFORMED_OUTCOMES = {"parse_error", "invalid_calls"}
+
+
+class Route(TypedDict):
+    model: str
+    turn_type: str  # "discovery", "error_recovery", "editing" or "final_answer"
+    reason: str
+
+
+class Router(Protocol):
+    def choose(self, state: dict[str, Any]) -> Route: ...
+
+
+class TieredRouter:
+    """
+    Sends mechanical turns to a cheap model and reasoning turns to the large
+    one. A turn after a failure always goes to the large model unless the
+    large model is the one that failed.
+    """
+
+    def __init__(
+        self, models: Optional[dict[str, str]] = None, large_model: str = MODEL
+    ):
+        self.models = TURN_MODELS if models is None else models
+        self.large_model = large_model
+
+    def choose(self, state: dict[str, Any]) -> Route:
+        kind = turn_type(state)
+        last = routing_stats(state)["last_turn"]
+        if last is not None and last["failed"] and last["model"] != self.large_model:
+            return {
+                "model": self.large_model,
+                "turn_type": kind,
+                "reason": f"escalated after a failed {last['outcome']} turn on {last['model']}",
+            }
+        return {
+            "model": self.models.get(kind, self.large_model),
+            "turn_type": kind,
+            "reason": "by turn type",
+        }
+
+
+class FixedRouter:
+    """Uses the same model for every turn."""
+
+    def __init__(self, model: str = MODEL):
+        self.model = model
+
+    def choose(self, state: dict[str, Any]) -> Route:
+        return {"model": self.model, "turn_type": turn_type(state), "reason": "fixed"}
+
+
+def turn_type(state: dict[str, Any]) -> str:
+    """What the next turn is likely to be, judging by how the last one went."""
+    stats = routing_stats(state)
+    last = stats["last_turn"]
+    if last is None:
+        return "discovery"
+    if last["outcome"] in MALFORMED_OUTCOMES:
+        return "error_recovery"
+    if last["verified"] and stats["edited"]:
+        return "final_answer"
+    if last["functions"] and set(last["functions"]) <= DISCOVERY_FUNCTIONS:
+        return "discovery"
+    return "editing"
+
+
+def routing_stats(state: dict[str, Any]) -> dict[str, Any]:
+    return state.setdefault(
+        "routing",
+        {
+            "last_turn": None,
+            "edited": False,
+            "decisions": [],
+            "turn_types": {},
+            "escalations": 0,
+            "models": {},
+        },
+    )
+
+
+def record_request(
+    state: dict[str, Any],
+    route: Route,
+    seconds: float,
+    prompt_tokens: int,
+    response_tokens: int,
+) -> None:
+    stats = routing_stats(state)
+    stats["decisions"].append(dict(route))
+    stats["turn_types"][route["turn_type"]] = (
+        stats["turn_types"].get(route["turn_type"], 0) + 1
+    )
+    if route["reason"].startswith("escalated"):
+        stats["escalations"] += 1
+    model = stats["models"].setdefault(
+        route["model"],
+        {"requests": 0, "prompt_tokens": 0, "response_tokens": 0, "latencies": []},
+    )
+    model["requests"] += 1
+    model["prompt_tokens"] += prompt_tokens
+    model["response_tokens"] += response_tokens
+    model["latencies"].append(round(seconds, 3))
+    stats["pending_model"] = route["model"]
+
+
+def record_turn(
+    state: dict[str, Any],
+    outcome: str,
+    function_results: Iterable[dict[str, Any]] = (),
+    stalled: bool = False,
+) -> None:
+    """
+    Remember how the turn just handled went, for choosing the next model.
+    `outcome` is "final", "parse_error", "invalid_calls" or "calls".
+    """
+    stats = routing_stats(state)
+    functions = []
+    failed = outcome in MALFORMED_OUTCOMES or stalled
+    verified = False
+    for result in function_results:
+        functions.append(result["name"])
+        text = str(result.get("result", ""))
+        if "error" in result or text.startswith(("Error", "FAILED")):
+            failed = True
+        elif result["name"] in EDITING_FUNCTIONS:
+            stats["edited"] = True
+        elif result["name"] in VERIFYING_FUNCTIONS and text.startswith("OK"):
+            verified = True
+    stats["last_turn"] = {
+        "outcome": outcome,
+        "functions": functions,
+        "failed": failed,
+        "verified": verified,
+        # A response handed over from elsewhere (e.g. a resumed session) has
+        # no request behind it; treat it as the large model's
+        "model": stats.pop("pending_model", MODEL),
+    }
+
+
+def format_routing_stats(state: dict[str, Any]) -> list[str]:
+    stats = state.get("routing")
+    if not stats or not stats["models"]:
+        return []
+    lines = []
+    for name, model in sorted(stats["models"].items()):
+        lines.append(
+            f"{name}: {model['requests']} request(s), median "
+            f"{statistics.median(model['latencies']):.2f}s, "
+            f"{model['prompt_tokens']} prompt + {model['response_tokens']} response tokens"
+        )
+    turn_types = ", ".join(
+        f"{kind} {count}" for kind, count in sorted(stats["turn_types"].items())
+    )
+    lines.append(f"Turns by type: {turn_types}; escalations: {stats['escalations']}")
+    return lines
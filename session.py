@@ -0,0 +1,224 @@
+import json
+import os
+import time
+from typing import Any, Optional, TypedDict
+
+from google import genai
+
+from config import SESSIONS_DIR
+
+SESSION_FORMAT_VERSION = 1
+
+
+class SessionState(TypedDict):
+    path: str
+    messages: list[genai.types.Content]
+    iteration: int  # next iteration to run
+    pending_response: Optional[str]  # model response whose turn never finished
+    state: dict[str, Any]  # tool-side state saved with the last step
+    final_response: Optional[str]
+
+
+class SessionLog:
+    """
+    Append-only JSON Lines checkpoint of an agent session.
+
+    One "start" record holds the initial messages. Every model response is
+    recorded as soon as it arrives, and every completed iteration appends a
+    "step" record with only the messages it added, plus any earlier message
+    it replaced (a refreshed system prompt, compacted results). A crash can
+    therefore cost at most the tool calls of one turn, never a model call.
+
+    The state entries that grow with the session, the overlay's files and
+    the loop guard's result fingerprints, are recorded by what changed in
+    them since the previous step.
+    """
+
+    def __init__(self, path: str, state: Optional[dict[str, Any]] = None):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        # What the log already holds of those entries
+        self._overlay_files: dict[str, str] = {}
+        self._seen_results: Optional[list[str]] = None
+        self._seen_count = 0
+        if state is not None:
+            self._overlay_files = dict(state.get("overlay_files", {}))
+            if "loop_guard" in state:
+                self._seen_results = state["loop_guard"]["seen_results"]
+                self._seen_count = len(self._seen_results)
+
+    @classmethod
+    def resume(cls, path: str, state: Optional[dict[str, Any]] = None) -> "SessionLog":
+        """Append to `path`, whose last step left the session in `state`."""
+        # Drop a torn trailing record so new records start on a fresh line
+        with open(path, "rb+") as f:
+            data = f.read()
+            f.truncate(data.rfind(b"\n") + 1)
+        return cls(path, state)
+
+    @classmethod
+    def create(
+        cls, messages: list[genai.types.Content], directory: str = SESSIONS_DIR
+    ) -> "SessionLog":
+        os.makedirs(directory, exist_ok=True)
+        name = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}.jsonl"
+        log = cls(os.path.join(directory, name))
+        log._append(
+            {
+                "type": "start",
+                "version": SESSION_FORMAT_VERSION,
+                "created": time.time(),
+                "messages": [message_to_record(m) for m in messages],
+            }
+        )
+        return log
+
+    def record_response(self, iteration: int, response_text: str) -> None:
+        self._append(
+            {"type": "response", "iteration": iteration, "text": response_text}
+        )
+
+    def checkpoint(
+        self,
+        iteration: int,
+        new_messages: list[genai.types.Content],
+        state: dict[str, Any],
+        replaced: Optional[dict[int, genai.types.Content]] = None,
+    ) -> None:
+        state = dict(state)
+        overlay_files = state.pop("overlay_files", None)
+        seen_results = None
+        if "loop_guard" in state:
+            state["loop_guard"] = dict(state["loop_guard"])
+            seen_results = state["loop_guard"].pop("seen_results")
+        record: dict[str, Any] = {
+            "type": "step",
+            "iteration": iteration,
+            "messages": [message_to_record(m) for m in new_messages],
+            "state": state,
+        }
+        if replaced:
+            record["replaced"] = {
+                str(index): message_to_record(m) for index, m in replaced.items()
+            }
+        if overlay_files is not None:
+            # Changed files with their content, and removed ones as null
+            changes: dict[str, Optional[str]] = {
+                path: content
+                for path, content in overlay_files.items()
+                if self._overlay_files.get(path) != content
+            }
+            for path in self._overlay_files.keys() - overlay_files.keys():
+                changes[path] = None
+            record["overlay_files"] = changes
+            self._overlay_files = dict(overlay_files)
+        if seen_results is not None:
+            # Fingerprints are only appended, until forget_results() starts
+            # a new list
+            start = 0
+            if seen_results is self._seen_results:
+                start = min(self._seen_count, len(seen_results))
+            record["seen_results"] = {"start": start, "added": seen_results[start:]}
+            self._seen_results = seen_results
+            self._seen_count = len(seen_results)
+        self._append(record)
+
+    def finish(self, iteration: int, final_response: str) -> None:
+        self._append({"type": "final", "iteration": iteration, "text": final_response})
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _append(self, record: dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self._file.write("\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+def load_session(path: str) -> SessionState:
+    session: SessionState = {
+        "path": path,
+        "messages": [],
+        "iteration": 0,
+        "pending_response": None,
+        "state": {},
+        "final_response": None,
+    }
+
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()
+
+    for line_number, line in enumerate(lines, 1):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            if line_number == len(lines):
+                break  # torn write from a crash; everything before it is intact
+            raise ValueError(f"Corrupt session file {path} at line {line_number}")
+
+        if record["type"] == "start":
+            if record.get("version") != SESSION_FORMAT_VERSION:
+                raise ValueError(f"Unsupported session format in {path}")
+            session["messages"] = [record_to_message(r) for r in record["messages"]]
+        elif record["type"] == "response":
+            session["pending_response"] = record["text"]
+        elif record["type"] == "step":
+            for index, message in record.get("replaced", {}).items():
+                session["messages"][int(index)] = record_to_message(message)
+            session["messages"].extend(record_to_message(r) for r in record["messages"])
+            session["iteration"] = record["iteration"] + 1
+            session["pending_response"] = None
+            session["state"] = _apply_state_changes(session["state"], record)
+        elif record["type"] == "final":
+            session["final_response"] = record["text"]
+
+    if not session["messages"]:
+        raise ValueError(f"No start record in session file {path}")
+    return session
+
+
+def _apply_state_changes(
+    previous: dict[str, Any], record: dict[str, Any]
+) -> dict[str, Any]:
+    """The state after a step record, given the state before it."""
+    state = record["state"]
+    if "overlay_files" in record:
+        files = previous.get("overlay_files", {})
+        for path, content in record["overlay_files"].items():
+            if content is None:
+                files.pop(path, None)
+            else:
+                files[path] = content
+        state["overlay_files"] = files
+    if "seen_results" in record:
+        seen_results = previous.get("loop_guard", {}).get("seen_results", [])
+        del seen_results[record["seen_results"]["start"] :]
+        seen_results.extend(record["seen_results"]["added"])
+        state["loop_guard"]["seen_results"] = seen_results
+    return state
+
+
+def replaced_messages(
+    before: list[genai.types.Content], after: list[genai.types.Content]
+) -> dict[int, genai.types.Content]:
+    """
+    The messages of `before` that `after` holds a new message in place of.
+    Messages are replaced, never edited in place, since branches share them.
+    """
+    return {
+        index: after[index]
+        for index, message in enumerate(before)
+        if after[index] is not message
+    }
+
+
+def message_to_record(message: genai.types.Content) -> dict[str, str]:
+    text = "".join(part.text or "" for part in message.parts or [])
+    return {"role": message.role or "user", "text": text}
+
+
+def record_to_message(record: dict[str, str]) -> genai.types.Content:
+    return genai.types.Content(
+        role=record["role"], parts=[genai.types.Part(text=record["text"])]
+    )
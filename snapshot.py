@@ -0,0 +1,153 @@
+import ast
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Optional
+
+from config import CACHE_DIR, MAX_CHARS
+
+SNAPSHOT_CACHE_VERSION = 1
+SKIPPED_DIRS = {"__pycache__"}
+# Last line of a snapshot that was cut off at max_chars
+SNAPSHOT_TRUNCATED = "[...snapshot truncated]"
+
+
+def build_workspace_snapshot(
+    working_directory: str,
+    outline: bool = True,
+    max_chars: int = MAX_CHARS,
+    cache_dir: Optional[str] = CACHE_DIR,
+) -> str:
+    """
+    Render a compact manifest of the working directory: every file with its
+    size and, with `outline`, the top-level classes and functions of each
+    Python file.
+
+    Outlines are cached on disk keyed by each file's mtime and size, so only
+    files that changed since the last run are parsed again.
+    """
+    root = os.path.abspath(working_directory)
+    cache_path = _cache_path(cache_dir, root) if cache_dir else None
+    cache = _load_cache(cache_path) if outline and cache_path else {}
+    cached_files = cache.get("files", {})
+
+    entries = _scan(root)
+    fresh_files: dict[str, Any] = {}
+    lines = [
+        f'WORKSPACE SNAPSHOT of the working directory "." ({len(entries)} entries)'
+    ]
+    for rel_path, depth, size, mtime_ns, is_dir in entries:
+        indent = "  " * depth
+        name = os.path.basename(rel_path)
+        if is_dir:
+            lines.append(f"{indent}- {name}/")
+            continue
+        lines.append(f"{indent}- {name}: {size} bytes")
+        if outline and name.endswith(".py"):
+            entry = cached_files.get(rel_path)
+            if not entry or entry["mtime_ns"] != mtime_ns or entry["size"] != size:
+                entry = {
+                    "mtime_ns": mtime_ns,
+                    "size": size,
+                    "symbols": outline_symbols(os.path.join(root, rel_path)),
+                }
+            fresh_files[rel_path] = entry
+            lines.extend(f"{indent}    {symbol}" for symbol in entry["symbols"])
+
+    if cache_path and outline and fresh_files != cached_files:
+        _save_cache(
+            cache_path, {"version": SNAPSHOT_CACHE_VERSION, "files": fresh_files}
+        )
+
+    text = "\n".join(lines)
+    if len(text) > max_chars:
+        cut = text.rfind("\n", 0, max_chars)
+        text = text[: cut if cut > 0 else max_chars] + f"\n{SNAPSHOT_TRUNCATED}"
+    return text
+
+
+def outline_symbols(path: str) -> list[str]:
+    """One line per top-level class (with its methods) or function."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+        return ["(could not be parsed)"]
+
+    symbols = []
+    functions = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            methods = [
+                child.name
+                for child in node.body
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+            ]
+            symbols.append(
+                f"class {node.name}: {', '.join(methods)}"
+                if methods
+                else f"class {node.name}"
+            )
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.append(node.name)
+    if functions:
+        symbols.append(f"def {', '.join(functions)}")
+    return symbols
+
+
+def _scan(root: str) -> list[tuple[str, int, int, int, bool]]:
+    """(relative path, depth, size, mtime_ns, is_dir), dirs before files."""
+    entries: list[tuple[str, int, int, int, bool]] = []
+
+    def walk(directory: str, depth: int) -> None:
+        try:
+            with os.scandir(directory) as it:
+                children = sorted(
+                    (e for e in it if not e.name.startswith(".")),
+                    key=lambda e: (not e.is_dir(follow_symlinks=False), e.name),
+                )
+        except OSError:
+            return
+        for child in children:
+            rel_path = os.path.relpath(child.path, root)
+            if child.is_dir(follow_symlinks=False):
+                if child.name in SKIPPED_DIRS:
+                    continue
+                entries.append((rel_path, depth, 0, 0, True))
+                walk(child.path, depth + 1)
+            elif child.is_file(follow_symlinks=False):
+                stat = child.stat(follow_symlinks=False)
+                entries.append((rel_path, depth, stat.st_size, stat.st_mtime_ns, False))
+
+    walk(root, 0)
+    return entries
+
+
+def _cache_path(cache_dir: str, root: str) -> str:
+    key = hashlib.blake2b(root.encode(), digest_size=8).hexdigest()
+    return os.path.join(cache_dir, f"snapshot-{key}.json")
+
+
+def _load_cache(path: str) -> dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != SNAPSHOT_CACHE_VERSION:
+        return {}
+    return cache
+
+
+def _save_cache(path: str, cache: dict[str, Any]) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A temporary file of its own, as threads of a batch save at once
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=os.path.dirname(path), delete=False
+        ) as f:
+            json.dump(cache, f, separators=(",", ":"))
+        os.replace(f.name, path)
+    except OSError:
+        pass  # the cache only saves time; a snapshot without it is still right
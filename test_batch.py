@@ -0,0 +1,215 @@
+import json
+
+import pytest
+
+from batch import (
+    FAILED_STATUSES,
+    QuotaExhausted,
+    SharedQuota,
+    load_tasks,
+    run_batch,
+)
+from fake_client import FakeClient, model_turns
+
+
+def scripted(scripts: dict[str, list[str]]) -> FakeClient:
+    """A client that answers each task from a script keyed by its prompt."""
+    return FakeClient(
+        lambda model, contents: scripts[contents[1].parts[0].text][
+            model_turns(contents)
+        ]
+    )
+
+
+def write_tasks(path, tmp_path, prompts):
+    path.write_text(
+        "".join(
+            json.dumps({"id": f"t{i}", "prompt": p, "working_dir": str(tmp_path)})
+            + "\n"
+            for i, p in enumerate(prompts)
+        )
+    )
+
+
+def read_results(path):
+    return {r["id"]: r for r in map(json.loads, path.read_text().splitlines())}
+
+
+def test_runs_tasks_and_skips_finished_ones(tmp_path):
+    (tmp_path / "notes.txt").write_text("hello")
+    tasks_file, output = tmp_path / "tasks.jsonl", tmp_path / "results.jsonl"
+    write_tasks(tasks_file, tmp_path, ["read", "write"])
+    client = scripted(
+        {
+            "read": ['[get_file_content(file_path="notes.txt")]', "It says hello."],
+            "write": ['[write_file(file_path="out.txt", content="done")]', "Wrote it."],
+        }
+    )
+
+    quota = SharedQuota(requests_per_minute=0)
+    counts = run_batch(client, load_tasks(tasks_file), str(output), 2, quota, "off")
+
+    assert counts == {"skipped": 0, "done": 2}
+    results = read_results(output)
+    assert results["t0"]["final_response"] == "It says hello."
+    assert results["t0"]["iterations"] == 2
+    assert results["t0"]["requests"] == 2
+    assert results["t0"]["prompt_tokens"] == 200
+    assert results["t0"]["response_tokens"] == 20
+    assert results["t1"]["files_written"] == ["out.txt"]
+    assert (tmp_path / "out.txt").read_text() == "done"
+    assert (quota.requests, quota.tokens) == (4, 440)
+
+    # A second run finds everything already done and makes no requests
+    quota = SharedQuota(requests_per_minute=0)
+    counts = run_batch(client, load_tasks(tasks_file), str(output), 2, quota, "off")
+    assert counts == {"skipped": 2}
+    assert quota.requests == 0
+
+
+def test_quota_stops_the_batch_and_leaves_tasks_for_later(tmp_path):
+    tasks_file, output = tmp_path / "tasks.jsonl", tmp_path / "results.jsonl"
+    write_tasks(tasks_file, tmp_path, ["a", "b", "c"])
+    client = scripted({p: ["Done."] for p in "abc"})
+
+    counts = run_batch(
+        client,
+        load_tasks(tasks_file),
+        str(output),
+        1,
+        SharedQuota(max_requests=2, requests_per_minute=0),
+        "off",
+    )
+    assert counts == {"skipped": 0, "done": 2, "not_run": 1}
+    assert set(read_results(output)) == {"t0", "t1"}
+
+    counts = run_batch(
+        client, load_tasks(tasks_file), str(output), 1, SharedQuota(), "off"
+    )
+    assert counts == {"skipped": 2, "done": 1}
+    assert set(read_results(output)) == {"t0", "t1", "t2"}
+
+
+def test_errors_are_retried_on_resume(tmp_path):
+    tasks_file, output = tmp_path / "tasks.jsonl", tmp_path / "results.jsonl"
+    write_tasks(tasks_file, tmp_path, ["a", "b"])
+    outages = ["b"]
+
+    def answer(model, contents):
+        prompt = contents[1].parts[0].text
+        if prompt in outages:
+            raise RuntimeError("503 Service Unavailable")
+        return "Done."
+
+    def run(**options):
+        return run_batch(
+            FakeClient(answer),
+            load_tasks(tasks_file),
+            str(output),
+            1,
+            SharedQuota(requests_per_minute=0),
+            "off",
+            **options,
+        )
+
+    assert run() == {"skipped": 0, "done": 1, "error": 1}
+    assert read_results(output)["t1"]["status"] == "error"
+
+    outages.clear()
+    assert run() == {"skipped": 1, "done": 1}
+    assert read_results(output)["t1"]["status"] == "done"
+    assert run() == {"skipped": 2}
+
+
+def test_retry_failed_reruns_unfinished_tasks(tmp_path):
+    tasks_file, output = tmp_path / "tasks.jsonl", tmp_path / "results.jsonl"
+    write_tasks(tasks_file, tmp_path, ["a"])
+    output.write_text(json.dumps({"id": "t0", "status": "max_iters"}) + "\n")
+    client = scripted({"a": ["Done."]})
+
+    def run(**options):
+        return run_batch(
+            client,
+            load_tasks(tasks_file),
+            str(output),
+            1,
+            SharedQuota(requests_per_minute=0),
+            "off",
+            **options,
+        )
+
+    assert run() == {"skipped": 1}
+    assert run(retry=FAILED_STATUSES) == {"skipped": 0, "done": 1}
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    tasks_file, output = tmp_path / "tasks.jsonl", tmp_path / "results.jsonl"
+    write_tasks(tasks_file, tmp_path, ["a"])
+    output.write_text('{"id": "t0", "sta')
+    client = scripted({"a": ["Done."]})
+
+    counts = run_batch(
+        client,
+        load_tasks(tasks_file),
+        str(output),
+        1,
+        SharedQuota(requests_per_minute=0),
+        "off",
+    )
+    assert counts == {"skipped": 0, "done": 1}
+    assert list(read_results(output)) == ["t0"]
+
+
+def test_token_budget():
+    quota = SharedQuota(max_tokens=100, requests_per_minute=0)
+    quota.acquire()
+    quota.add_tokens(150)
+    with pytest.raises(QuotaExhausted):
+        quota.acquire()
+
+
+def test_hedges_take_free_requests_only():
+    quota = SharedQuota(max_requests=2, requests_per_minute=60)
+    assert quota.try_acquire()
+    # The next slot under the rate limit is a second away; a hedge never waits
+    assert not quota.try_acquire()
+    quota.acquire()
+    assert not SharedQuota(max_requests=0, requests_per_minute=0).try_acquire()
+    assert quota.requests == 2
+
+
+def test_tasks_writing_the_same_file_conflict(tmp_path):
+    tasks_file, output = tmp_path / "tasks.jsonl", tmp_path / "results.jsonl"
+    write_tasks(tasks_file, tmp_path, ["first", "second"])
+    client = FakeClient(
+        lambda model, contents: {
+            0: f'[write_file(file_path="out.txt", content="{contents[1].parts[0].text}")]',
+            1: "Wrote it.",
+        }[model_turns(contents)],
+        latency=0.05,
+    )
+
+    def run():
+        return run_batch(
+            client,
+            load_tasks(tasks_file),
+            str(output),
+            2,
+            SharedQuota(requests_per_minute=0),
+            "off",
+        )
+
+    # Both tasks start from the same files; the second to finish would
+    # overwrite the first one's edit
+    assert run() == {"skipped": 0, "done": 1, "conflict": 1}
+    results = read_results(output)
+    [loser] = [r for r in results.values() if r["status"] == "conflict"]
+    [winner] = [r for r in results.values() if r["status"] == "done"]
+    assert loser["conflicts"] == {"out.txt": winner["id"]}
+    assert loser["files_written"] == []
+    prompts = {"t0": "first", "t1": "second"}
+    assert (tmp_path / "out.txt").read_text() == prompts[winner["id"]]
+
+    # The rerun starts from the winner's edit and writes over it knowingly
+    assert run() == {"skipped": 1, "done": 1}
+    assert (tmp_path / "out.txt").read_text() == prompts[loser["id"]]
@@ -0,0 +1,98 @@
+import threading
+
+import branches
+from branches import explore_branches, starts_editing
+from main import process_model_turn
+
+BUGGY = "def add(a, b):\n    return a - b\n"
+TEST = "from pkg.calc import add\n\n\ndef test_add():\n    assert add(2, 3) == 5\n"
+
+
+def write_call(body: str) -> str:
+    content = body.replace("\n", "\\n")
+    return f'[write_file(file_path="pkg/calc.py", content="{content}")]'
+
+
+WRONG_FIX = write_call("def add(a, b):\n    return a * b\n")
+RIGHT_FIX = write_call("def add(a, b):\n    return a + b\n")
+
+
+def make_workspace(root) -> None:
+    (root / "pkg").mkdir()
+    (root / "pkg" / "calc.py").write_text(BUGGY)
+    (root / "test_calc.py").write_text(TEST)
+
+
+def scripted(replies: dict[str, list[str]]):
+    """A stand-in for request_model_response that answers per branch."""
+    lock = threading.Lock()
+
+    def request(client, messages, verbose, state):
+        with lock:
+            return replies[threading.current_thread().name].pop(0)
+
+    return request
+
+
+def test_starts_editing():
+    assert starts_editing(RIGHT_FIX)
+    assert not starts_editing('[get_file_content(file_path="pkg/calc.py")]')
+    assert not starts_editing("All done.")
+
+
+def test_first_branch_that_passes_the_tests_wins(tmp_path, monkeypatch):
+    monkeypatch.setattr(branches, "iteration_delay", lambda i: 0)
+    make_workspace(tmp_path)
+    request = scripted(
+        {
+            # Branch 0 starts from the response that triggered the race
+            "branch-0": ["Fixed it.", "Fixed it.", "Fixed it.", "Fixed it."],
+            "branch-1": [RIGHT_FIX, "Fixed it."],
+        }
+    )
+
+    result, report = explore_branches(
+        None,
+        [],
+        {},
+        WRONG_FIX,
+        2,
+        0,
+        request,
+        process_model_turn,
+        working_directory=str(tmp_path),
+    )
+
+    assert result is not None
+    assert result["branch"] == 1
+    assert result["verification"].startswith("OK")
+    assert result["workspace"].files == {
+        "pkg/calc.py": "def add(a, b):\n    return a + b\n"
+    }
+    assert report[1] == "Branch 1: won after 2 turns"
+    # Nothing reaches the disk until the caller commits the winner
+    assert (tmp_path / "pkg" / "calc.py").read_text() == BUGGY
+    result["workspace"].close()
+
+
+def test_call_budget_is_shared(tmp_path, monkeypatch):
+    monkeypatch.setattr(branches, "iteration_delay", lambda i: 0)
+    make_workspace(tmp_path)
+    request = scripted({f"branch-{i}": ["Fixed it."] * 5 for i in range(3)})
+
+    result, report = explore_branches(
+        None,
+        [],
+        {},
+        WRONG_FIX,
+        3,
+        0,
+        request,
+        process_model_turn,
+        max_calls=4,
+        working_directory=str(tmp_path),
+    )
+
+    assert result is None
+    assert report[-1] == "Model calls used by all branches: 4/4"
+    assert all("budget used up" in line for line in report[:-1])
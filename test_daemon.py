@@ -0,0 +1,58 @@
+import io
+import sys
+import threading
+
+import pytest
+
+from ask import ask
+from daemon import AgentServer
+from fake_client import FakeClient
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    """A daemon serving from tmp_path, so sessions are written there."""
+    monkeypatch.chdir(tmp_path)
+    # Sessions swap in StreamRouters; put the test's own streams back after
+    monkeypatch.setattr(sys, "stdout", sys.stdout)
+    monkeypatch.setattr(sys, "stderr", sys.stderr)
+    client = FakeClient([])
+    server = AgentServer(str(tmp_path / "agent.sock"), client)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_session_output_is_streamed_to_the_client(daemon, tmp_path):
+    daemon.client.replies[:] = ["All done."]
+    stdout, stderr = io.StringIO(), io.StringIO()
+
+    code = ask(["say hi", "--snapshot", "off"], daemon.server_address, stdout, stderr)
+
+    assert code == 0
+    assert stdout.getvalue() == "Final response:\nAll done.\n"
+    assert stderr.getvalue() == ""
+    assert len(list((tmp_path / ".sessions").iterdir())) == 1
+
+
+def test_exit_code_and_errors_reach_the_client(daemon):
+    stdout, stderr = io.StringIO(), io.StringIO()
+
+    code = ask([], daemon.server_address, stdout, stderr)
+
+    assert code == 2
+    assert "a prompt is required" in stderr.getvalue()
+
+
+def test_client_without_daemon(tmp_path):
+    stderr = io.StringIO()
+    assert ask(["hi"], str(tmp_path / "missing.sock"), io.StringIO(), stderr) == 2
+    assert "No agent daemon" in stderr.getvalue()
+
+
+def test_refuses_a_second_daemon_on_the_same_socket(daemon):
+    with pytest.raises(RuntimeError, match="already listening"):
+        AgentServer(daemon.server_address, daemon.client)
@@ -12,5 +12,25 @@ def test():
     print(result)
 
 
+def test_line_ranges(tmp_path):
+    (tmp_path / "f.py").write_text("".join(f"line {i}\n" for i in range(1, 11)))
+    directory = str(tmp_path)
+
+    assert get_file_content(directory, "f.py", start_line=3, end_line=4) == (
+        '[Lines 3-4 of 10 in "f.py"]\nline 3\nline 4\n'
+    )
+    assert get_file_content(directory, "f.py", start_line=9).endswith("line 10\n")
+    assert get_file_content(directory, "f.py", end_line=1).startswith("[Lines 1-1 ")
+    assert get_file_content(directory, "f.py", start_line=8, end_line=99).startswith(
+        '[Lines 8-10 of 10 in "f.py"]'
+    )
+    assert get_file_content(directory, "f.py", start_line=11) == (
+        'Error: "f.py" has only 10 lines'
+    )
+    assert get_file_content(directory, "f.py", start_line=5, end_line=4).startswith(
+        "Error: Invalid line range"
+    )
+
+
 if __name__ == "__main__":
     test()
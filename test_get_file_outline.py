@@ -0,0 +1,64 @@
+from functions import get_file_outline as outline_module
+from functions.get_file_outline import get_file_outline
+
+SOURCE = """import functools
+
+
+class Base:
+    pass
+
+
+class Calculator(Base):
+    def evaluate(self, expression, variables=None):
+        return 1
+
+    @functools.cache
+    def _apply(self, a: int, *args, **kwargs) -> float:
+        return 2.0
+
+
+async def main():
+    pass
+"""
+
+
+def test_outline_lists_signatures_and_line_ranges(tmp_path):
+    (tmp_path / "calc.py").write_text(SOURCE)
+    assert get_file_outline(str(tmp_path), "calc.py").splitlines() == [
+        "calc.py",
+        "(18 lines)",
+        "class Base  [lines 4-5]",
+        "class Calculator(Base)  [lines 8-14]",
+        "    def evaluate(self, expression, variables=None)  [lines 9-10]",
+        "    @functools.cache def _apply(self, a: int, *args, **kwargs) -> float  [lines 12-14]",
+        "async def main()  [lines 17-18]",
+    ]
+
+
+def test_unchanged_files_are_not_parsed_again(tmp_path, monkeypatch):
+    parsed = []
+    outline_source = outline_module.outline_source
+
+    def counting(source):
+        parsed.append(source)
+        return outline_source(source)
+
+    monkeypatch.setattr(outline_module, "outline_source", counting)
+    path = tmp_path / "calc.py"
+    path.write_text(SOURCE + "# unique to this test\n")
+
+    first = get_file_outline(str(tmp_path), "calc.py")
+    assert get_file_outline(str(tmp_path), "calc.py") == first
+    assert len(parsed) == 1
+
+    path.write_text(SOURCE + "def extra():\n    pass\n")
+    assert "def extra()  [lines 19-20]" in get_file_outline(str(tmp_path), "calc.py")
+    assert len(parsed) == 2
+
+
+def test_outline_errors(tmp_path):
+    (tmp_path / "broken.py").write_text("def (:\n")
+    (tmp_path / "notes.txt").write_text("hi")
+    assert "syntax error at line 1" in get_file_outline(str(tmp_path), "broken.py")
+    assert "is not a Python file" in get_file_outline(str(tmp_path), "notes.txt")
+    assert "outside the permitted" in get_file_outline(str(tmp_path), "../x.py")
@@ -0,0 +1,42 @@
+from functions.get_files_content import _share_budget, get_files_content
+
+
+def test_share_budget():
+    # Short files are read whole; the rest is split evenly
+    assert _share_budget([100, 5000, 20000, 3], 10000) == [100, 4949, 4948, 3]
+    # Leftover characters go to earlier files first
+    assert _share_budget([10, 20], 5) == [3, 2]
+    assert _share_budget([10, 0, 10], 100) == [10, 0, 10]
+    assert _share_budget([], 100) == []
+
+
+def test_reads_several_files_within_one_budget(tmp_path):
+    (tmp_path / "small.py").write_text("x = 1\n")
+    (tmp_path / "big.py").write_text("#" * 5000)
+    (tmp_path / "bigger.py").write_text("@" * 8000)
+
+    result = get_files_content(
+        str(tmp_path), ["small.py", "big.py", "bigger.py"], max_total_chars=3000
+    )
+    assert result.startswith("==> small.py <==\nx = 1\n\n\n==> big.py (first 1497 ")
+    assert "\n\n==> bigger.py (first 1497 characters;" in result
+    assert result.count("#") + result.count("@") == 3000 - len("x = 1\n")
+
+
+def test_budget_cannot_exceed_the_default(tmp_path):
+    (tmp_path / "huge.txt").write_text("#" * 50000)
+    result = get_files_content(str(tmp_path), ["huge.txt"], max_total_chars=10**9)
+    assert result.count("#") == 10000
+
+
+def test_errors_are_reported_per_file(tmp_path):
+    (tmp_path / "ok.py").write_text("pass\n")
+    result = get_files_content(str(tmp_path), ["missing.py", "../x.py", "ok.py"])
+    assert "==> missing.py <==\nError: File not found" in result
+    assert "==> ../x.py <==\nError: Cannot read" in result
+    assert result.endswith("==> ok.py <==\npass\n")
+
+
+def test_rejects_empty_and_oversized_batches(tmp_path):
+    assert get_files_content(str(tmp_path), []).startswith("Error:")
+    assert get_files_content(str(tmp_path), ["a"] * 21).startswith("Error:")
@@ -0,0 +1,108 @@
+import itertools
+import time
+
+import pytest
+
+from fake_client import FakeClient
+from hedging import HedgedRequests, percentile
+
+
+def slow_server(slow_calls: set[int], slow: float = 0.5, fast: float = 0.01):
+    """A FakeClient whose listed calls (counting from 0) take `slow` seconds."""
+    calls = itertools.count()
+    return FakeClient(
+        lambda model, contents: "ok",
+        latency=lambda model: slow if next(calls) in slow_calls else fast,
+    )
+
+
+def hedger(**overrides) -> HedgedRequests:
+    options = dict(percentile=90, budget=0.2, min_samples=5, min_delay=0, timeout=5)
+    options.update(overrides)
+    return HedgedRequests(**options)
+
+
+def test_hedge_answers_before_a_slow_request():
+    client = slow_server({10, 20})
+    # A little slack so a busy machine does not turn fast requests into hedges
+    requests = hedger(min_delay=0.05)
+
+    latencies = []
+    for _ in range(25):
+        start = time.perf_counter()
+        assert requests.generate(client, "m", []).text == "ok"
+        latencies.append(time.perf_counter() - start)
+
+    assert requests.hedges == requests.hedge_wins == 2
+    assert max(latencies) < 0.3
+    time.sleep(0.6)  # let the abandoned slow requests finish
+    report = requests.report()
+    assert report[0].startswith("Model latency p50/p95/p99 over 25 request(s): ")
+    assert report[0].endswith("/0.50s without")
+    assert report[1] == "Hedged requests: 2 (2 answered first by the hedge)"
+
+
+def test_hedges_stay_within_budget():
+    client = slow_server(set(range(5, 100)), slow=0.05)
+    requests = hedger(budget=0.1, min_delay=0)
+    for _ in range(20):
+        requests.generate(client, "m", [])
+    assert requests.hedges <= 2
+
+
+class CountingQuota:
+    def __init__(self, free: int):
+        self.free = free
+        self.requests = 0
+        self.tokens = 0
+
+    def try_acquire(self) -> bool:
+        if self.requests >= self.free:
+            return False
+        self.requests += 1
+        return True
+
+    def add_tokens(self, tokens: int) -> None:
+        self.tokens += tokens
+
+
+def test_hedges_are_charged_to_the_quota():
+    client = slow_server({10, 12}, slow=0.3)
+    requests = hedger()
+    quota = CountingQuota(free=1)
+    for _ in range(12):
+        requests.generate(client, "m", [], quota)
+
+    # Only the first slow request could be hedged within the quota
+    assert requests.hedges == 1
+    assert quota.requests == 1
+    time.sleep(0.4)  # the abandoned slow request arrives and is counted
+    assert quota.tokens == 110
+
+
+def test_no_hedging_without_history():
+    client = slow_server({0}, slow=0.2)
+    requests = hedger()
+    requests.generate(client, "m", [])
+    assert requests.hedges == 0
+
+
+def test_timeout():
+    requests = hedger(timeout=0.1)
+    with pytest.raises(TimeoutError):
+        requests.generate(FakeClient(["ok"], latency=1), "m", [])
+
+
+def test_errors_reach_the_caller():
+    def fail(model, contents):
+        raise RuntimeError("quota exceeded")
+
+    with pytest.raises(RuntimeError, match="quota exceeded"):
+        hedger().generate(FakeClient(fail), "m", [])
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 95) == 3
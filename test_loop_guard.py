@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from config import MAX_STALLED_TURNS
+from loop_guard import LoopGuard, NoProgressError
+
+
+def run_turn(guard: LoopGuard, calls: list[tuple[str, dict, str]]) -> list[str]:
+    results = []
+    for name, params, result in calls:
+        cached = guard.cached_result(name, params)
+        if cached is not None:
+            guard.record_cached_call(name, params)
+            results.append(cached)
+        else:
+            guard.record_call(name, params, result)
+            results.append(result)
+    return results
+
+
+LIST_ROOT = ("get_files_info", {"directory": "."}, "- main.py: file_size=100")
+READ_MAIN = ("get_file_content", {"file_path": "main.py"}, "print('hi')")
+
+
+def test_exact_repeat_is_answered_from_earlier_result():
+    state = {}
+    guard = LoopGuard(state)
+    assert run_turn(guard, [LIST_ROOT]) == [LIST_ROOT[2]]
+    assert guard.end_turn()["note"] is None
+
+    results = run_turn(guard, [LIST_ROOT])
+    assert results[0].startswith("(Identical to the result")
+    report = guard.end_turn()
+    assert report["repeats_turn"] == 1
+    assert report["stalled"] == 1
+    assert report["note"] is not None
+    assert state["loop_guard"]["cached_calls"] == 1
+
+
+def test_write_invalidates_cached_reads():
+    guard = LoopGuard({})
+    run_turn(guard, [READ_MAIN])
+    guard.end_turn()
+
+    write = ("write_file", {"file_path": "main.py", "content": "x"}, "wrote 1")
+    run_turn(guard, [write])
+    report = guard.end_turn()
+    assert report["stalled"] == 0
+
+    assert guard.cached_result(*READ_MAIN[:2]) is None
+
+
+def test_failed_reads_are_not_cached():
+    guard = LoopGuard({})
+    guard.record_call("get_file_content", {"file_path": "x.py"}, "boom", failed=True)
+    guard.end_turn()
+    assert guard.cached_result("get_file_content", {"file_path": "x.py"}) is None
+
+
+def test_new_result_counts_as_progress():
+    guard = LoopGuard({})
+    run_turn(guard, [LIST_ROOT])
+    guard.end_turn()
+    run_turn(guard, [READ_MAIN])
+    report = guard.end_turn()
+    assert report["stalled"] == 0
+    assert report["repeats_turn"] is None
+
+
+def test_alternating_writes_stall():
+    # Writing the same two versions back and forth changes the workspace but
+    # never produces a result the model has not already seen
+    guard = LoopGuard({})
+    write_a = ("write_file", {"file_path": "a.py", "content": "a"}, "wrote 1")
+    write_b = ("write_file", {"file_path": "a.py", "content": "b"}, "wrote 1")
+    for calls in ([write_a], [write_b]):
+        run_turn(guard, calls)
+        guard.end_turn()
+
+    stalled = 0
+    for calls in ([write_a], [write_b]):
+        run_turn(guard, calls)
+        report = guard.end_turn()
+        stalled = report["stalled"]
+        assert report["repeats_turn"] is not None
+    assert stalled == 2
+
+
+def test_stops_after_stalled_turns():
+    guard = LoopGuard({})
+    run_turn(guard, [LIST_ROOT])
+    guard.end_turn()
+    guard.check_progress()
+
+    for _ in range(MAX_STALLED_TURNS - 1):
+        run_turn(guard, [LIST_ROOT])
+        guard.end_turn()
+        guard.check_progress()
+
+    run_turn(guard, [LIST_ROOT])
+    guard.end_turn()
+    with pytest.raises(NoProgressError, match="No progress"):
+        guard.check_progress()
+
+
+def test_counters_survive_a_session_checkpoint():
+    state = {}
+    guard = LoopGuard(state)
+    run_turn(guard, [LIST_ROOT])
+    guard.end_turn()
+
+    restored = json.loads(json.dumps(state))
+    guard = LoopGuard(restored)
+    # The cached result is gone after a restart, but the result is known
+    run_turn(guard, [LIST_ROOT])
+    assert guard.end_turn()["stalled"] == 1
+    assert restored["loop_guard"]["turn"] == 2
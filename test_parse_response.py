@@ -1,6 +1,6 @@
 from google import genai
 
-from parse_response import process_model_response
+from parse_response import needs_repair, process_model_response, repair_model_response
 
 
 def test_simple_function_call():
@@ -262,3 +262,66 @@ def test_whitespace_handling():
     assert result["type"] == "function_call"
     assert result["valid"] is True
     assert result["content"][0]["parameters"]["param"] == "value"
+
+
+def repair_schemas() -> list[genai.types.FunctionDeclaration]:
+    from prompts import available_functions
+
+    return available_functions
+
+
+def test_repair_prose_around_list():
+    response = (
+        "Sure! First I will look [around].\n"
+        '```\n[get_files_info(directory="pkg")]\n```\nThen I will read.'
+    )
+    parsed = process_model_response(response, repair_schemas())
+    assert needs_repair(parsed, response)
+
+    repair = repair_model_response(response, repair_schemas())
+    assert repair is not None
+    assert repair["fix"] == "extract_call_list"
+    assert repair["text"] == '[get_files_info(directory="pkg")]'
+
+
+def test_repair_missing_closing_bracket():
+    response = '[get_file_content(file_path="pkg/calculator.py")'
+    parsed = process_model_response(response, repair_schemas())
+    assert parsed["type"] == "text"
+    assert needs_repair(parsed, response)
+
+    repair = repair_model_response(response, repair_schemas())
+    assert repair is not None
+    assert repair["fix"] == "close_brackets"
+    call = repair["response"]["content"][0]
+    assert call["parameters"]["file_path"] == "pkg/calculator.py"
+
+
+def test_repair_unescaped_quotes_in_write_file():
+    response = (
+        '[write_file(file_path="a.py", content="def f():\n    print("hi, there")")]'
+    )
+    repair = repair_model_response(response, repair_schemas())
+    assert repair is not None
+    assert repair["fix"] == "requote_strings"
+    params = repair["response"]["content"][0]["parameters"]
+    assert params["file_path"] == "a.py"
+    assert params["content"] == 'def f():\n    print("hi, there")'
+
+
+def test_repair_single_quotes_with_apostrophe():
+    response = "[write_file(file_path='notes.txt', content='it's fixed')]"
+    repair = repair_model_response(response, repair_schemas())
+    assert repair is not None
+    assert repair["response"]["content"][0]["parameters"]["content"] == "it's fixed"
+
+
+def test_repair_gives_up_on_unknown_function():
+    response = "[delete_everything(path='.')]"
+    assert repair_model_response(response, repair_schemas()) is None
+
+
+def test_plain_text_does_not_need_repair():
+    response = "The bug was the precedence of +. It is fixed now."
+    parsed = process_model_response(response, repair_schemas())
+    assert not needs_repair(parsed, response)
@@ -0,0 +1,115 @@
+import time
+from collections.abc import Callable, Iterator
+
+import pytest
+
+from parse_response import (
+    extract_function_calls,
+    process_model_response,
+    repair_model_response,
+)
+from prompts import available_functions
+
+# Every input is parsed at SMALL and LARGE bytes. A linear parser takes about
+# LARGE / SMALL times longer on the larger one; a quadratic one takes the
+# square of that. The budget leaves room for timer noise on shared machines.
+SMALL = 128 * 1024
+LARGE = 1024 * 1024
+GROWTH_BUDGET = 3 * LARGE / SMALL
+NOISE_FLOOR = 0.05  # seconds below which timings are not compared
+ABSOLUTE_BUDGET = 5.0  # seconds for any single LARGE input
+
+
+def adversarial_corpus(size: int) -> Iterator[tuple[str, str]]:
+    """Yield (name, response) pairs of roughly `size` characters each."""
+    yield "unmatched_open_brackets", "[" * size
+    yield "unmatched_close_brackets", "]" * size
+    yield "alternating_brackets", "][" * (size // 2)
+    yield "empty_lists", "[]" * (size // 2)
+    yield "long_word_no_paren", "[" + "a" * size + "]"
+    yield "brackets_and_words", "[a" * (size // 2)
+    yield "deep_nesting", "[f(" + "(" * (size // 2) + ")" * (size // 2) + ")]"
+    yield "deep_brackets", "[f(a=" + "[" * (size // 2) + "]" * (size // 2) + ")]"
+    yield "many_calls", '[get_files_info(directory="."), ' * (size // 32) + "]"
+    yield (
+        "huge_write_file",
+        '[write_file(file_path="a.py", content="'
+        + "print(f(x[1]), ']')\\n" * (size // 24)
+        + '")]',
+    )
+    yield (
+        "unterminated_string",
+        '[write_file(file_path="a.py", content="' + "x(" * (size // 2),
+    )
+    yield "escaped_quotes", '[f(a="' + '\\"' * (size // 2) + '")]'
+    yield "backslashes", '[f(a="' + "\\" * size + '")]'
+    yield "prose_with_brackets", "see [a] (b) f(x) " * (size // 17)
+    yield "many_commas", "[f(a=1" + ", b=2" * (size // 5) + ")]"
+    yield "stray_quotes", "[f(a=1)] it's " * (size // 14) + "'"
+
+
+CORPUS_NAMES = [name for name, _ in adversarial_corpus(0)]
+
+
+def best_of(runs: int, func: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.parametrize(
+    "name, small, large",
+    [
+        (name, small, large)
+        for (name, small), (_, large) in zip(
+            adversarial_corpus(SMALL), adversarial_corpus(LARGE)
+        )
+    ],
+    ids=CORPUS_NAMES,
+)
+def test_parser_stays_linear(name: str, small: str, large: str):
+    def parse(response: str) -> Callable[[], object]:
+        def run() -> None:
+            parsed = process_model_response(response, available_functions)
+            if parsed["type"] != "function_call" or not parsed["valid"]:
+                repair_model_response(response, available_functions)
+
+        return run
+
+    small_time = best_of(2, parse(small))
+    large_time = best_of(1, parse(large))
+
+    assert large_time < ABSOLUTE_BUDGET, f"{name}: {large_time:.2f}s"
+    if large_time > NOISE_FLOOR:
+        growth = large_time / max(small_time, NOISE_FLOOR / GROWTH_BUDGET)
+        assert growth < GROWTH_BUDGET, (
+            f"{name}: {small_time:.3f}s -> {large_time:.3f}s ({growth:.1f}x growth)"
+        )
+
+
+def test_parentheses_inside_strings_do_not_split_calls():
+    response = (
+        '[write_file(file_path="a.py", content="print(\\")\\")\\nx = (1, 2"), '
+        "get_file_content(file_path='b.py')]"
+    )
+    calls = extract_function_calls(response)
+    assert len(calls) == 2
+    assert calls[1] == "get_file_content(file_path='b.py')"
+
+    parsed = process_model_response(response, available_functions)
+    assert parsed["valid"] is True
+    assert parsed["content"][0]["parameters"]["content"] == 'print(")")\nx = (1, 2'
+
+
+def test_huge_write_file_round_trips():
+    # About 4 MB once escaped
+    content = "def f(x):\n    return [x, (x), ']']\n" * 100_000
+    escaped = content.replace("\n", "\\n")
+    response = f'[write_file(file_path="big.py", content="{escaped}")]'
+
+    parsed = process_model_response(response, available_functions)
+    assert parsed["valid"] is True
+    assert parsed["content"][0]["parameters"]["content"] == content
@@ -0,0 +1,82 @@
+from results import (
+    MIN_RESULT_TOKENS,
+    allocate,
+    encode_listing,
+    format_function_results,
+    shorten,
+)
+from tokens import token_estimator
+
+
+def test_small_results_are_kept_whole():
+    text = format_function_results(
+        [
+            {"name": "write_file", "result": "Successfully wrote to a.py"},
+            {"name": "run_tests", "error": "Error executing run_tests: boom"},
+        ]
+    )
+    assert text == (
+        "Function execution results:\n\n"
+        "Function 'write_file' returned:\nSuccessfully wrote to a.py\n\n"
+        "Function 'run_tests' failed with error:\nError executing run_tests: boom\n\n"
+    )
+
+
+def test_listings_become_a_table():
+    listing = (
+        "- main.py: file_size=576 bytes, is_dir=False\n"
+        "- pkg: file_size=4096 bytes, is_dir=True"
+    )
+    assert encode_listing(listing) == (
+        "bytes  name (directories end in /)\n  576  main.py\n 4096  pkg/"
+    )
+    assert encode_listing("Error: nope") == "Error: nope"
+
+
+def test_allocate_prefers_errors_and_passes_leftovers_on():
+    # An error, a small result, and two big reads sharing 1000 tokens
+    shares = allocate([300, 50, 5000, 5000], [0, 2, 2, 2], 1000)
+    assert shares[:2] == [300, 50]
+    assert shares[2] == shares[3] == 325
+    # Every result keeps a minimum, even past the budget
+    assert allocate([500] * 20, [2] * 20, 1000) == [MIN_RESULT_TOKENS] * 20
+    assert allocate([10, 20], [3, 0], 1000, cap=15) == [10, 15]
+
+
+def test_shorten_keeps_head_and_tail():
+    lines = [f"line {i}\n" for i in range(200)]
+    text, elided = shorten("".join(lines), 100, keep_tail=True)
+    assert text.startswith("line 0\n")
+    assert text.endswith("line 199\n")
+    assert "lines (~" in text
+    assert elided > 0
+    assert token_estimator.estimate(text) <= 100
+
+    text, _ = shorten("".join(lines), 100, keep_tail=False)
+    assert text.startswith("line 0\n")
+    assert text.endswith("elided ...]\n")
+
+
+def test_turn_stays_within_budget():
+    big_file = "".join(f"value_{i} = compute({i}) + offset\n" for i in range(2000))
+    traceback = "STDERR:\n" + "noise\n" * 3000 + "ZeroDivisionError: division by zero\n"
+    function_results = [
+        {"name": "get_file_content", "result": big_file},
+        {"name": "get_file_content", "result": big_file},
+        {"name": "run_tests", "result": "FAILED: 1 passed, 1 failed\n- t.py: FAILED"},
+        {"name": "run_python_file", "result": traceback + "Process exited with code 1"},
+    ]
+    state = {}
+
+    text = format_function_results(function_results, budget=3000, state=state)
+
+    assert token_estimator.estimate(text) < 3200
+    assert "FAILED: 1 passed, 1 failed\n- t.py: FAILED" in text
+    assert "ZeroDivisionError: division by zero\nProcess exited with code 1" in text
+    assert text.endswith(
+        "To see more, call again for less at once: a line range with "
+        "get_file_content(start_line=..., end_line=...), fewer paths, "
+        "or run_tests(paths=[...]).]\n"
+    )
+    assert state["elided_results"]["results"] == 3
+    assert state["elided_results"]["tokens"] > 20000
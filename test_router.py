@@ -0,0 +1,77 @@
+from fake_client import FakeClient
+from functions.workspace import Workspace
+from loop_guard import LoopGuard
+from main import process_model_turn, request_model_response
+from router import FixedRouter, TieredRouter, record_request, record_turn, turn_type
+
+LARGE, SMALL = "large-model", "small-model"
+MODELS = {
+    "discovery": SMALL,
+    "error_recovery": SMALL,
+    "editing": LARGE,
+    "final_answer": SMALL,
+}
+
+SESSION = [
+    '[get_files_info(directory=".")]',
+    '[read_file(file_path="calc.py")]',  # unknown function: a failed turn
+    '[get_file_content(file_path="calc.py")]',
+    '[write_file(file_path="calc.py", content="def add(a, b):\\n    return a + b\\n")]',
+    '[run_tests(scope="all")]',
+    "Fixed add().",
+]
+
+
+def run_session(tmp_path, router):
+    (tmp_path / "calc.py").write_text("def add(a, b):\n    return a - b\n")
+    (tmp_path / "test_calc.py").write_text(
+        "from calc import add\n\n\ndef test_add():\n    assert add(2, 3) == 5\n"
+    )
+    client = FakeClient(list(SESSION))
+    state = {}
+    guard = LoopGuard(state)
+    workspace = Workspace(str(tmp_path))
+    messages = []
+    for _ in SESSION:
+        response_text = request_model_response(client, messages, False, state, router)
+        final = process_model_turn(
+            response_text, messages, False, state, guard, workspace
+        )
+    assert final == "Fixed add()."
+    return client.requests, state["routing"]
+
+
+def test_routes_by_turn_type_and_escalates_after_a_failure(tmp_path):
+    requests, routing = run_session(tmp_path, TieredRouter(MODELS, LARGE))
+
+    assert requests == [SMALL, SMALL, LARGE, LARGE, LARGE, SMALL]
+    assert [d["turn_type"] for d in routing["decisions"]] == [
+        "discovery",
+        "discovery",
+        "error_recovery",
+        "editing",
+        "editing",
+        "final_answer",
+    ]
+    assert routing["decisions"][2]["reason"].startswith("escalated")
+    assert routing["escalations"] == 1
+    assert routing["models"][SMALL]["requests"] == 3
+    assert routing["models"][LARGE]["prompt_tokens"] == 300
+    assert len(routing["models"][LARGE]["latencies"]) == 3
+
+
+def test_fixed_router_uses_one_model(tmp_path):
+    requests, routing = run_session(tmp_path, FixedRouter(LARGE))
+    assert requests == [LARGE] * len(SESSION)
+    assert routing["escalations"] == 0
+
+
+def test_malformed_turn_on_the_large_model_is_recovered_by_the_small_one():
+    router = TieredRouter(MODELS, LARGE)
+    state = {}
+    route = {"model": LARGE, "turn_type": "editing", "reason": "by turn type"}
+    record_request(state, route, 1.0, 100, 10)
+    record_turn(state, "parse_error")
+
+    assert turn_type(state) == "error_recovery"
+    assert router.choose(state)["model"] == SMALL
@@ -1,4 +1,9 @@
+import re
+
+import functions.run_python as run_python
+from call_function import call_function
 from functions.run_python import run_python_file
+from functions.workspace import Workspace
 
 
 def test():
@@ -18,5 +23,58 @@ def test():
     print(result)
 
 
+def test_runs_report_resource_usage(tmp_path):
+    (tmp_path / "hello.py").write_text("print('hi')\n")
+    state = {}
+
+    assert run_python_file(str(tmp_path), "hello.py", state=state) == "STDOUT:\nhi\n"
+    assert run_python_file(str(tmp_path), "hello.py", state=state) == "STDOUT:\nhi\n"
+    assert state["script_runs"]["runs"] == 2
+    assert state["script_runs"]["peak_rss"] > 0
+    # Runs outside a session are not counted anywhere
+    assert run_python_file(str(tmp_path), "hello.py") == "STDOUT:\nhi\n"
+    assert state["script_runs"]["runs"] == 2
+    # The agent passes its session state on through call_function
+    workspace = Workspace(str(tmp_path))
+    call_function("run_python_file", {"file_path": "hello.py"}, False, workspace, state)
+    workspace.close()
+    assert state["script_runs"]["runs"] == 3
+
+
+def test_profile_reports_hotspots(tmp_path):
+    (tmp_path / "slow.py").write_text(
+        "def busy(n):\n"
+        "    return sum(i * i for i in range(n))\n"
+        "\n"
+        "for _ in range(20):\n"
+        "    busy(20000)\n"
+        "print('done')\n"
+    )
+
+    result = run_python_file(str(tmp_path), "slow.py", profile=True)
+
+    lines = result.splitlines()
+    assert lines[:3] == ["STDOUT:", "done", ""]
+    assert re.fullmatch(
+        r"Resources: wall [\d.]+s, CPU [\d.]+s \(user [\d.]+s, system [\d.]+s\), "
+        r"peak RSS [\d.]+ MB",
+        lines[3],
+    )
+    assert lines[4].startswith("Profile (top 6 of 6 functions by own time; ")
+    # Workspace files are shown relative to it
+    assert "slow.py:2(<genexpr>)" in result
+    assert "slow.py:1(busy)" in result
+    assert not any(str(tmp_path) in line for line in lines)
+
+
+def test_timeout_stops_the_script(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_python, "RUN_TIMEOUT", 0.2)
+    (tmp_path / "hang.py").write_text("import time\ntime.sleep(10)\n")
+
+    result = run_python_file(str(tmp_path), "hang.py")
+    assert result.startswith("Error: executing Python file: Command")
+    assert result.endswith("timed out after 0.2 seconds")
+
+
 if __name__ == "__main__":
     test()
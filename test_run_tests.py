@@ -0,0 +1,121 @@
+import os
+
+from functions.run_tests import run_tests
+
+CALC = "def add(a, b):\n    return a + b\n"
+TEST_CALC = """import unittest
+
+from pkg.calc import add
+
+
+class TestAdd(unittest.TestCase):
+    def test_add(self):
+        self.assertEqual(add(2, 3), 5)
+
+    @unittest.skip("not yet")
+    def test_later(self):
+        pass
+"""
+TEST_TEXT = """import pytest
+
+from pkg import text
+
+
+def test_upper():
+    print("output is captured")
+    assert text.shout("a") == "A"
+
+
+def test_uses_a_fixture(tmp_path):
+    assert tmp_path.is_dir()
+
+
+@pytest.mark.parametrize("word", ["b", "c"])
+def test_parametrized(word):
+    assert text.shout(word) == word.upper()
+
+
+class TestShout:
+    def test_empty(self):
+        assert text.shout("") == ""
+"""
+
+
+def make_workspace(root) -> None:
+    (root / "pkg").mkdir()
+    (root / "pkg" / "calc.py").write_text(CALC)
+    (root / "pkg" / "text.py").write_text("def shout(s):\n    return s.upper()\n")
+    (root / "test_calc.py").write_text(TEST_CALC)
+    (root / "test_text.py").write_text(TEST_TEXT)
+
+
+def touch(path, content) -> None:
+    # Guarantee a new mtime even on coarse-grained filesystems
+    mtime = path.stat().st_mtime_ns
+    path.write_text(content)
+    os.utime(path, ns=(mtime + 1_000_000, mtime + 1_000_000))
+
+
+def test_runs_only_affected_tests(tmp_path):
+    make_workspace(tmp_path)
+    directory = str(tmp_path)
+
+    lines = run_tests(directory).splitlines()
+    assert lines[0].startswith("OK: 6 passed, 0 failed, 1 skipped in 2 test files (")
+    assert lines[1:] == [
+        "- test_calc.py: ok (1 passed)",
+        "- test_text.py: ok (5 passed)",
+    ]
+    assert run_tests(directory).startswith("No tests are affected")
+
+    touch(tmp_path / "pkg" / "calc.py", "def add(a, b):\n    return a - b\n")
+    result = run_tests(directory)
+    assert result.startswith("FAILED: 0 passed, 1 failed, 1 skipped in 1 test file ")
+    assert "Not run (unaffected by changes): test_text.py" in result
+    assert "test_calc.py::TestAdd::test_add:" in result
+    assert "AssertionError: -1 != 5" in result
+
+    # Failing tests run again until they pass, even without new changes
+    assert run_tests(directory).startswith("FAILED")
+    touch(tmp_path / "pkg" / "calc.py", CALC)
+    assert run_tests(directory).startswith("OK: 1 passed")
+    assert run_tests(directory).startswith("No tests are affected")
+
+
+def test_explicit_paths_do_not_hide_other_changes(tmp_path):
+    make_workspace(tmp_path)
+    directory = str(tmp_path)
+    assert run_tests(directory).startswith("OK")
+
+    touch(tmp_path / "pkg" / "calc.py", "def add(a, b):\n    return a - b\n")
+    assert run_tests(directory, paths=["test_text.py"]).startswith("OK")
+    # test_calc.py depends on the edit and has not run since
+    result = run_tests(directory)
+    assert result.startswith("FAILED: 0 passed, 1 failed, 1 skipped in 1 test file ")
+    assert "Not run (unaffected by changes): test_text.py" in result
+
+    # Running only the passing file keeps the other one marked as failing
+    assert run_tests(directory, paths=["test_text.py"]).startswith("OK")
+    assert run_tests(directory).startswith("FAILED")
+
+
+def test_import_errors_and_explicit_paths(tmp_path):
+    make_workspace(tmp_path)
+    (tmp_path / "test_broken.py").write_text("import missing_module\n")
+    directory = str(tmp_path)
+
+    result = run_tests(directory, paths=["test_broken.py"])
+    assert result.startswith("FAILED: 0 passed, 1 failed in 1 test file ")
+    assert "ModuleNotFoundError: No module named 'missing_module'" in result
+
+    assert run_tests(directory, paths=["nope.py"]).startswith("Error:")
+    assert run_tests(directory, paths=["../x.py"]).startswith("Error:")
+
+    # Tests that take fixtures run, and can fail
+    (tmp_path / "test_fixture.py").write_text(
+        "def test_empty(tmp_path):\n    assert list(tmp_path.iterdir())\n"
+    )
+    result = run_tests(directory, paths=["test_fixture.py"])
+    assert result.startswith("FAILED: 0 passed, 1 failed in 1 test file ")
+    assert "test_fixture.py::test_empty:" in result
+    assert run_tests(directory, scope="some").startswith("Error:")
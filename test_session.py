@@ -0,0 +1,200 @@
+import json
+from pathlib import Path
+
+import pytest
+from google import genai
+
+from fake_client import FakeClient, model_turns
+from main import COMPACTED_RESULTS
+from main import main as run_agent
+from session import SessionLog, load_session
+from tokens import token_estimator
+
+
+def make_message(role: str, text: str) -> genai.types.Content:
+    return genai.types.Content(role=role, parts=[genai.types.Part(text=text)])
+
+
+def test_checkpoint_and_load(tmp_path):
+    log = SessionLog.create(
+        [make_message("user", "system"), make_message("user", "fix it")],
+        directory=str(tmp_path),
+    )
+    log.record_response(0, "[get_files_info()]")
+    log.checkpoint(
+        0,
+        [make_message("model", "[get_files_info()]"), make_message("user", "results")],
+        {"repaired": 1},
+    )
+    log.close()
+
+    session = load_session(log.path)
+    assert session["iteration"] == 1
+    assert session["pending_response"] is None
+    assert session["state"] == {"repaired": 1}
+    assert [m.role for m in session["messages"]] == ["user", "user", "model", "user"]
+    assert session["messages"][2].parts[0].text == "[get_files_info()]"
+    assert session["final_response"] is None
+
+
+def test_unfinished_turn_keeps_model_response(tmp_path):
+    log = SessionLog.create([make_message("user", "fix it")], directory=str(tmp_path))
+    log.record_response(0, "[get_files_info()]")
+    log.close()
+
+    session = load_session(log.path)
+    assert session["iteration"] == 0
+    assert session["pending_response"] == "[get_files_info()]"
+
+
+def test_torn_trailing_record_is_dropped(tmp_path):
+    log = SessionLog.create([make_message("user", "fix it")], directory=str(tmp_path))
+    log.checkpoint(0, [make_message("model", "hello")], {})
+    log.close()
+    with open(log.path, "a") as f:
+        f.write('{"type":"step","iter')
+
+    assert load_session(log.path)["iteration"] == 1
+
+    log = SessionLog.resume(log.path)
+    log.checkpoint(1, [make_message("model", "again")], {})
+    log.finish(1, "again")
+    log.close()
+
+    session = load_session(log.path)
+    assert session["iteration"] == 2
+    assert session["final_response"] == "again"
+
+
+def test_replaced_messages_are_restored(tmp_path):
+    log = SessionLog.create(
+        [make_message("user", "system"), make_message("user", "fix it")],
+        directory=str(tmp_path),
+    )
+    log.checkpoint(
+        0,
+        [make_message("model", "[get_files_info()]"), make_message("user", "results")],
+        {},
+        {0: make_message("user", "system, refreshed")},
+    )
+    log.close()
+
+    messages = load_session(log.path)["messages"]
+    assert [m.parts[0].text for m in messages] == [
+        "system, refreshed",
+        "fix it",
+        "[get_files_info()]",
+        "results",
+    ]
+
+
+def interrupt_and_resume(tmp_path, monkeypatch, prompt, replies):
+    """
+    Run the agent on `prompt` until the model fails on the request after
+    `replies`, then resume it. Returns the messages the failed request and
+    the first resumed request were sent.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("main.sleep", lambda seconds: None)
+    # The fake client's token counts would calibrate the estimator to nothing
+    monkeypatch.setattr(token_estimator, "observe", lambda messages, actual: None)
+    sent = []
+
+    def interrupted(model, contents):
+        sent.append(list(contents))
+        if model_turns(contents) == len(replies):
+            raise RuntimeError("503 Service Unavailable")
+        return replies[model_turns(contents)]
+
+    with pytest.raises(SystemExit):
+        run_agent([prompt, "--snapshot", "off"], client=FakeClient(interrupted))
+    [path] = (tmp_path / ".sessions").iterdir()
+
+    resumed = []
+
+    def answer(model, contents):
+        resumed.append(list(contents))
+        return "Done."
+
+    run_agent(["--resume", str(path)], client=FakeClient(answer))
+    return sent[-1], resumed[0]
+
+
+def texts(messages):
+    return [(m.role, m.parts[0].text) for m in messages]
+
+
+def test_resume_keeps_the_refreshed_tool_section(tmp_path, monkeypatch):
+    interrupted, resumed = interrupt_and_resume(
+        tmp_path,
+        monkeypatch,
+        "Explain the code",
+        ['[describe_tools(names=["get_file_outline"])]'],
+    )
+    # The call brought get_file_outline's full schema into the prompt
+    assert "'name': 'get_file_outline'" in interrupted[0].parts[0].text
+    assert texts(resumed) == texts(interrupted)
+
+
+def test_resume_keeps_compacted_results(tmp_path, monkeypatch):
+    (tmp_path / "calculator").mkdir()
+    for name in "abcdefgh":
+        (tmp_path / "calculator" / f"{name}.txt").write_text(
+            "".join(f"{name} line {i}: some words to read\n" for i in range(2000))
+        )
+    interrupted, resumed = interrupt_and_resume(
+        tmp_path,
+        monkeypatch,
+        "Read the notes",
+        [
+            f'[get_file_content(file_path="{a}.txt"), '
+            f'get_file_content(file_path="{b}.txt")]'
+            for a, b in ("ab", "cd", "ef", "gh")
+        ],
+    )
+    assert interrupted[3].parts[0].text == COMPACTED_RESULTS
+    assert texts(resumed) == texts(interrupted)
+
+    # The loop guard forgot the results the model can no longer see
+    [path] = (tmp_path / ".sessions").iterdir()
+    assert load_session(str(path))["state"]["loop_guard"]["seen_results"] == []
+
+
+def test_growing_state_is_checkpointed_by_its_changes(tmp_path):
+    overlay = {"a.py": "a = 1\n" * 1000}
+    guard = {"turn": 1, "seen_results": ["r1"]}
+    state = {"overlay_files": overlay, "loop_guard": guard}
+    log = SessionLog.create([make_message("user", "fix it")], directory=str(tmp_path))
+    log.checkpoint(0, [], state)
+
+    overlay["b.py"] = "b = 2\n"
+    guard["seen_results"].append("r2")
+    log.checkpoint(1, [], state)
+    step = json.loads(Path(log.path).read_text().splitlines()[-1])
+    assert step["overlay_files"] == {"b.py": "b = 2\n"}
+    assert step["seen_results"] == {"start": 1, "added": ["r2"]}
+    assert "seen_results" not in step["state"]["loop_guard"]
+
+    # Removed files, and a fresh list from forget_results()
+    del overlay["a.py"]
+    guard["seen_results"] = ["r3"]
+    log.checkpoint(2, [], state)
+    log.close()
+    assert load_session(log.path)["state"] == {
+        "overlay_files": {"b.py": "b = 2\n"},
+        "loop_guard": {"turn": 1, "seen_results": ["r3"]},
+    }
+
+    # A resumed log carries on from the state it was resumed with
+    state = load_session(log.path)["state"]
+    log = SessionLog.resume(log.path, state)
+    state["loop_guard"]["seen_results"].append("r4")
+    log.checkpoint(3, [], state)
+    log.close()
+    step = json.loads(Path(log.path).read_text().splitlines()[-1])
+    assert step["overlay_files"] == {}
+    assert step["seen_results"] == {"start": 1, "added": ["r4"]}
+    assert load_session(log.path)["state"]["loop_guard"]["seen_results"] == [
+        "r3",
+        "r4",
+    ]
@@ -0,0 +1,102 @@
+import os
+
+import snapshot
+from prompts import build_system_prompt, system_prompt
+from snapshot import build_workspace_snapshot
+
+
+def make_workspace(root) -> None:
+    (root / "pkg").mkdir()
+    (root / "pkg" / "calc.py").write_text(
+        "class Calculator:\n    def evaluate(self, e):\n        pass\n\n"
+        "def helper():\n    pass\n"
+    )
+    (root / "main.py").write_text("def main():\n    pass\n")
+    (root / "notes.txt").write_text("hello")
+    (root / "__pycache__").mkdir()
+    (root / ".hidden").write_text("x")
+
+
+def test_tree_and_outline(tmp_path):
+    make_workspace(tmp_path)
+    text = build_workspace_snapshot(str(tmp_path), cache_dir=None)
+    assert text.splitlines() == [
+        'WORKSPACE SNAPSHOT of the working directory "." (4 entries)',
+        "- pkg/",
+        "  - calc.py: 82 bytes",
+        "      class Calculator: evaluate",
+        "      def helper",
+        "- main.py: 21 bytes",
+        "    def main",
+        "- notes.txt: 5 bytes",
+    ]
+
+
+def test_tree_only(tmp_path):
+    make_workspace(tmp_path)
+    text = build_workspace_snapshot(str(tmp_path), outline=False, cache_dir=None)
+    assert "class" not in text
+    assert "- notes.txt: 5 bytes" in text
+
+
+def test_unparsable_file(tmp_path):
+    (tmp_path / "broken.py").write_text("def (:\n")
+    text = build_workspace_snapshot(str(tmp_path), cache_dir=None)
+    assert "(could not be parsed)" in text
+
+
+def test_outlines_are_cached_until_the_file_changes(tmp_path, monkeypatch):
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    make_workspace(workspace)
+    cache_dir = str(tmp_path / "cache")
+
+    parsed = []
+    outline_symbols = snapshot.outline_symbols
+
+    def counting(path):
+        parsed.append(os.path.basename(path))
+        return outline_symbols(path)
+
+    monkeypatch.setattr(snapshot, "outline_symbols", counting)
+
+    first = build_workspace_snapshot(str(workspace), cache_dir=cache_dir)
+    assert sorted(parsed) == ["calc.py", "main.py"]
+
+    parsed.clear()
+    assert build_workspace_snapshot(str(workspace), cache_dir=cache_dir) == first
+    assert parsed == []
+
+    main_py = workspace / "main.py"
+    main_py.write_text("def main():\n    pass\n\ndef other():\n    pass\n")
+    stat = main_py.stat()
+    os.utime(main_py, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    text = build_workspace_snapshot(str(workspace), cache_dir=cache_dir)
+    assert parsed == ["main.py"]
+    assert "def main, other" in text
+
+
+def test_truncated_at_line_boundary(tmp_path):
+    for i in range(50):
+        (tmp_path / f"file_{i:02}.txt").write_text("x")
+    text = build_workspace_snapshot(str(tmp_path), max_chars=200, cache_dir=None)
+    assert text.endswith("\n[...snapshot truncated]")
+    assert all(line.endswith("bytes") for line in text.splitlines()[1:-1])
+
+
+def test_system_prompt_with_snapshot():
+    assert build_system_prompt() == system_prompt
+    prompt = build_system_prompt("WORKSPACE SNAPSHOT ...")
+    assert prompt.startswith(system_prompt)
+    assert prompt.rstrip().endswith("WORKSPACE SNAPSHOT ...")
+
+
+def test_system_prompt_with_truncated_snapshot():
+    assert (
+        "truncated"
+        not in build_system_prompt("WORKSPACE SNAPSHOT ...").split(
+            "End of system prompt."
+        )[1]
+    )
+    prompt = build_system_prompt("WORKSPACE SNAPSHOT ...\n[...snapshot truncated]")
+    assert "It was truncated and does not list every file" in prompt
@@ -0,0 +1,87 @@
+from google import genai
+
+import functions.get_file_content as get_file_content_module
+from functions.get_file_content import get_file_content
+from loop_guard import LoopGuard
+from main import COMPACTED_RESULTS, fit_prompt_budget
+from tokens import TokenEstimator
+
+
+def message(role: str, text: str) -> genai.types.Content:
+    return genai.types.Content(role=role, parts=[genai.types.Part(text=text)])
+
+
+def test_estimates_common_text():
+    estimator = TokenEstimator(path=None)
+    assert estimator.estimate("") == 0
+    assert estimator.estimate("Hello world") == 2
+    assert estimator.estimate("print(x + 1)") == 6
+    assert estimator.estimate("def add(a, b):\n    return a + b\n") == 15
+    # Long identifiers count as several tokens
+    assert estimator.estimate("internationalization") == 3
+
+
+def test_calibrates_against_observed_counts(tmp_path):
+    path = tmp_path / "calibration.json"
+    estimator = TokenEstimator(path=str(path))
+    messages = [message("user", "word " * 100)]
+    raw = estimator.estimate_messages(messages)
+
+    estimator.observe(messages, raw * 2)
+    assert estimator.estimate_messages(messages) == raw * 2
+    assert estimator.report() == (
+        "Token estimates were off by 50.0% on average (worst 50.0%) "
+        "over the last 1 request(s)"
+    )
+    estimator.observe(messages, raw * 2)
+    assert estimator.report().startswith("Token estimates were off by 25.0%")
+
+    # Calibration carries over to the next run
+    assert TokenEstimator(path=str(path)).estimate_messages(messages) == raw * 2
+
+
+def test_fit_lines():
+    estimator = TokenEstimator(path=None)
+    lines = ["one two three\n"] * 10  # 4 tokens each
+    assert estimator.fit_lines(lines, 12) == 3
+    assert estimator.fit_lines(lines, 1000) == 10
+    assert estimator.fit_lines(lines, 2) == 0
+
+
+def test_fit_prompt_budget_compacts_oldest_results_first():
+    big = "word " * 1000
+    messages = [message("user", "system"), message("user", "task")]
+    for i in range(4):
+        messages += [message("model", f"[call_{i}()]"), message("user", big)]
+    state = {}
+    guard = LoopGuard(state)
+    guard.record_call("get_file_content", {"file_path": "a.py"}, big)
+
+    estimate = fit_prompt_budget(messages, guard, budget=2500)
+
+    assert estimate <= 2500
+    texts = [m.parts[0].text for m in messages]
+    assert texts[3] == texts[5] == COMPACTED_RESULTS
+    assert texts[7] == texts[9] == big
+    # The model can no longer see the old result, so a repeat is a real read
+    assert guard.cached_result("get_file_content", {"file_path": "a.py"}) is None
+
+
+def test_fit_prompt_budget_leaves_small_prompts_alone():
+    messages = [message("user", "system"), message("user", "task")]
+    assert fit_prompt_budget(messages, budget=100) == 10
+
+
+def test_file_read_stops_at_token_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_file_content_module, "MAX_READ_TOKENS", 12)
+    (tmp_path / "notes.txt").write_text("one two three\n" * 10)
+
+    result = get_file_content(str(tmp_path), "notes.txt")
+    assert result == "one two three\n" * 3 + (
+        '[...Stopped after line 3 of "notes.txt" to stay within 12 tokens; '
+        "read on with start_line=4]"
+    )
+
+    result = get_file_content(str(tmp_path), "notes.txt", start_line=4)
+    assert result.startswith('[Lines 4-6 of 10 in "notes.txt"]\n')
+    assert result.endswith("read on with start_line=7]")
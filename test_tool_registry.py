@@ -0,0 +1,125 @@
+import sys
+
+import pytest
+from google import genai
+
+from functions.describe_tools import describe_tools
+from main import refresh_tool_section
+from prompts import (
+    build_system_prompt,
+    system_prompt,
+    tool_savings_report,
+    tool_tokens_saved,
+)
+from tool_registry import ToolRegistry, tool_registry
+
+TYPE_NAMES = {
+    genai.types.Type.STRING: "str",
+    genai.types.Type.INTEGER: "int",
+    genai.types.Type.NUMBER: "float",
+    genai.types.Type.BOOLEAN: "bool",
+}
+
+
+def declared_type(schema: genai.types.Schema) -> str:
+    if schema.type == genai.types.Type.ARRAY:
+        assert schema.items is not None
+        return f"list[{TYPE_NAMES[schema.items.type]}]"
+    return TYPE_NAMES[schema.type]
+
+
+@pytest.mark.parametrize("name", list(tool_registry.tools))
+def test_signature_matches_schema(name):
+    tool = tool_registry.get(name)
+    parameters = tool.schema.parameters
+    required = parameters.required or []
+    expected = ", ".join(
+        f"{param}{'' if param in required else '?'}: {declared_type(schema)}"
+        for param, schema in parameters.properties.items()
+    )
+    assert tool.parameters == expected
+    assert tool.schema.name == name
+
+
+def test_tools_load_on_first_use(tmp_path, monkeypatch):
+    (tmp_path / "extra_tool.py").write_text(
+        "from google import genai\n"
+        "def extra(working_directory):\n"
+        "    return 'extra'\n"
+        "schema_extra = genai.types.FunctionDeclaration(name='extra')\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry = ToolRegistry()
+    tool = registry.register("extra", "extra_tool", "", "An extra tool")
+
+    assert "extra_tool" not in sys.modules
+    assert tool.signature == "extra() - An extra tool"
+    assert not tool.loaded
+    assert registry.function("extra")(".") == "extra"
+    assert [schema.name for schema in registry.schemas] == ["extra"]
+    monkeypatch.delitem(sys.modules, "extra_tool")
+
+
+def test_rank_by_task_and_recent_turns():
+    assert tool_registry.select("Run main.py and profile why it is slow") == [
+        "run_python_file"
+    ]
+    assert tool_registry.select("Read the docs, fix the failing tests") == [
+        "get_file_content",
+        "run_tests",
+        "write_file",
+    ]
+
+    # A tool the model just called outranks keyword matches
+    ranked = tool_registry.rank(
+        "Fix the bug and make the tests pass",
+        recent='[get_file_outline(file_path="calc.py")]',
+    )
+    assert ranked[0] == "get_file_outline"
+    assert tool_registry.rank("") == []
+
+
+def test_system_prompt_lists_every_tool_and_relevant_schemas():
+    prompt = build_system_prompt(task="Fix the failing tests")
+    for tool in tool_registry.tools.values():
+        assert f"- {tool.signature}\n" in prompt
+    assert "'name': 'run_tests'" in prompt
+    assert "'name': 'write_file'" in prompt
+    assert "'name': 'get_files_info'" not in prompt
+    # Without a task, no full schemas at all
+    assert build_system_prompt() == system_prompt
+    assert "'name':" not in system_prompt
+
+    assert 0 < tool_tokens_saved(prompt) < tool_tokens_saved(system_prompt)
+    report = tool_savings_report("Fix the failing tests")
+    assert report[0].startswith("Tool section: ~")
+    assert "with 2 of 8 full schemas (run_tests, write_file)" in report[0]
+
+
+def message(role: str, text: str) -> genai.types.Content:
+    return genai.types.Content(role=role, parts=[genai.types.Part(text=text)])
+
+
+def test_refresh_follows_recent_calls():
+    messages = [
+        message("user", build_system_prompt(task="Fix the failing tests")),
+        message("user", "Fix the failing tests"),
+    ]
+    first = messages[0]
+    refresh_tool_section(messages)
+    assert messages[0] is first  # nothing changed
+
+    messages += [
+        message("model", '[get_file_outline(file_path="calc.py")]'),
+        message("user", "Result of get_file_outline: ..."),
+    ]
+    refresh_tool_section(messages)
+    assert messages[0] is not first
+    assert "'name': 'get_file_outline'" in messages[0].parts[0].text
+    assert "'name': 'get_file_outline'" not in first.parts[0].text
+
+
+def test_describe_tools():
+    result = describe_tools(".", ["run_tests"])
+    assert result.startswith("{'description': 'Runs the tests")
+    assert describe_tools(".", ["nope"]).startswith("Error: Unknown tool(s): nope.")
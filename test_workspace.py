@@ -0,0 +1,161 @@
+import shutil
+
+from functions.get_file_content import get_file_content
+from functions.get_files_info import get_files_info
+from functions.run_python import run_python_file
+from functions.run_tests import run_tests
+from functions.workspace import Workspace
+from functions.write_file_content import write_file
+
+
+def make_workspace(root) -> None:
+    (root / "pkg").mkdir()
+    (root / "pkg" / "calc.py").write_text("def add(a, b):\n    return a + b\n")
+    (root / "main.py").write_text("from pkg.calc import add\nprint(add(2, 3))\n")
+
+
+def test_overlay_reads_see_writes_but_disk_is_untouched(tmp_path):
+    make_workspace(tmp_path)
+    workspace = Workspace(str(tmp_path), overlay=True)
+
+    write_file(workspace, "pkg/calc.py", "def add(a, b):\n    return a * b\n")
+    write_file(workspace, "new/notes.txt", "hello")
+
+    assert "a * b" in get_file_content(workspace, "pkg/calc.py")
+    assert "a + b" in (tmp_path / "pkg" / "calc.py").read_text()
+    assert not (tmp_path / "new").exists()
+
+    listing = get_files_info(workspace, ".")
+    assert "- new: file_size=0 bytes, is_dir=True" in listing
+    assert get_files_info(workspace, "new") == (
+        "- notes.txt: file_size=5 bytes, is_dir=False"
+    )
+
+
+def test_code_runs_against_the_merged_view(tmp_path):
+    make_workspace(tmp_path)
+    workspace = Workspace(str(tmp_path), overlay=True)
+    try:
+        assert run_python_file(workspace, "main.py") == "STDOUT:\n5\n"
+
+        write_file(workspace, "pkg/calc.py", "def add(a, b):\n    return a * b\n")
+        assert run_python_file(workspace, "main.py") == "STDOUT:\n6\n"
+
+        # Same length, same second: stale bytecode must not be reused
+        write_file(workspace, "pkg/calc.py", "def add(a, b):\n    return a - b\n")
+        assert run_python_file(workspace, "main.py") == "STDOUT:\n-1\n"
+
+        # Changes on disk show through where the overlay has no edit
+        (tmp_path / "main.py").write_text(
+            "from pkg.calc import add\nprint(add(9, 3))\n"
+        )
+        assert run_python_file(workspace, "main.py") == "STDOUT:\n6\n"
+
+        workspace.discard()
+        assert run_python_file(workspace, "main.py") == "STDOUT:\n12\n"
+    finally:
+        workspace.close()
+
+
+def test_run_tests_in_overlay(tmp_path):
+    make_workspace(tmp_path)
+    (tmp_path / "test_calc.py").write_text(
+        "from pkg.calc import add\n\n\ndef test_add():\n    assert add(2, 3) == 5\n"
+    )
+    workspace = Workspace(str(tmp_path), overlay=True)
+    try:
+        write_file(workspace, "pkg/calc.py", "def add(a, b):\n    return a * b\n")
+        assert run_tests(workspace).startswith("FAILED: 0 passed, 1 failed")
+    finally:
+        workspace.close()
+
+
+def test_commit_and_discard(tmp_path):
+    make_workspace(tmp_path)
+    files = {}
+    workspace = Workspace(str(tmp_path), overlay=True, files=files)
+
+    write_file(workspace, "pkg/calc.py", "changed\n")
+    assert files == {"pkg/calc.py": "changed\n"}  # shared with the session state
+    assert workspace.discard() == ["pkg/calc.py"]
+    assert "a + b" in get_file_content(workspace, "pkg/calc.py")
+
+    write_file(workspace, "pkg/calc.py", "changed\n")
+    write_file(workspace, "extra/new.txt", "new\n")
+    assert workspace.commit() == ["extra/new.txt", "pkg/calc.py"]
+    assert files == {}
+    assert (tmp_path / "pkg" / "calc.py").read_text() == "changed\n"
+    assert (tmp_path / "extra" / "new.txt").read_text() == "new\n"
+
+
+def test_paths_outside_are_rejected(tmp_path):
+    workspace = Workspace(str(tmp_path), overlay=True)
+    assert write_file(workspace, "../escape.txt", "x").startswith("Error: Cannot write")
+    assert workspace.files == {}
+
+
+def test_paths_with_nul_bytes_are_rejected(tmp_path):
+    make_workspace(tmp_path)
+    for overlay in (False, True):
+        workspace = Workspace(str(tmp_path), overlay=overlay)
+        path = "pkg/calc.py\x00.txt"
+        assert get_file_content(workspace, path).startswith("Error: File not found")
+        assert get_files_info(workspace, path).startswith("Error:")
+        assert run_python_file(workspace, "main\x00.py").startswith("Error: File")
+        assert write_file(workspace, path, "x") == (
+            "Error: writing to file: 'pkg/calc.py\\x00.txt' is not a valid path"
+        )
+        assert workspace.files == {}
+        workspace.close()
+
+
+def test_sibling_with_the_same_prefix_is_outside(tmp_path):
+    (tmp_path / "calculator").mkdir()
+    (tmp_path / "calculator_evil").mkdir()
+    (tmp_path / "calculator_evil" / "secret.txt").write_text("secret")
+    workspace = Workspace(str(tmp_path / "calculator"))
+
+    assert workspace.resolve("../calculator_evil/secret.txt") is None
+    assert get_file_content(workspace, "../calculator_evil/secret.txt").startswith(
+        "Error: Cannot read"
+    )
+    assert workspace.resolve("pkg/../main.py") == str(
+        tmp_path / "calculator" / "main.py"
+    )
+
+
+def test_symbolic_links_do_not_lead_outside(tmp_path):
+    root, outside = tmp_path / "root", tmp_path / "outside"
+    root.mkdir()
+    outside.mkdir()
+    (outside / "secret.txt").write_text("TOP SECRET")
+    (root / "linked_dir").symlink_to(outside)
+    (root / "linked_file.txt").symlink_to(outside / "secret.txt")
+
+    for overlay in (False, True):
+        workspace = Workspace(str(root), overlay=overlay)
+        for path in ("linked_dir/secret.txt", "linked_file.txt"):
+            assert get_file_content(workspace, path).startswith("Error: File not found")
+            assert write_file(workspace, path, "pwned").startswith("Error: writing")
+        assert get_files_info(workspace, "linked_dir").startswith("Error")
+        workspace.close()
+    assert (outside / "secret.txt").read_text() == "TOP SECRET"
+
+
+def test_directories_removed_and_recreated_are_reopened(tmp_path):
+    make_workspace(tmp_path)
+    workspace = Workspace(str(tmp_path))
+    assert "a + b" in get_file_content(workspace, "pkg/calc.py")
+
+    shutil.rmtree(tmp_path / "pkg")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "calc.py").write_text("new\n")
+    assert get_file_content(workspace, "pkg/calc.py") == "new\n"
+
+    # A rename is only noticed after refresh(), which running code triggers
+    (tmp_path / "pkg").rename(tmp_path / "old")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "calc.py").write_text("renamed\n")
+    workspace.refresh()
+    assert get_file_content(workspace, "pkg/calc.py") == "renamed\n"
+    workspace.close()
@@ -1,3 +1,5 @@
+from functions import write_file_content
+from functions.check_python import module_name
 from functions.write_file_content import write_file
 
 
@@ -12,5 +14,49 @@ def test():
     print(result)
 
 
+def test_reports_syntax_errors_with_position(tmp_path):
+    result = write_file(str(tmp_path), "bad.py", "x = 1\ndef f(:\n    pass\n")
+    assert result.splitlines()[:4] == [
+        'Successfully wrote to "bad.py" (23 characters written)',
+        'Syntax error in "bad.py" at line 2, column 7: invalid syntax',
+        "    def f(:",
+        "          ^",
+    ]
+    assert (tmp_path / "bad.py").exists()
+
+
+def test_valid_python_and_other_files(tmp_path):
+    assert write_file(str(tmp_path), "ok.py", "x = 1\n").endswith(
+        "Syntax check passed."
+    )
+    assert write_file(str(tmp_path), "notes.txt", "def (:").endswith("written)")
+
+
+def test_import_check(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_file_content, "WRITE_FILE_CHECK", "import")
+    directory = str(tmp_path)
+    (tmp_path / "pkg").mkdir()
+
+    write_file(directory, "pkg/helper.py", "VALUE = 1\n")
+    result = write_file(directory, "pkg/user.py", "from pkg.helper import VALUE\n")
+    assert result.endswith("Syntax and import check passed.")
+
+    result = write_file(directory, "pkg/user.py", "from pkg.helper import MISSING\n")
+    assert 'Importing "pkg/user.py" failed:' in result
+    assert "ImportError: cannot import name 'MISSING'" in result
+
+    # Each check starts clean, so the fixed module is not served from a cache
+    write_file(directory, "pkg/helper.py", "VALUE = 1\nMISSING = 2\n")
+    result = write_file(directory, "pkg/user.py", "from pkg.helper import MISSING\n")
+    assert result.endswith("Syntax and import check passed.")
+
+
+def test_module_name():
+    assert module_name("pkg/calculator.py") == "pkg.calculator"
+    assert module_name("./main.py") == "main"
+    assert module_name("pkg/__init__.py") == "pkg"
+    assert module_name("my-script.py") is None
+
+
 if __name__ == "__main__":
     test()
@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Optional
+
+from google import genai
+
+from config import CACHE_DIR
+
+# Roughly how Gemma's tokenizer splits text: a common word and the space
+# before it are one token, each digit and punctuation mark is its own, and so
+# is a run of newlines or of indentation
+_PIECES = re.compile(r" ?[A-Za-z]+|\d|[^\w\s]|\n+|[ \t]{2,}|[^\x00-\x7f]")
+# Long identifiers and rare words split into several tokens: one more for
+# every 8 letters that are followed by another letter
+_LONG_WORD_CHUNKS = re.compile(r"[A-Za-z]{8}(?=[A-Za-z])")
+# Turn markers the chat template wraps around every message
+_MESSAGE_OVERHEAD = 4
+# Observations kept for calibration and error reporting
+_SAMPLES = 200
+
+
+@lru_cache(maxsize=4096)
+def _raw_estimate(text: str) -> int:
+    return len(_PIECES.findall(text)) + len(_LONG_WORD_CHUNKS.findall(text))
+
+
+class TokenEstimator:
+    """
+    Estimates token counts locally, in microseconds for cached text, so a
+    prompt can be sized before it is sent. A scale factor is calibrated from
+    the prompt_token_count of earlier responses and saved across runs.
+    """
+
+    def __init__(
+        self, path: Optional[str] = os.path.join(CACHE_DIR, "token-calibration.json")
+    ):
+        self.path = path
+        self._samples: deque[tuple[int, int]] = deque(maxlen=_SAMPLES)  # (raw, actual)
+        self._errors: deque[float] = deque(
+            maxlen=_SAMPLES
+        )  # relative, before observing
+        self._scale = 1.0
+        self._loaded = path is None
+        self._lock = threading.Lock()
+
+    def estimate(self, text: str) -> int:
+        self._load()
+        return round(_raw_estimate(text) * self._scale)
+
+    def estimate_messages(self, messages: list[genai.types.Content]) -> int:
+        self._load()
+        return round(_raw_messages(messages) * self._scale)
+
+    def fit_lines(self, lines: list[str], max_tokens: int) -> int:
+        """How many of `lines`, from the first, fit in `max_tokens`."""
+        self._load()
+        budget = max_tokens / self._scale
+        used = 0
+        for count, line in enumerate(lines):
+            used += _raw_estimate(line)
+            if used > budget:
+                return count
+        return len(lines)
+
+    def observe(self, messages: list[genai.types.Content], actual: int) -> None:
+        """Record the real prompt size of `messages` and recalibrate."""
+        if actual <= 0:
+            return
+        raw = _raw_messages(messages)
+        self._load()
+        with self._lock:
+            self._errors.append(abs(raw * self._scale - actual) / actual)
+            self._samples.append((raw, actual))
+            self._scale = sum(a for _, a in self._samples) / max(
+                sum(r for r, _ in self._samples), 1
+            )
+            self._save()
+
+    def report(self) -> Optional[str]:
+        with self._lock:
+            errors = sorted(self._errors)
+        if not errors:
+            return None
+        mean = sum(errors) / len(errors)
+        worst = errors[-1]
+        return (
+            f"Token estimates were off by {mean:.1%} on average "
+            f"(worst {worst:.1%}) over the last {len(errors)} request(s)"
+        )
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self._samples.extend(tuple(s) for s in data["samples"])
+                self._errors.extend(data["errors"])
+                self._scale = data["scale"]
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=directory, delete=False
+            ) as f:
+                json.dump(
+                    {
+                        "scale": self._scale,
+                        "samples": list(self._samples),
+                        "errors": list(self._errors),
+                    },
+                    f,
+                )
+            os.replace(f.name, self.path)
+        except OSError:
+            pass  # calibration is an optimization; never fail a request over it
+
+
+def _raw_messages(messages: list[genai.types.Content]) -> int:
+    return sum(
+        _MESSAGE_OVERHEAD
+        + sum(_raw_estimate(part.text or "") for part in message.parts or [])
+        for message in messages
+    )
+
+
+token_estimator = TokenEstimator()
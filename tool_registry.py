@@ -0,0 +1,214 @@
+import importlib
+import re
+import threading
+from collections.abc import Sequence
+from typing import Any, Callable, Iterator, Optional
+
+from google import genai
+
+from config import FULL_TOOL_SCHEMAS
+
+# A tool named in the latest turns (called, asked about, or in an error)
+# outranks any keyword match with the task
+RECENT_WEIGHT = 5
+
+_WORDS = re.compile(r"[a-z]+")
+
+
+class Tool:
+    """
+    A registered tool. Its compact signature is declared up front; the
+    module holding its function and `schema_<name>` declaration is only
+    imported when one of those is first needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        module: str,
+        parameters: str,
+        summary: str,
+        keywords: tuple[str, ...] = (),
+        uses_state: bool = False,
+    ):
+        self.name = name
+        self.module = module
+        self.parameters = parameters  # e.g. "file_path: str, start_line?: int"
+        self.summary = summary
+        self.keywords = keywords  # word prefixes that make the tool relevant
+        # Whether the function takes the session state, to keep stats in
+        self.uses_state = uses_state
+        self._loaded: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}({self.parameters}) - {self.summary}"
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded is not None
+
+    @property
+    def schema(self) -> genai.types.FunctionDeclaration:
+        return getattr(self._load(), f"schema_{self.name}")
+
+    @property
+    def function(self) -> Callable[..., Any]:
+        return getattr(self._load(), self.name)
+
+    def _load(self) -> Any:
+        if self._loaded is None:
+            with self._lock:
+                if self._loaded is None:
+                    self._loaded = importlib.import_module(self.module)
+        return self._loaded
+
+
+class ToolSchemas(Sequence):
+    """The registry's schemas in registration order, loaded as they are read."""
+
+    def __init__(self, registry: "ToolRegistry"):
+        self._registry = registry
+
+    def __len__(self) -> int:
+        return len(self._registry.tools)
+
+    def __getitem__(self, index):
+        tools = list(self._registry.tools.values())[index]
+        if isinstance(index, slice):
+            return [tool.schema for tool in tools]
+        return tools.schema
+
+    def __iter__(self) -> Iterator[genai.types.FunctionDeclaration]:
+        for tool in list(self._registry.tools.values()):
+            yield tool.schema
+
+
+class ToolRegistry:
+    """
+    Every tool the agent can call. The system prompt lists all of them by
+    their compact signature, and includes full schemas only for the few
+    ranked most relevant to the task and the latest turns.
+    """
+
+    def __init__(self):
+        self.tools: dict[str, Tool] = {}
+        self.schemas = ToolSchemas(self)
+
+    def register(
+        self,
+        name: str,
+        module: str,
+        parameters: str,
+        summary: str,
+        keywords: tuple[str, ...] = (),
+        uses_state: bool = False,
+    ) -> Tool:
+        if name in self.tools:
+            raise ValueError(f"Tool already registered: {name}")
+        tool = Tool(name, module, parameters, summary, keywords, uses_state)
+        self.tools[name] = tool
+        return tool
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.tools
+
+    def get(self, name: str) -> Tool:
+        try:
+            return self.tools[name]
+        except KeyError:
+            raise ValueError(f"Unknown function: {name}") from None
+
+    def function(self, name: str) -> Callable[..., Any]:
+        return self.get(name).function
+
+    def rank(self, task: str, recent: str = "") -> list[str]:
+        """
+        Tools relevant to `task`, most relevant first: one point for each of
+        a tool's keywords that starts a word of the task, and RECENT_WEIGHT
+        if the tool is named in `recent`. Tools scoring nothing are left out.
+        """
+        words = set(_WORDS.findall(task.lower()))
+        scores = {}
+        for name, tool in self.tools.items():
+            score = sum(
+                any(word.startswith(keyword) for word in words)
+                for keyword in tool.keywords
+            )
+            if recent and re.search(rf"\b{name}\b", recent):
+                score += RECENT_WEIGHT
+            if score:
+                scores[name] = score
+        # Ties keep registration order, which puts the common tools first
+        return sorted(scores, key=lambda name: -scores[name])
+
+    def select(
+        self, task: str, recent: str = "", limit: int = FULL_TOOL_SCHEMAS
+    ) -> list[str]:
+        """The tools whose full schemas go into the prompt, in registry order."""
+        chosen = set(self.rank(task, recent)[:limit])
+        return [name for name in self.tools if name in chosen]
+
+    def describe(self, names: list[str]) -> list[dict[str, Any]]:
+        return [self.get(name).schema.to_json_dict() for name in names]
+
+
+tool_registry = ToolRegistry()
+
+tool_registry.register(
+    "get_files_info",
+    "functions.get_files_info",
+    "directory?: str",
+    "List a directory's files with their sizes",
+    ("list", "director", "folder", "tree", "structure", "where", "find"),
+)
+tool_registry.register(
+    "get_file_content",
+    "functions.get_file_content",
+    "file_path: str, start_line?: int, end_line?: int",
+    "Read a file, or a range of its lines",
+    ("read", "file", "content", "line", "show", "look", "inspect", "explain", "bug"),
+)
+tool_registry.register(
+    "get_files_content",
+    "functions.get_files_content",
+    "paths: list[str], max_total_chars?: int",
+    "Read several files in one call, sharing one size budget",
+    ("files", "several", "modules", "compare", "across", "all"),
+)
+tool_registry.register(
+    "get_file_outline",
+    "functions.get_file_outline",
+    "file_path: str",
+    "Classes, functions and methods of a Python file, with line ranges",
+    ("class", "function", "method", "outline", "def", "large", "refactor"),
+)
+tool_registry.register(
+    "run_python_file",
+    "functions.run_python",
+    "file_path: str, args?: list[str], profile?: bool",
+    "Run a Python file; profile=true adds timings and hotspots",
+    ("run", "execut", "script", "output", "print", "profil", "slow", "perform"),
+    uses_state=True,
+)
+tool_registry.register(
+    "run_tests",
+    "functions.run_tests",
+    "paths?: list[str], scope?: str",
+    "Run the tests affected by recent edits and summarize failures",
+    ("test", "fail", "pass", "verif", "bug", "fix", "broke", "regress"),
+)
+tool_registry.register(
+    "write_file",
+    "functions.write_file_content",
+    "file_path: str, content: str",
+    "Create or overwrite a file",
+    ("write", "edit", "fix", "change", "add", "creat", "updat", "implement"),
+)
+tool_registry.register(
+    "describe_tools",
+    "functions.describe_tools",
+    "names: list[str]",
+    "Full schemas of the named tools",
+)